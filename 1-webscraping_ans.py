@@ -8,6 +8,9 @@ from urllib.parse import urljoin
 import time
 import sys
 
+from cliente_http import obter_cliente
+from sincronizacao import INALTERADO, NOME_MANIFESTO, ManifestoDownloads, sincronizar_download
+
 def criar_diretorio(nome_diretorio):
 	"""Cria um diretório se ele não existir."""
 	if not os.path.exists(nome_diretorio):
@@ -16,18 +19,22 @@ def criar_diretorio(nome_diretorio):
 	else:
 		print(f"Diretório '{nome_diretorio}' já existe.")
 
-def baixar_arquivo(url, destino):
-	"""Baixa um arquivo da URL especificada e salva no caminho de destino."""
+def baixar_arquivo(url, destino, manifesto=None):
+	"""
+	Baixa um arquivo da URL especificada e salva no caminho de destino.
+	Arquivos que não mudaram no servidor desde o último download (segundo o
+	manifesto) não são baixados de novo. Retorna BAIXADO ou INALTERADO em
+	caso de sucesso e False em caso de erro.
+	"""
+	if manifesto is None:
+		manifesto = ManifestoDownloads(os.path.join(os.path.dirname(destino), NOME_MANIFESTO))
 	try:
-		resposta = requests.get(url, stream=True)
-		resposta.raise_for_status()  # Verifica se houve erro na requisição
-		
-		with open(destino, 'wb') as arquivo:
-			for pedaco in resposta.iter_content(chunk_size=8192):
-				arquivo.write(pedaco)
-		
-		print(f"Arquivo baixado com sucesso: {destino}")
-		return True
+		resultado = sincronizar_download(url, destino, manifesto)
+		if resultado == INALTERADO:
+			print(f"Arquivo sem alterações no servidor, download pulado: {destino}")
+		else:
+			print(f"Arquivo baixado com sucesso: {destino}")
+		return resultado
 	except Exception as e:
 		print(f"Erro ao baixar o arquivo {url}: {str(e)}")
 		return False
@@ -53,7 +60,7 @@ def buscar_anexos(url):
 	"""Busca os links dos anexos I e II no site da ANS."""
 	try:
 		print(f"Fazendo requisição para {url}")
-		resposta = requests.get(url)
+		resposta = obter_cliente().get(url)
 		resposta.raise_for_status()
 		print(f"Status da resposta: {resposta.status_code}")
 		
@@ -120,6 +127,8 @@ def main():
 	
 	# Lista para armazenar os caminhos dos arquivos baixados
 	arquivos_baixados = []
+	inalterados = 0
+	manifesto = ManifestoDownloads(os.path.join(diretorio_downloads, NOME_MANIFESTO))
 	
 	# Baixar os anexos
 	for nome, url_anexo in links_anexos:
@@ -128,16 +137,22 @@ def main():
 		caminho_arquivo = os.path.join(diretorio_downloads, nome_arquivo)
 		
 		# Baixar o arquivo
-		if baixar_arquivo(url_anexo, caminho_arquivo):
+		resultado = baixar_arquivo(url_anexo, caminho_arquivo, manifesto)
+		if resultado:
 			arquivos_baixados.append(caminho_arquivo)
+			inalterados += resultado == INALTERADO
 	
 	# Comprimir os arquivos baixados
 	if arquivos_baixados:
 		arquivo_zip = os.path.join(diretorio_downloads, "anexos_ans.zip")
-		comprimir_arquivos(arquivos_baixados, arquivo_zip)
-		print(f"Processo concluído. Arquivos compactados em: {arquivo_zip}")
+		if inalterados == len(arquivos_baixados) and os.path.exists(arquivo_zip):
+			print(f"Nenhum anexo mudou. Mantido o arquivo existente: {arquivo_zip}")
+		else:
+			comprimir_arquivos(arquivos_baixados, arquivo_zip)
+			print(f"Processo concluído. Arquivos compactados em: {arquivo_zip}")
 	else:
 		print("Nenhum arquivo foi baixado para compactar.")
+	print(f"Conexões HTTP:\n{obter_cliente().resumo()}")
 
 if __name__ == "__main__":
 	try:
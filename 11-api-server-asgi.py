@@ -0,0 +1,444 @@
+import asyncio
+import importlib.util
+import argparse
+import os
+import re
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote
+
+# uvicorn é opcional: sem ele, a API é servida pelo servidor HTTP asyncio embutido
+try:
+	import uvicorn
+except ImportError:
+	uvicorn = None
+
+# Reaproveitar os dados, índices e funções da API Flask (8-api-server.py).
+# O nome do arquivo não é um identificador Python válido, então ele é carregado pelo caminho.
+_especificacao = importlib.util.spec_from_file_location(
+	'api_server', os.path.join(os.path.dirname(os.path.abspath(__file__)), '8-api-server.py')
+)
+api = importlib.util.module_from_spec(_especificacao)
+_especificacao.loader.exec_module(api)
+
+# Tempo máximo, em segundos, para atender uma requisição (inclui a espera por uma vaga no pool)
+TEMPO_LIMITE_REQUISICAO = float(os.environ.get('API_TEMPO_LIMITE', 10))
+
+# Tempo máximo, em segundos, que uma conexão keep-alive pode ficar ociosa (servidor embutido)
+TEMPO_OCIOSO_CONEXAO = float(os.environ.get('API_TEMPO_OCIOSO', 15))
+
+# Threads do pool que executa a pontuação da busca e as demais tarefas de CPU
+THREADS_CALCULO = int(os.environ.get('API_THREADS', 8))
+
+# Tarefas de CPU aceitas ao mesmo tempo (em execução ou na fila do pool)
+TAREFAS_PENDENTES_MAXIMO = THREADS_CALCULO * 4
+
+# Tamanho máximo, em bytes, do corpo de uma requisição
+CORPO_TAMANHO_MAXIMO = 16 * 1024 * 1024
+
+executor_calculo = ThreadPoolExecutor(max_workers=THREADS_CALCULO, thread_name_prefix='calculo')
+
+# Criado no loop de eventos em execução (ver iniciar_aplicacao)
+vagas_calculo = None
+
+MENSAGENS_STATUS = {
+	200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 410: 'Gone',
+	411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'
+}
+
+class CorpoMuitoGrande(Exception):
+	"""Corpo da requisição maior que CORPO_TAMANHO_MAXIMO (resposta 413)"""
+
+class RequisicaoASGI:
+	"""Dados de uma requisição HTTP já lidos do scope ASGI"""
+	
+	def __init__(self, scope, corpo):
+		self.metodo = scope['method']
+		self.caminho = scope['path']
+		self.parametros = {
+			nome: valores[0]
+			for nome, valores in parse_qs(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True).items()
+		}
+		self.corpo = corpo
+	
+	def inteiro(self, nome, padrao):
+		"""Lê um parâmetro inteiro, usando o padrão se ausente ou inválido (como o type=int do Flask)"""
+		try:
+			return int(self.parametros[nome])
+		except (KeyError, ValueError):
+			return padrao
+
+def resposta(dados, status=200):
+	"""Resposta (status, corpo JSON) a partir de um dict ou de um corpo já codificado"""
+	return status, dados if isinstance(dados, bytes) else api.codificar_json(dados)
+
+def erro(mensagem, status):
+	"""Resposta de erro no mesmo formato da API Flask"""
+	return resposta({'erro': mensagem}, status)
+
+async def calcular(funcao, *args):
+	"""
+	Executa uma função de CPU no pool de threads, sem bloquear o loop de eventos.
+	
+	No máximo TAREFAS_PENDENTES_MAXIMO tarefas são aceitas ao mesmo tempo; as
+	demais esperam uma vaga (limitadas pelo tempo máximo da requisição). A vaga
+	só é devolvida quando a função termina na thread, mesmo que a requisição
+	tenha sido cancelada por tempo esgotado.
+	"""
+	loop = asyncio.get_running_loop()
+	await vagas_calculo.acquire()
+	try:
+		futuro = executor_calculo.submit(funcao, *args)
+	except BaseException:
+		vagas_calculo.release()
+		raise
+	futuro.add_done_callback(lambda _: loop.call_soon_threadsafe(vagas_calculo.release))
+	return await asyncio.wrap_future(futuro)
+
+async def obter_snapshot():
+	"""Retorna o snapshot atual, fazendo a carga inicial no pool de threads se necessário"""
+	snapshot = api.snapshot_atual
+	if snapshot is None:
+		snapshot = await calcular(api.obter_snapshot)
+	return snapshot
+
+async def rota_status(requisicao):
+	"""Rota para verificar o status da API"""
+	snapshot = await obter_snapshot()
+	dados = api.dados_status(snapshot)
+	dados['servidor'] = 'asgi'
+	return resposta(dados)
+
+def calcular_busca(snapshot, requisicao):
+	"""Executa a busca (normalização, pontuação e montagem do JSON) em uma thread do pool"""
+	termo_busca = requisicao.parametros.get('termo', '')
+	limite = max(requisicao.inteiro('limite', 10), 0)
+	cursor = requisicao.parametros.get('cursor')
+	filtros = {
+		campo: requisicao.parametros[campo]
+		for campo in api.FacetasOperadoras.CAMPOS if requisicao.parametros.get(campo)
+	}
+	aproximada = api.parametro_verdadeiro(requisicao.parametros.get('fuzzy'))
+	
+	# Validar parâmetros
+	if not termo_busca:
+		return erro('O parâmetro "termo" é obrigatório', 400)
+	
+	termos = api.termos_busca(termo_busca)
+	
+	# Posição a partir da qual continuar, quando há cursor
+	apos = None
+	if cursor:
+		try:
+			apos = api.decodificar_cursor(cursor, snapshot, termos, filtros, aproximada)
+		except api.CursorExpirado as e:
+			return erro(str(e), 410)
+		except ValueError as e:
+			return erro(str(e), 400)
+	
+	pagina = api.obter_pagina_busca(snapshot, termos, limite, apos, filtros, aproximada)
+	return resposta(api.json_pagina_busca(pagina, termo_busca))
+
+async def rota_busca(requisicao):
+	"""Rota para buscar operadoras por termo textual (mesmos parâmetros da API Flask)"""
+	snapshot = await obter_snapshot()
+	try:
+		return await calcular(calcular_busca, snapshot, requisicao)
+	except Exception as e:
+		print(f"Erro na busca: {str(e)}")
+		return erro(f'Erro ao processar a busca: {str(e)}', 500)
+
+async def rota_sugestoes(requisicao):
+	"""Rota de sugestões para autocompletar a busca"""
+	snapshot = await obter_snapshot()
+	prefixo = requisicao.parametros.get('prefixo', '')
+	limite = min(max(requisicao.inteiro('limite', 10), 0), 50)
+	
+	prefixo_normalizado = api.normalizar_texto_busca(prefixo)
+	if not prefixo_normalizado:
+		return erro('O parâmetro "prefixo" é obrigatório', 400)
+	
+	# Busca binária em arrays ordenados: rápida o bastante para rodar no próprio loop
+	sugestoes = snapshot.sugestoes.sugerir(prefixo_normalizado, limite)
+	return resposta({
+		'total': len(sugestoes),
+		'prefixo': prefixo,
+		'sugestoes': sugestoes
+	})
+
+async def rota_detalhes(requisicao, registro_ans):
+	"""Rota para obter detalhes de uma operadora específica pelo registro ANS"""
+	snapshot = await obter_snapshot()
+	operadora = snapshot.detalhes_por_registro.get(api.normalizar_registro_ans(registro_ans))
+	if operadora is None:
+		return erro(f'Operadora com registro {registro_ans} não encontrada', 404)
+	return resposta(operadora)
+
+async def rota_detalhes_lote(requisicao):
+	"""Rota para obter os detalhes de várias operadoras em uma única requisição"""
+	snapshot = await obter_snapshot()
+	try:
+		corpo = json.loads(requisicao.corpo or b'null')
+	except ValueError:
+		corpo = None
+	if not isinstance(corpo, dict):
+		return erro('O corpo da requisição deve ser um objeto JSON com "registros_ans" e/ou "cnpjs"', 400)
+	
+	try:
+		registros_ans = api.ler_chaves_lote(corpo, 'registros_ans')
+		cnpjs = api.ler_chaves_lote(corpo, 'cnpjs')
+	except ValueError as e:
+		return erro(str(e), 400)
+	
+	total_chaves = len(registros_ans) + len(cnpjs)
+	if not total_chaves:
+		return erro('Informe ao menos um valor em "registros_ans" ou "cnpjs"', 400)
+	if total_chaves > api.LOTE_DETALHES_MAXIMO:
+		return erro(f'O lote pode ter no máximo {api.LOTE_DETALHES_MAXIMO} chaves', 413)
+	
+	def montar():
+		return b''.join(api.gerar_json_lote(api.resolver_lote_detalhes(snapshot, registros_ans, cnpjs)))
+	
+	return resposta(await calcular(montar))
+
+async def rota_modalidades(requisicao):
+	"""Rota para listar as modalidades disponíveis e quantidade de operadoras por modalidade"""
+	snapshot = await obter_snapshot()
+	modalidades = snapshot.facetas.contagens['modalidade']
+	return resposta({
+		'total': len(modalidades),
+		'modalidades': modalidades
+	})
+
+# Rotas: (método, padrão do caminho, função)
+ROTAS = [
+	('GET', re.compile(r'^/api/status$'), rota_status),
+	('GET', re.compile(r'^/api/operadoras/busca$'), rota_busca),
+	('GET', re.compile(r'^/api/operadoras/sugestoes$'), rota_sugestoes),
+	('GET', re.compile(r'^/api/operadoras/detalhes/([^/]+)$'), rota_detalhes),
+	('POST', re.compile(r'^/api/operadoras/detalhes$'), rota_detalhes_lote),
+	('GET', re.compile(r'^/api/operadoras/modalidades$'), rota_modalidades),
+]
+
+async def despachar(requisicao):
+	"""Encontra a rota da requisição e executa a função correspondente"""
+	metodo_nao_permitido = False
+	for metodo, padrao, funcao in ROTAS:
+		correspondencia = padrao.match(requisicao.caminho)
+		if correspondencia is None:
+			continue
+		if metodo != requisicao.metodo:
+			metodo_nao_permitido = True
+			continue
+		return await funcao(requisicao, *correspondencia.groups())
+	
+	if metodo_nao_permitido:
+		return erro('Método não permitido', 405)
+	return erro('Rota não encontrada', 404)
+
+async def iniciar_aplicacao():
+	"""Cria o limitador do pool no loop atual e carrega os dados antes de aceitar requisições"""
+	global vagas_calculo
+	vagas_calculo = asyncio.Semaphore(TAREFAS_PENDENTES_MAXIMO)
+	await obter_snapshot()
+
+async def ler_corpo(receive):
+	"""Lê o corpo completo da requisição a partir das mensagens ASGI"""
+	partes = []
+	tamanho = 0
+	while True:
+		mensagem = await receive()
+		if mensagem['type'] == 'http.disconnect':
+			return None
+		partes.append(mensagem.get('body', b''))
+		tamanho += len(partes[-1])
+		if tamanho > CORPO_TAMANHO_MAXIMO:
+			raise CorpoMuitoGrande('Corpo da requisição muito grande')
+		if not mensagem.get('more_body', False):
+			return b''.join(partes)
+
+async def app(scope, receive, send):
+	"""Aplicação ASGI com as rotas de consulta de operadoras"""
+	if scope['type'] == 'lifespan':
+		while True:
+			mensagem = await receive()
+			if mensagem['type'] == 'lifespan.startup':
+				await iniciar_aplicacao()
+				await send({'type': 'lifespan.startup.complete'})
+			elif mensagem['type'] == 'lifespan.shutdown':
+				executor_calculo.shutdown(wait=False)
+				await send({'type': 'lifespan.shutdown.complete'})
+				return
+	
+	if scope['type'] != 'http':
+		return
+	
+	# Servidores sem lifespan: iniciar na primeira requisição
+	if vagas_calculo is None:
+		await iniciar_aplicacao()
+	
+	try:
+		corpo = await asyncio.wait_for(ler_corpo(receive), TEMPO_LIMITE_REQUISICAO)
+		if corpo is None:
+			return
+		status, corpo_resposta = await asyncio.wait_for(
+			despachar(RequisicaoASGI(scope, corpo)), TEMPO_LIMITE_REQUISICAO
+		)
+	except asyncio.TimeoutError:
+		status, corpo_resposta = erro('Tempo limite da requisição esgotado', 504)
+	except CorpoMuitoGrande as e:
+		status, corpo_resposta = erro(str(e), 413)
+	except Exception as e:
+		print(f"Erro ao processar a requisição: {str(e)}")
+		status, corpo_resposta = erro(f'Erro ao processar a requisição: {str(e)}', 500)
+	
+	await send({
+		'type': 'http.response.start',
+		'status': status,
+		'headers': [
+			(b'content-type', b'application/json'),
+			(b'content-length', str(len(corpo_resposta)).encode('ascii')),
+			# Mesmo comportamento do flask_cors na API Flask
+			(b'access-control-allow-origin', b'*'),
+		]
+	})
+	await send({'type': 'http.response.body', 'body': corpo_resposta})
+
+async def responder_erro_conexao(escritor, mensagem, status):
+	"""
+	Responde um erro do próprio protocolo HTTP (antes de chegar à aplicação)
+	no servidor embutido e avisa que a conexão será encerrada
+	"""
+	_, corpo = erro(mensagem, status)
+	cabecalhos = [
+		f"HTTP/1.1 {status} {MENSAGENS_STATUS.get(status, '')}",
+		'Content-Type: application/json',
+		f"Content-Length: {len(corpo)}",
+		'Access-Control-Allow-Origin: *',
+		'Connection: close',
+	]
+	escritor.write('\r\n'.join(cabecalhos).encode('latin-1') + b'\r\n\r\n' + corpo)
+	await asyncio.wait_for(escritor.drain(), TEMPO_LIMITE_REQUISICAO)
+
+async def atender_conexao(leitor, escritor):
+	"""
+	Atende uma conexão HTTP/1.1 do servidor embutido, com keep-alive.
+	
+	Cada conexão é só uma corrotina esperando dados: clientes lentos ou
+	ociosos não ocupam threads, e conexões ociosas por mais de
+	TEMPO_OCIOSO_CONEXAO segundos são encerradas.
+	"""
+	try:
+		while True:
+			# Linha de requisição: "GET /api/status HTTP/1.1"
+			try:
+				linha = await asyncio.wait_for(leitor.readline(), TEMPO_OCIOSO_CONEXAO)
+			except asyncio.TimeoutError:
+				break
+			if not linha.strip():
+				break
+			try:
+				metodo, alvo, versao = linha.decode('latin-1').split()
+			except ValueError:
+				break
+			
+			# Cabeçalhos, até a linha em branco
+			cabecalhos = []
+			while True:
+				linha_cabecalho = await asyncio.wait_for(leitor.readline(), TEMPO_LIMITE_REQUISICAO)
+				if linha_cabecalho in (b'\r\n', b'\n', b''):
+					break
+				nome, _, valor = linha_cabecalho.decode('latin-1').partition(':')
+				cabecalhos.append((nome.strip().lower().encode('latin-1'), valor.strip().encode('latin-1')))
+			cabecalhos_dict = dict(cabecalhos)
+			
+			# Sem saber onde o corpo termina, a conexão não pode ser reaproveitada:
+			# responder o erro e encerrá-la. O corpo em chunks não é suportado; com
+			# Transfer-Encoding e Content-Length juntos, cada servidor de um proxy
+			# poderia separar as requisições em pontos diferentes (request smuggling)
+			if b'transfer-encoding' in cabecalhos_dict:
+				if b'content-length' in cabecalhos_dict:
+					await responder_erro_conexao(escritor, 'Transfer-Encoding e Content-Length na mesma requisição', 400)
+				else:
+					await responder_erro_conexao(escritor, 'Transfer-Encoding não suportado; envie Content-Length', 411)
+				break
+			try:
+				# Vários Content-Length diferentes são tão ambíguos quanto um inválido
+				if len({valor for nome, valor in cabecalhos if nome == b'content-length'}) > 1:
+					raise ValueError
+				tamanho = int(cabecalhos_dict.get(b'content-length', b'0') or 0)
+				if tamanho < 0:
+					raise ValueError
+			except ValueError:
+				await responder_erro_conexao(escritor, 'Cabeçalho Content-Length inválido', 400)
+				break
+			if tamanho > CORPO_TAMANHO_MAXIMO:
+				await responder_erro_conexao(escritor, 'Corpo da requisição muito grande', 413)
+				break
+			corpo = await asyncio.wait_for(leitor.readexactly(tamanho), TEMPO_LIMITE_REQUISICAO) if tamanho else b''
+			
+			# HTTP/1.1 mantém a conexão por padrão; HTTP/1.0 só com "Connection: keep-alive"
+			conexao = cabecalhos_dict.get(b'connection', b'').lower()
+			manter_conexao = conexao != b'close' if versao == 'HTTP/1.1' else conexao == b'keep-alive'
+			
+			caminho, _, consulta = alvo.partition('?')
+			scope = {
+				'type': 'http',
+				'http_version': versao.split('/')[-1],
+				'method': metodo.upper(),
+				'path': unquote(caminho),
+				'query_string': consulta.encode('latin-1'),
+				'headers': cabecalhos,
+			}
+			
+			async def receive():
+				return {'type': 'http.request', 'body': corpo, 'more_body': False}
+			
+			resposta_http = {}
+			
+			async def send(mensagem):
+				if mensagem['type'] == 'http.response.start':
+					resposta_http['status'] = mensagem['status']
+					resposta_http['cabecalhos'] = mensagem['headers']
+				elif mensagem['type'] == 'http.response.body':
+					status = resposta_http['status']
+					linhas = [f"HTTP/1.1 {status} {MENSAGENS_STATUS.get(status, '')}".encode('latin-1')]
+					linhas += [nome + b': ' + valor for nome, valor in resposta_http['cabecalhos']]
+					linhas.append(b'Connection: ' + (b'keep-alive' if manter_conexao else b'close'))
+					escritor.write(b'\r\n'.join(linhas) + b'\r\n\r\n' + mensagem.get('body', b''))
+					# Clientes que não leem a resposta não seguram a conexão para sempre
+					await asyncio.wait_for(escritor.drain(), TEMPO_LIMITE_REQUISICAO)
+			
+			await app(scope, receive, send)
+			if not manter_conexao:
+				break
+	except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+		pass
+	finally:
+		escritor.close()
+
+async def servir_embutido(host, porta):
+	"""Servidor HTTP asyncio embutido, usado quando o uvicorn não está instalado"""
+	await iniciar_aplicacao()
+	servidor = await asyncio.start_server(atender_conexao, host, porta)
+	print(f"Servidor API assíncrono na porta {porta} (servidor embutido, {THREADS_CALCULO} threads de cálculo)")
+	async with servidor:
+		await servidor.serve_forever()
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Servidor API assíncrono (ASGI) de consulta de operadoras ANS')
+	parser.add_argument('--embutido', action='store_true',
+						help='Usar o servidor asyncio embutido mesmo com o uvicorn instalado')
+	argumentos = parser.parse_args()
+	
+	porta = int(os.environ.get("PORT", 5000))
+	
+	if uvicorn is not None and not argumentos.embutido:
+		print(f"Iniciando servidor API assíncrono (uvicorn) na porta {porta}...")
+		uvicorn.run(app, host='0.0.0.0', port=porta, lifespan='on')
+	else:
+		try:
+			asyncio.run(servir_embutido('0.0.0.0', porta))
+		except KeyboardInterrupt:
+			sys.exit(0)
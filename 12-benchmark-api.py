@@ -0,0 +1,661 @@
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+# psutil é opcional: sem ele, a memória do servidor é lida de /proc (apenas Linux)
+try:
+	import psutil
+except ImportError:
+	psutil = None
+
+DIRETORIO_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+# Reaproveitar criar_dados_exemplo e as colunas do Cadop da API (8-api-server.py).
+# O nome do arquivo não é um identificador Python válido, então ele é carregado pelo caminho.
+_especificacao = importlib.util.spec_from_file_location('api_server', os.path.join(DIRETORIO_PROJETO, '8-api-server.py'))
+api = importlib.util.module_from_spec(_especificacao)
+_especificacao.loader.exec_module(api)
+
+# Coleção cujas requisições formam a mistura de carga do benchmark
+ARQUIVO_COLECAO = os.path.join(DIRETORIO_PROJETO, '10-postman-collection.json')
+
+# Endereço usado nas URLs da coleção Postman
+URL_COLECAO = 'http://localhost:5000'
+
+# Termos comuns nos nomes das operadoras, do mais para o menos frequente
+TERMOS_FREQUENTES = [
+	'SAÚDE', 'UNIMED', 'ASSISTÊNCIA', 'MÉDICA', 'PLANO', 'ODONTO', 'SERVIÇOS', 'HOSPITAL',
+	'COOPERATIVA', 'BENEFÍCIOS', 'VIDA', 'CLÍNICA', 'ODONTOLÓGICA', 'SEGURADORA', 'SOCIEDADE',
+	'BENEFICENTE', 'PAULISTA', 'NACIONAL', 'CENTRO', 'SÃO', 'JOSÉ', 'SANTA', 'CASA', 'MISERICÓRDIA',
+	'INTEGRAL', 'PREVIDÊNCIA', 'ADMINISTRADORA', 'ASSOCIAÇÃO', 'FUNDAÇÃO', 'AMIL', 'BRADESCO',
+	'SULAMÉRICA', 'HAPVIDA', 'PORTO', 'SEGURO', 'NOTREDAME', 'INTERMÉDICA', 'GOLDEN', 'CROSS', 'PRÓ'
+]
+
+# Sílabas para formar a cauda de termos raros dos nomes
+SILABAS = ['BRA', 'CÃO', 'LU', 'MA', 'RÊ', 'TI', 'VO', 'ZÉ', 'GUA', 'ÇA', 'NÔ', 'PI', 'RA', 'SO', 'TÁ', 'XU']
+
+# Sufixos da razão social
+SUFIXOS_RAZAO = ['S.A.', 'LTDA', 'LTDA.', 'COOPERATIVA DE TRABALHO MÉDICO', 'ADMINISTRADORA DE BENEFÍCIOS LTDA', 'EIRELI']
+
+# Modalidades e sua participação aproximada no Cadop
+MODALIDADES = [
+	('Cooperativa Médica', 0.26), ('Medicina de Grupo', 0.24), ('Odontologia de Grupo', 0.14),
+	('Autogestão', 0.12), ('Administradora de Benefícios', 0.1), ('Cooperativa Odontológica', 0.08),
+	('Filantropia', 0.04), ('Seguradora Especializada em Saúde', 0.02)
+]
+
+# Cidades (com UF e DDD) e sua participação aproximada
+CIDADES = [
+	('SÃO PAULO', 'SP', '11', 0.25), ('RIO DE JANEIRO', 'RJ', '21', 0.12), ('BELO HORIZONTE', 'MG', '31', 0.07),
+	('CURITIBA', 'PR', '41', 0.06), ('PORTO ALEGRE', 'RS', '51', 0.05), ('SALVADOR', 'BA', '71', 0.04),
+	('GOIÂNIA', 'GO', '62', 0.04), ('BRASÍLIA', 'DF', '61', 0.04), ('RECIFE', 'PE', '81', 0.04),
+	('FORTALEZA', 'CE', '85', 0.03), ('CAMPINAS', 'SP', '19', 0.03), ('RIBEIRÃO PRETO', 'SP', '16', 0.03),
+	('JOINVILLE', 'SC', '47', 0.03), ('FLORIANÓPOLIS', 'SC', '48', 0.03), ('VITÓRIA', 'ES', '27', 0.03),
+	('SÃO JOSÉ DOS CAMPOS', 'SP', '12', 0.03), ('MACEIÓ', 'AL', '82', 0.02), ('BELÉM', 'PA', '91', 0.02),
+	('CUIABÁ', 'MT', '65', 0.02), ('JOÃO PESSOA', 'PB', '83', 0.02)
+]
+
+BAIRROS = ['CENTRO', 'BELA VISTA', 'JARDIM PAULISTA', 'BOTAFOGO', 'SAVASSI', 'BATEL', 'MOINHOS DE VENTO', 'PITUBA', 'SÃO FRANCISCO', 'LIBERDADE']
+NOMES_PESSOAS = ['MARIA', 'JOSÉ', 'JOÃO', 'ANA', 'ANTÔNIO', 'FRANCISCO', 'LÚCIA', 'CARLOS', 'PAULO', 'MÁRCIA']
+SOBRENOMES = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'PEREIRA', 'CONCEIÇÃO', 'ARAÚJO', 'GONÇALVES', 'MAGALHÃES', 'ASSUNÇÃO']
+CARGOS = ['Diretor', 'Diretora', 'Presidente', 'Diretor Presidente', 'Superintendente']
+
+def pesos_zipf(quantidade, expoente=1.1):
+	"""Probabilidades no padrão de Zipf: o primeiro item é o mais frequente"""
+	pesos = 1.0 / np.arange(1, quantidade + 1) ** expoente
+	return pesos / pesos.sum()
+
+def digitos_verificadores_cnpj(bases):
+	"""Calcula os dois dígitos verificadores para uma matriz de bases de CNPJ (12 dígitos por linha)"""
+	pesos_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+	pesos_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+	resto = (bases * pesos_1).sum(axis=1) % 11
+	dv1 = np.where(resto < 2, 0, 11 - resto)
+	com_dv1 = np.column_stack([bases, dv1])
+	resto = (com_dv1 * pesos_2).sum(axis=1) % 11
+	dv2 = np.where(resto < 2, 0, 11 - resto)
+	return np.column_stack([com_dv1, dv2])
+
+def gerar_operadoras_sinteticas(quantidade, semente=42, proporcao_cnpj_repetido=0.02):
+	"""
+	Gera um DataFrame de operadoras no formato de criar_dados_exemplo com a
+	quantidade pedida de linhas, para testes de carga.
+	
+	As primeiras linhas são as operadoras de exemplo (as requisições da coleção
+	Postman continuam encontrando resultados); as demais são sintéticas, com
+	termos dos nomes em frequência desigual (poucos muito comuns, como "SAÚDE"
+	e "UNIMED", e uma longa cauda de termos raros), texto acentuado, registros
+	ANS únicos e uma parte dos CNPJs repetidos.
+	"""
+	rng = np.random.default_rng(semente)
+	exemplo = api.criar_dados_exemplo()
+	if quantidade <= len(exemplo):
+		return exemplo.head(quantidade).reset_index(drop=True)
+	total = quantidade - len(exemplo)
+	
+	# Vocabulário: termos frequentes seguidos de uma cauda de termos formados por sílabas
+	cauda = [a + b + c for a in SILABAS for b in SILABAS for c in SILABAS]
+	random.Random(semente).shuffle(cauda)
+	vocabulario = np.array(TERMOS_FREQUENTES + cauda)
+	probabilidades = pesos_zipf(len(vocabulario))
+	
+	# Razão social: 2 a 4 termos e um sufixo; nome fantasia: os dois primeiros termos
+	quantidade_termos = rng.integers(2, 5, total)
+	termos = vocabulario[rng.choice(len(vocabulario), size=(total, 4), p=probabilidades)]
+	sufixos = np.array(SUFIXOS_RAZAO)[rng.integers(0, len(SUFIXOS_RAZAO), total)]
+	razoes = [' '.join(linha[:n]) + ' ' + sufixo for linha, n, sufixo in zip(termos.tolist(), quantidade_termos, sufixos)]
+	fantasias = [' '.join(linha[:2]) for linha in termos.tolist()]
+	
+	# Registros ANS únicos, que não colidem com os de exemplo
+	registros = 100000 + rng.permutation(max(total * 2, 900000))[:total]
+	usados = set(exemplo['registro_ans'].astype(str))
+	registros = [str(registro) for registro in registros if str(registro) not in usados][:total]
+	while len(registros) < total:
+		registros.append(str(1000000 + len(registros)))
+	
+	# CNPJs válidos, com uma parte repetida (mesma empresa com mais de um registro)
+	cnpjs = digitos_verificadores_cnpj(rng.integers(0, 10, (total, 12)))
+	cnpjs = np.array([''.join(map(str, linha)) for linha in cnpjs.tolist()])
+	repetidos = rng.random(total) < proporcao_cnpj_repetido
+	repetidos[0] = False
+	origem = (rng.random(total) * np.arange(total)).astype(int)
+	cnpjs[repetidos] = cnpjs[origem[repetidos]]
+	
+	nomes_modalidades, pesos_modalidades = zip(*MODALIDADES)
+	modalidades = np.array(nomes_modalidades)[rng.choice(len(MODALIDADES), total, p=np.array(pesos_modalidades) / sum(pesos_modalidades))]
+	
+	pesos_cidades = np.array([cidade[3] for cidade in CIDADES])
+	indices_cidades = rng.choice(len(CIDADES), total, p=pesos_cidades / pesos_cidades.sum())
+	cidades = np.array([cidade[0] for cidade in CIDADES])[indices_cidades]
+	ufs = np.array([cidade[1] for cidade in CIDADES])[indices_cidades]
+	ddds = np.array([cidade[2] for cidade in CIDADES])[indices_cidades]
+	
+	telefones = rng.integers(30000000, 39999999, total).astype(str)
+	inicio_registros = datetime(1998, 1, 1)
+	datas = [(inicio_registros + timedelta(days=int(dias))).strftime('%d/%m/%Y') for dias in rng.integers(0, 9500, total)]
+	
+	sinteticas = pd.DataFrame({
+		'registro_ans': registros,
+		'cnpj': cnpjs,
+		'razao_social': razoes,
+		'nome_fantasia': fantasias,
+		'modalidade': modalidades,
+		'logradouro': ['RUA ' + termo for termo in termos[:, 3].tolist()],
+		'numero': rng.integers(1, 5000, total).astype(str),
+		'complemento': np.where(rng.random(total) < 0.4, 'SALA ' + rng.integers(1, 2000, total).astype(str), ''),
+		'bairro': np.array(BAIRROS)[rng.integers(0, len(BAIRROS), total)],
+		'cidade': cidades,
+		'uf': ufs,
+		'cep': rng.integers(1000000, 99999999, total).astype(str),
+		'ddd': ddds,
+		'telefone': telefones,
+		'fax': telefones,
+		'email': [f"contato{registro}@operadora.com.br" for registro in registros],
+		'representante': [
+			f"{nome} {sobrenome}" for nome, sobrenome in zip(
+				np.array(NOMES_PESSOAS)[rng.integers(0, len(NOMES_PESSOAS), total)],
+				np.array(SOBRENOMES)[rng.integers(0, len(SOBRENOMES), total)]
+			)
+		],
+		'cargo_representante': np.array(CARGOS)[rng.integers(0, len(CARGOS), total)],
+		'data_registro': datas
+	})
+	
+	return pd.concat([exemplo, sinteticas], ignore_index=True)
+
+def gravar_csv_cadop(df, caminho):
+	"""Grava as operadoras no formato do CSV de operadoras ativas (Cadop), lido pela API"""
+	os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+	nomes_cadop = {nome_api: nome_csv for nome_csv, nome_api in api.COLUNAS_CADOP.items()}
+	df.rename(columns=nomes_cadop).to_csv(caminho, sep=';', index=False, encoding='utf-8')
+
+def rotas_servidor(servidor):
+	"""
+	Rotas [(método, expressão)] implementadas pelo servidor, ou None se ele
+	implementa todas as rotas da coleção. O servidor ASGI atende só parte das
+	rotas da API Flask; as demais respondem 404 e não podem entrar na mistura.
+	"""
+	if servidor != 'asgi':
+		return None
+	especificacao = importlib.util.spec_from_file_location('api_asgi', os.path.join(DIRETORIO_PROJETO, '11-api-server-asgi.py'))
+	modulo = importlib.util.module_from_spec(especificacao)
+	especificacao.loader.exec_module(modulo)
+	return [(metodo, padrao) for metodo, padrao, _ in modulo.ROTAS]
+
+def status_esperados(item):
+	"""
+	Status aceitos para um item da coleção: os códigos dos exemplos de resposta
+	salvos no item (ex.: 400 na busca sem termo) ou None para qualquer 2xx/304
+	"""
+	codigos = {resposta['code'] for resposta in item.get('response', []) if resposta.get('code')}
+	return frozenset(codigos) or None
+
+def resposta_esperada(status, esperados):
+	"""Indica se o status é o esperado para a requisição"""
+	if esperados:
+		return status in esperados
+	return 200 <= status < 300 or status == 304
+
+def carregar_mistura(arquivo_colecao, servidor=None):
+	"""
+	Lê as requisições da coleção Postman: lista de (nome, método, caminho,
+	cabeçalhos, corpo, status esperados) e a lista dos nomes deixados de fora
+	por não serem implementados pelo servidor
+	"""
+	with open(arquivo_colecao, 'r', encoding='utf-8') as arquivo:
+		colecao = json.load(arquivo)
+	
+	rotas = rotas_servidor(servidor)
+	mistura = []
+	ignoradas = []
+	for item in colecao['item']:
+		requisicao = item['request']
+		url = requisicao['url']['raw']
+		caminho = url[len(URL_COLECAO):] if url.startswith(URL_COLECAO) else urlsplit(url).path
+		# As demonstrações contábeis não fazem parte dos dados sintéticos
+		if caminho.startswith('/api/demonstracoes'):
+			continue
+		# Só as rotas que o servidor implementa, para que todos meçam a mesma carga
+		if rotas is not None and not any(
+			metodo == requisicao['method'] and padrao.match(caminho.partition('?')[0]) for metodo, padrao in rotas
+		):
+			ignoradas.append(item['name'])
+			continue
+		# O Postman aceita espaços e acentos na URL; o http.client precisa deles codificados
+		caminho = quote(caminho, safe="/?&=%:+,;@-._~")
+		cabecalhos = {cabecalho['key']: cabecalho['value'] for cabecalho in requisicao.get('header', [])}
+		corpo = requisicao.get('body', {}).get('raw')
+		mistura.append((item['name'], requisicao['method'], caminho, cabecalhos,
+						corpo.encode('utf-8') if corpo else None, status_esperados(item)))
+	return mistura, ignoradas
+
+def memoria_processos(pid):
+	"""
+	Memória do processo e de todos os seus filhos, em MB: (RSS somado, PSS somado).
+	
+	No modo pré-fork, o RSS somado conta várias vezes as páginas compartilhadas
+	entre os workers; o PSS divide cada página entre os processos que a usam.
+	Retorna (None, None) se não for possível medir.
+	"""
+	if psutil is not None:
+		try:
+			processos = [psutil.Process(pid)]
+			processos += processos[0].children(recursive=True)
+			rss = sum(processo.memory_info().rss for processo in processos)
+			pss = None
+			try:
+				pss = sum(processo.memory_full_info().pss for processo in processos)
+			except (AttributeError, psutil.Error):
+				pass
+			return rss / 2**20, pss / 2**20 if pss is not None else None
+		except psutil.Error:
+			return None, None
+	
+	if not os.path.isdir('/proc'):
+		return None, None
+	
+	# Linux sem psutil: descobrir os filhos pelo PPID de cada processo em /proc
+	filhos = {}
+	for entrada in os.listdir('/proc'):
+		if not entrada.isdigit():
+			continue
+		try:
+			with open(f'/proc/{entrada}/stat', 'r') as arquivo:
+				ppid = int(arquivo.read().rsplit(')', 1)[1].split()[1])
+		except (OSError, ValueError, IndexError):
+			continue
+		filhos.setdefault(ppid, []).append(int(entrada))
+	
+	pendentes = [pid]
+	rss = pss = 0
+	while pendentes:
+		atual = pendentes.pop()
+		pendentes.extend(filhos.get(atual, []))
+		for arquivo_memoria, campo in ((f'/proc/{atual}/status', 'VmRSS:'), (f'/proc/{atual}/smaps_rollup', 'Pss:')):
+			try:
+				with open(arquivo_memoria, 'r') as arquivo:
+					for linha in arquivo:
+						if linha.startswith(campo):
+							valor = int(linha.split()[1]) / 1024
+							if campo == 'VmRSS:':
+								rss += valor
+							else:
+								pss += valor
+							break
+			except OSError:
+				pass
+	return rss, pss or None
+
+def iniciar_servidor(modo, porta, diretorio, workers, threads):
+	"""Inicia o servidor da API em um subprocesso, com o diretório de trabalho do conjunto de dados"""
+	if modo == 'asgi':
+		comando = [sys.executable, os.path.join(DIRETORIO_PROJETO, '11-api-server-asgi.py'), '--embutido']
+	elif modo == 'producao':
+		comando = [sys.executable, os.path.join(DIRETORIO_PROJETO, '8-api-server.py'), '--producao',
+				   '--workers', str(workers), '--threads', str(threads)]
+	else:
+		# Sem depurador e sem o processo do recarregador, para medir só o servidor
+		comando = [sys.executable, os.path.join(DIRETORIO_PROJETO, '8-api-server.py'), '--sem-depuracao']
+	
+	ambiente = dict(os.environ, PORT=str(porta), API_THREADS=str(threads), API_INTERVALO_RECARGA='0')
+	return subprocess.Popen(comando, cwd=diretorio, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def porta_livre(porta):
+	"""Verifica se a porta local está livre (um servidor anterior pode ainda estar encerrando)"""
+	with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as teste:
+		# Como os servidores, ignorar conexões antigas em TIME_WAIT
+		teste.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		try:
+			teste.bind(('127.0.0.1', porta))
+			return True
+		except OSError:
+			return False
+
+def aguardar_servidor(host, porta, tempo_limite, processo=None):
+	"""Espera o servidor responder /api/status com os dados carregados"""
+	limite = time.monotonic() + tempo_limite
+	while time.monotonic() < limite:
+		if processo is not None and processo.poll() is not None:
+			raise RuntimeError(f'O servidor terminou durante a inicialização (código {processo.returncode})')
+		try:
+			conexao = http.client.HTTPConnection(host, porta, timeout=5)
+			conexao.request('GET', '/api/status')
+			resposta = conexao.getresponse()
+			dados = json.loads(resposta.read())
+			conexao.close()
+			if resposta.status == 200 and dados.get('dados_carregados'):
+				return dados
+		except (OSError, ValueError, http.client.HTTPException):
+			pass
+		time.sleep(0.5)
+	raise TimeoutError(f'O servidor não respondeu em {tempo_limite} segundos')
+
+def encerrar_servidor(processo):
+	"""Encerra o servidor com SIGTERM (encerramento gracioso) e força se ele não terminar"""
+	if processo.poll() is not None:
+		return
+	processo.terminate()
+	try:
+		processo.wait(timeout=30)
+	except subprocess.TimeoutExpired:
+		processo.kill()
+		processo.wait()
+
+def executar_cliente(host, porta, mistura, fim_aquecimento, fim, semente, medicoes, trava):
+	"""
+	Cliente de carga: repete a mistura de requisições, em ordem embaralhada,
+	em uma conexão keep-alive, até o fim do teste. Só as requisições feitas
+	depois do aquecimento são registradas.
+	"""
+	gerador = random.Random(semente)
+	ordem = list(range(len(mistura)))
+	locais = []
+	conexao = None
+	
+	while time.perf_counter() < fim:
+		gerador.shuffle(ordem)
+		for indice in ordem:
+			if time.perf_counter() >= fim:
+				break
+			nome, metodo, caminho, cabecalhos, corpo, _ = mistura[indice]
+			inicio = time.perf_counter()
+			try:
+				if conexao is None:
+					conexao = http.client.HTTPConnection(host, porta, timeout=30)
+				conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+				resposta = conexao.getresponse()
+				resposta.read()
+				status = resposta.status
+				if resposta.getheader('Connection', '').lower() == 'close':
+					conexao.close()
+					conexao = None
+			except (OSError, http.client.HTTPException):
+				status = 0
+				if conexao is not None:
+					conexao.close()
+				conexao = None
+			duracao = time.perf_counter() - inicio
+			if inicio >= fim_aquecimento:
+				locais.append((indice, status, duracao))
+	
+	if conexao is not None:
+		conexao.close()
+	with trava:
+		medicoes.extend(locais)
+
+def percentis_ms(duracoes):
+	"""p50, p95, p99 e máximo das durações (segundos), em milissegundos"""
+	if len(duracoes) == 0:
+		return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+	p50, p95, p99 = np.percentile(duracoes, [50, 95, 99]) * 1000
+	return {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3), 'max_ms': round(float(np.max(duracoes)) * 1000, 3)}
+
+def executar_benchmark(argumentos):
+	"""Gera os dados, inicia o servidor, aplica a carga e devolve o resultado"""
+	mistura, ignoradas = carregar_mistura(argumentos.colecao, None if argumentos.url else argumentos.servidor)
+	if ignoradas:
+		print(f"Requisições fora da mistura (rotas que o servidor {argumentos.servidor} não implementa): {', '.join(ignoradas)}")
+	
+	processo = None
+	diretorio_temporario = None
+	if argumentos.url:
+		endereco = urlsplit(argumentos.url)
+		host, porta = endereco.hostname, endereco.port or 80
+		pid = argumentos.pid
+	else:
+		# Conjunto de dados sintético no caminho que a API lê, em um diretório temporário
+		diretorio_temporario = tempfile.TemporaryDirectory(prefix='benchmark_api_')
+		print(f"Gerando {argumentos.linhas} operadoras sintéticas...")
+		df = gerar_operadoras_sinteticas(argumentos.linhas, argumentos.semente)
+		gravar_csv_cadop(df, os.path.join(diretorio_temporario.name, api.ARQUIVO_OPERADORAS))
+		
+		host, porta = '127.0.0.1', argumentos.porta
+		if not porta_livre(porta):
+			diretorio_temporario.cleanup()
+			raise RuntimeError(f'A porta {porta} já está em uso; escolha outra com --porta')
+		print(f"Iniciando o servidor ({argumentos.servidor}) na porta {porta}...")
+		processo = iniciar_servidor(argumentos.servidor, porta, diretorio_temporario.name, argumentos.workers, argumentos.threads)
+		pid = processo.pid
+	
+	try:
+		inicio_carga = time.perf_counter()
+		aguardar_servidor(host, porta, argumentos.tempo_inicio, processo)
+		tempo_inicio_servidor = time.perf_counter() - inicio_carga
+		
+		# Medir a memória do servidor durante o teste
+		amostras_memoria = []
+		parar_amostragem = threading.Event()
+		
+		def amostrar_memoria():
+			while not parar_amostragem.wait(0.5):
+				amostras_memoria.append(memoria_processos(pid))
+		
+		amostrador = None
+		if pid:
+			amostras_memoria.append(memoria_processos(pid))
+			amostrador = threading.Thread(target=amostrar_memoria, daemon=True)
+			amostrador.start()
+		
+		print(f"Aplicando carga: {argumentos.concorrencia} clientes, {argumentos.duracao}s (+{argumentos.aquecimento}s de aquecimento)...")
+		medicoes = []
+		trava = threading.Lock()
+		comeco = time.perf_counter()
+		fim_aquecimento = comeco + argumentos.aquecimento
+		fim = fim_aquecimento + argumentos.duracao
+		clientes = [
+			threading.Thread(
+				target=executar_cliente,
+				args=(host, porta, mistura, fim_aquecimento, fim, argumentos.semente + numero, medicoes, trava)
+			)
+			for numero in range(argumentos.concorrencia)
+		]
+		for cliente in clientes:
+			cliente.start()
+		for cliente in clientes:
+			cliente.join()
+		
+		if amostrador is not None:
+			parar_amostragem.set()
+			amostrador.join()
+	finally:
+		if processo is not None:
+			encerrar_servidor(processo)
+		if diretorio_temporario is not None:
+			diretorio_temporario.cleanup()
+	
+	# Consolidar as medições. Respostas inesperadas (falhas de conexão, 5xx, rota
+	# inexistente...) contam como erro e ficam fora da vazão e das latências
+	indices = np.array([indice for indice, _, _ in medicoes], dtype=np.int64)
+	status = np.array([codigo for _, codigo, _ in medicoes], dtype=np.int64)
+	duracoes = np.array([duracao for _, _, duracao in medicoes], dtype=np.float64)
+	esperadas = np.array([resposta_esperada(codigo, mistura[indice][5]) for indice, codigo, _ in medicoes], dtype=bool)
+	
+	rss = [amostra[0] for amostra in amostras_memoria if amostra[0] is not None]
+	pss = [amostra[1] for amostra in amostras_memoria if amostra[1] is not None]
+	
+	resultado = {
+		'data_hora': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+		'parametros': {
+			'servidor': 'externo' if argumentos.url else argumentos.servidor,
+			'linhas': None if argumentos.url else argumentos.linhas,
+			'concorrencia': argumentos.concorrencia,
+			'duracao_s': argumentos.duracao,
+			'workers': argumentos.workers,
+			'threads': argumentos.threads,
+			'python': platform.python_version(),
+			'plataforma': platform.platform(),
+			'mistura': [nome for nome, *_ in mistura]
+		},
+		'tempo_inicio_servidor_s': round(tempo_inicio_servidor, 3),
+		'requisicoes': int(len(duracoes)),
+		'erros': int(np.sum(~esperadas)),
+		'vazao_rps': round(int(esperadas.sum()) / argumentos.duracao, 2),
+		**percentis_ms(duracoes[esperadas]),
+		'rss_inicial_mb': round(rss[0], 1) if rss else None,
+		'rss_pico_mb': round(max(rss), 1) if rss else None,
+		'pss_pico_mb': round(max(pss), 1) if pss else None,
+		'por_requisicao': {}
+	}
+	
+	for indice, (nome, metodo, caminho, _, _, _) in enumerate(mistura):
+		selecao = indices == indice
+		codigos, contagens = np.unique(status[selecao], return_counts=True)
+		resultado['por_requisicao'][nome] = {
+			'metodo': metodo,
+			'caminho': caminho,
+			'requisicoes': int(selecao.sum()),
+			'erros': int(np.sum(selecao & ~esperadas)),
+			'status': {str(codigo): int(contagem) for codigo, contagem in zip(codigos, contagens)},
+			**percentis_ms(duracoes[selecao & esperadas])
+		}
+	
+	return resultado
+
+def formatar_ms(valor):
+	"""Formata uma latência em ms para a tabela (traço se ausente)"""
+	return f"{valor:9.2f}" if valor is not None else f"{'-':>9}"
+
+def imprimir_resultado(resultado):
+	"""Mostra o resumo do benchmark no terminal"""
+	parametros = resultado['parametros']
+	print()
+	print(f"Servidor: {parametros['servidor']}  Linhas: {parametros['linhas']}  "
+		  f"Clientes: {parametros['concorrencia']}  Duração: {parametros['duracao_s']}s")
+	print(f"Início do servidor: {resultado['tempo_inicio_servidor_s']}s")
+	print(f"Requisições: {resultado['requisicoes']}  Erros: {resultado['erros']}  Vazão: {resultado['vazao_rps']} req/s")
+	print(f"Latência (ms): p50 {resultado['p50_ms']}  p95 {resultado['p95_ms']}  p99 {resultado['p99_ms']}  máx {resultado['max_ms']}")
+	print(f"Memória (MB): RSS inicial {resultado['rss_inicial_mb']}  RSS pico {resultado['rss_pico_mb']}  PSS pico {resultado['pss_pico_mb']}")
+	print()
+	print(f"{'Requisição':<40} {'Qtd':>7} {'Erros':>6} {'p50':>9} {'p95':>9} {'p99':>9}  Status")
+	for nome, dados in resultado['por_requisicao'].items():
+		status = ', '.join(f"{codigo}: {quantidade}" for codigo, quantidade in dados['status'].items())
+		print(f"{nome[:40]:<40} {dados['requisicoes']:>7} {dados.get('erros', 0):>6} {formatar_ms(dados['p50_ms'])} "
+			  f"{formatar_ms(dados['p95_ms'])} {formatar_ms(dados['p99_ms'])}  {status}")
+
+def comparar_resultados(arquivo_base, arquivo_novo, tolerancia):
+	"""
+	Compara duas execuções e aponta regressões acima da tolerância (em %).
+	Vazão menor ou latência/memória maiores que a tolerância contam como regressão.
+	Retorna a quantidade de regressões encontradas.
+	"""
+	with open(arquivo_base, 'r', encoding='utf-8') as arquivo:
+		base = json.load(arquivo)
+	with open(arquivo_novo, 'r', encoding='utf-8') as arquivo:
+		novo = json.load(arquivo)
+	
+	# Vazão e latências gerais só são comparáveis com a mesma mistura de requisições
+	mistura_base = set(base['parametros'].get('mistura', base['por_requisicao']))
+	mistura_nova = set(novo['parametros'].get('mistura', novo['por_requisicao']))
+	mesma_mistura = mistura_base == mistura_nova
+	if not mesma_mistura:
+		print("Misturas de requisições diferentes: vazão e latências gerais não são comparadas.")
+		for rotulo, nomes in (('Só na base', mistura_base - mistura_nova), ('Só no novo', mistura_nova - mistura_base)):
+			if nomes:
+				print(f"  {rotulo}: {', '.join(sorted(nomes))}")
+		print()
+	
+	# (rótulo, valor base, valor novo, maior é melhor)
+	metricas = []
+	if mesma_mistura:
+		metricas += [
+			('vazão (req/s)', base['vazao_rps'], novo['vazao_rps'], True),
+			('p50 (ms)', base['p50_ms'], novo['p50_ms'], False),
+			('p95 (ms)', base['p95_ms'], novo['p95_ms'], False),
+			('p99 (ms)', base['p99_ms'], novo['p99_ms'], False),
+		]
+	metricas += [
+		('RSS pico (MB)', base['rss_pico_mb'], novo['rss_pico_mb'], False),
+		('PSS pico (MB)', base.get('pss_pico_mb'), novo.get('pss_pico_mb'), False),
+	]
+	for nome, dados in novo['por_requisicao'].items():
+		if nome in base['por_requisicao']:
+			metricas.append((f'{nome} p95 (ms)', base['por_requisicao'][nome]['p95_ms'], dados['p95_ms'], False))
+	
+	regressoes = 0
+	if novo['erros'] > base['erros']:
+		print(f"Erros: {base['erros']} -> {novo['erros']}  REGRESSÃO\n")
+		regressoes += 1
+	print(f"{'Métrica':<52} {'Base':>11} {'Novo':>11} {'Variação':>9}")
+	for rotulo, valor_base, valor_novo, maior_melhor in metricas:
+		if not valor_base or valor_novo is None:
+			continue
+		variacao = (valor_novo - valor_base) / valor_base * 100
+		piorou = -variacao if maior_melhor else variacao
+		marcador = ''
+		if piorou > tolerancia:
+			marcador = '  REGRESSÃO'
+			regressoes += 1
+		print(f"{rotulo[:52]:<52} {valor_base:>11.2f} {valor_novo:>11.2f} {variacao:>+8.1f}%{marcador}")
+	
+	print()
+	print(f"{regressoes} regressão(ões) acima de {tolerancia}%." if regressoes else f"Nenhuma regressão acima de {tolerancia}%.")
+	return regressoes
+
+def main():
+	parser = argparse.ArgumentParser(description='Gerador de dados sintéticos e benchmark de carga da API de operadoras')
+	subcomandos = parser.add_subparsers(dest='comando', required=True)
+	
+	gerar = subcomandos.add_parser('gerar', help='Gera um CSV sintético no formato do Cadop')
+	gerar.add_argument('linhas', type=int, help='Quantidade de operadoras')
+	gerar.add_argument('--saida', default=api.ARQUIVO_OPERADORAS, help='Arquivo CSV de saída')
+	gerar.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório')
+	
+	executar = subcomandos.add_parser('executar', help='Executa o benchmark com a mistura da coleção Postman')
+	executar.add_argument('--linhas', type=int, default=1000, help='Quantidade de operadoras sintéticas')
+	executar.add_argument('--servidor', choices=['producao', 'asgi', 'flask'], default='producao',
+						  help='Servidor iniciado para o teste')
+	executar.add_argument('--url', help='Testar um servidor já em execução (não gera dados nem inicia servidor)')
+	executar.add_argument('--pid', type=int, help='PID do servidor externo, para medir a memória')
+	executar.add_argument('--porta', type=int, default=5099, help='Porta do servidor iniciado para o teste')
+	executar.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Workers do modo de produção')
+	executar.add_argument('--threads', type=int, default=8, help='Threads por worker (ou do pool ASGI)')
+	executar.add_argument('--concorrencia', type=int, default=8, help='Clientes simultâneos')
+	executar.add_argument('--duracao', type=float, default=30, help='Duração da medição, em segundos')
+	executar.add_argument('--aquecimento', type=float, default=3, help='Aquecimento antes da medição, em segundos')
+	executar.add_argument('--tempo-inicio', type=float, default=600, help='Tempo máximo para o servidor carregar os dados')
+	executar.add_argument('--colecao', default=ARQUIVO_COLECAO, help='Coleção Postman com a mistura de requisições')
+	executar.add_argument('--semente', type=int, default=42, help='Semente dos dados e da ordem das requisições')
+	executar.add_argument('--saida', help='Arquivo JSON para salvar o resultado')
+	
+	comparar = subcomandos.add_parser('comparar', help='Compara dois resultados e aponta regressões')
+	comparar.add_argument('base', help='Resultado de referência (JSON)')
+	comparar.add_argument('novo', help='Resultado a comparar (JSON)')
+	comparar.add_argument('--tolerancia', type=float, default=10, help='Piora máxima aceita, em %%')
+	
+	argumentos = parser.parse_args()
+	
+	if argumentos.comando == 'gerar':
+		df = gerar_operadoras_sinteticas(argumentos.linhas, argumentos.semente)
+		gravar_csv_cadop(df, argumentos.saida)
+		print(f"{len(df)} operadoras gravadas em {argumentos.saida} "
+			  f"({df['cnpj'].duplicated().sum()} com CNPJ repetido)")
+	
+	elif argumentos.comando == 'executar':
+		resultado = executar_benchmark(argumentos)
+		imprimir_resultado(resultado)
+		if argumentos.saida:
+			with open(argumentos.saida, 'w', encoding='utf-8') as arquivo:
+				json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+			print(f"\nResultado salvo em {argumentos.saida}")
+	
+	else:
+		regressoes = comparar_resultados(argumentos.base, argumentos.novo, argumentos.tolerancia)
+		sys.exit(1 if regressoes else 0)
+
+if __name__ == "__main__":
+	main()
@@ -1,13 +1,33 @@
 import os
 import re
-import requests
 import zipfile
 import csv
 import io
+import json
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from urllib.parse import unquote, urljoin, urlparse
 from tqdm import tqdm
 
+from cliente_http import obter_cliente
+from sincronizacao import BAIXADO, NOME_MANIFESTO, ManifestoDownloads, sincronizar_download
+
+# Quantidade máxima de downloads de demonstrações em andamento ao mesmo tempo
+DOWNLOADS_SIMULTANEOS = int(os.environ.get('ANS_DOWNLOADS_SIMULTANEOS', 6))
+
+# Quantidade máxima de conexões simultâneas a um mesmo servidor
+CONEXOES_POR_HOST = int(os.environ.get('ANS_CONEXOES_POR_HOST', 4))
+
+# Arquivos extraídos ao mesmo tempo, enquanto os demais downloads continuam
+EXTRACOES_SIMULTANEAS = int(os.environ.get('ANS_EXTRACOES_SIMULTANEAS', 2))
+
+# 'arquivos' extrai os ZIPs em disco; 'streaming' mantém só os ZIPs, lidos
+# diretamente por leitura_demonstracoes.py (e pela API) sem extração
+MODO_EXTRACAO = os.environ.get('ANS_MODO_EXTRACAO', 'arquivos')
+
 def criar_diretorio(nome_diretorio):
 	"""Cria um diretório se ele não existir."""
 	if not os.path.exists(nome_diretorio):
@@ -16,53 +36,294 @@ def criar_diretorio(nome_diretorio):
 	else:
 		print(f"Diretório '{nome_diretorio}' já existe.")
 
-def baixar_arquivo(url, destino, descricao=None):
-	"""Baixa um arquivo da URL especificada e salva no caminho de destino."""
+def informar(mensagem, progresso=None):
+	"""Exibe uma mensagem sem quebrar a barra de progresso compartilhada, se houver."""
+	if progresso is not None:
+		progresso.write(mensagem)
+	else:
+		print(mensagem)
+
+class ProgressoAgregado:
+	"""
+	Barra de progresso única para vários downloads em paralelo: o total cresce
+	conforme cada resposta informa seu tamanho e as atualizações vindas de
+	threads diferentes são serializadas.
+	"""
+	
+	def __init__(self, descricao, arquivos):
+		self.barra = tqdm(total=0, unit='B', unit_scale=True, desc=descricao)
+		self.arquivos = arquivos
+		self.concluidos = 0
+		self.trava = threading.Lock()
+		self.barra.set_postfix(arquivos=f"0/{arquivos}")
+	
+	def adicionar_total(self, tamanho):
+		with self.trava:
+			self.barra.total += tamanho
+			self.barra.refresh()
+	
+	def update(self, quantidade):
+		with self.trava:
+			self.barra.update(quantidade)
+	
+	def concluir_arquivo(self):
+		with self.trava:
+			self.concluidos += 1
+			self.barra.set_postfix(arquivos=f"{self.concluidos}/{self.arquivos}")
+	
+	def write(self, mensagem):
+		with self.trava:
+			self.barra.write(mensagem)
+	
+	def close(self):
+		self.barra.close()
+
+def baixar_arquivo(url, destino, descricao=None, progresso=None, manifesto=None):
+	"""
+	Baixa um arquivo da URL especificada e salva no caminho de destino.
+	Com `progresso` (ProgressoAgregado), atualiza a barra compartilhada em vez
+	de criar uma barra própria. O `manifesto` (por padrão, o do diretório de
+	destino) permite pular arquivos que não mudaram e retomar downloads
+	interrompidos. Retorna BAIXADO ou INALTERADO em caso de sucesso e False
+	em caso de erro.
+	"""
+	if manifesto is None:
+		manifesto = ManifestoDownloads(os.path.join(os.path.dirname(destino), NOME_MANIFESTO))
+	barras = []
+	
+	def ao_iniciar(tamanho_total, ja_baixado):
+		if progresso is not None:
+			progresso.adicionar_total(tamanho_total)
+			barras.append(progresso)
+		else:
+			barras.append(tqdm(
+				total=tamanho_total, 
+				unit='B', 
+				unit_scale=True,
+				desc=descricao or os.path.basename(destino)
+			))
+		if ja_baixado:
+			barras[0].update(ja_baixado)
+	
+	def ao_receber(tamanho):
+		barras[0].update(tamanho)
+	
 	try:
-		resposta = requests.get(url, stream=True)
-		resposta.raise_for_status()
-		
-		tamanho_total = int(resposta.headers.get('content-length', 0))
-		progresso = tqdm(
-			total=tamanho_total, 
-			unit='B', 
-			unit_scale=True,
-			desc=descricao or os.path.basename(destino)
-		)
-		
-		with open(destino, 'wb') as arquivo:
-			for pedaco in resposta.iter_content(chunk_size=8192):
-				if pedaco:
-					arquivo.write(pedaco)
-					progresso.update(len(pedaco))
-		
-		progresso.close()
-		print(f"Arquivo baixado com sucesso: {destino}")
-		return True
+		resultado = sincronizar_download(url, destino, manifesto, ao_iniciar, ao_receber)
+		if resultado == BAIXADO:
+			informar(f"Arquivo baixado com sucesso: {destino}", progresso)
+		else:
+			informar(f"Arquivo sem alterações no servidor, download pulado: {destino}", progresso)
+		return resultado
 	except Exception as e:
-		print(f"Erro ao baixar o arquivo {url}: {str(e)}")
+		informar(f"Erro ao baixar o arquivo {url}: {str(e)}", progresso)
 		return False
+	finally:
+		if barras and progresso is None:
+			barras[0].close()
+
+# Arquivo com as listagens de diretório já lidas, revalidadas com requisições condicionais
+ARQUIVO_CACHE_LISTAGENS = os.environ.get('ANS_CACHE_LISTAGENS', os.path.join('dados_ans', 'cache_listagens.json'))
+
+# Profundidade máxima de subdiretórios percorridos abaixo da URL base
+PROFUNDIDADE_MAXIMA = 3
+
+# Arquivo de demonstrações encontrado na listagem. trimestre é None quando o
+# nome do arquivo não o indica; tamanho (bytes) e data vêm da listagem e
+# podem ser None
+EntradaDemonstracao = namedtuple('EntradaDemonstracao', ['ano', 'trimestre', 'url', 'tamanho', 'data'])
+
+class LeitorLinks(HTMLParser):
+	"""
+	Extrai de uma listagem de diretório (Apache/nginx) apenas os links e o
+	texto que vem depois de cada um, onde ficam a data e o tamanho. Não monta
+	árvore do documento, só acompanha as tags <a>.
+	"""
+	
+	def __init__(self):
+		super().__init__(convert_charrefs=True)
+		self.links = []
+		self.texto = []
+	
+	def handle_starttag(self, tag, atributos):
+		if tag != 'a':
+			return
+		self.fechar_link()
+		href = dict(atributos).get('href')
+		if href:
+			self.links.append([href, ''])
+			self.texto = []
+	
+	def handle_data(self, dados):
+		if self.links:
+			self.texto.append(dados)
+	
+	def fechar_link(self):
+		if self.links and self.texto:
+			self.links[-1][1] = ' '.join(''.join(self.texto).split())
+		self.texto = []
+	
+	def close(self):
+		super().close()
+		self.fechar_link()
+
+def ler_links(html):
+	"""Lista de [href, texto após o link] de uma listagem de diretório"""
+	leitor = LeitorLinks()
+	leitor.feed(html)
+	leitor.close()
+	return leitor.links
+
+def interpretar_detalhes(texto):
+	"""Data e tamanho (bytes) do texto de uma linha da listagem ('2024-03-01 10:20 33M')"""
+	data = None
+	encontrada = re.search(r'(\d{4}-\d{2}-\d{2}|\d{2}-[A-Za-z]{3}-\d{4})\s+(\d{2}:\d{2})', texto)
+	if encontrada:
+		for formato in ('%Y-%m-%d %H:%M', '%d-%b-%Y %H:%M'):
+			try:
+				data = datetime.strptime(f"{encontrada.group(1)} {encontrada.group(2)}", formato)
+				break
+			except ValueError:
+				continue
+	
+	# O tamanho vem depois da data ('-' para diretórios)
+	tamanho = None
+	valor = re.match(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)', texto[encontrada.end():]) if encontrada else None
+	if valor:
+		multiplicador = 1024 ** ' KMGT'.index(valor.group(2) or ' ')
+		tamanho = int(float(valor.group(1)) * multiplicador)
+	return data, tamanho
+
+class CacheListagens:
+	"""Links de cada listagem já lida, com o ETag/Last-Modified da resposta"""
+	
+	def __init__(self, caminho):
+		self.caminho = caminho
+		self.trava = threading.Lock()
+		try:
+			with open(caminho, 'r', encoding='utf-8') as arquivo:
+				self.listagens = json.load(arquivo)
+		except (OSError, ValueError):
+			self.listagens = {}
+	
+	def obter(self, url):
+		with self.trava:
+			return self.listagens.get(url)
+	
+	def guardar(self, url, listagem):
+		with self.trava:
+			self.listagens[url] = listagem
+	
+	def gravar(self):
+		if not self.caminho:
+			return
+		diretorio = os.path.dirname(self.caminho)
+		if diretorio:
+			os.makedirs(diretorio, exist_ok=True)
+		with self.trava:
+			temporario = f"{self.caminho}.tmp"
+			with open(temporario, 'w', encoding='utf-8') as arquivo:
+				json.dump(self.listagens, arquivo)
+			os.replace(temporario, self.caminho)
+
+def listar_diretorio(url, cache):
+	"""
+	Links de uma listagem de diretório. Se ela já está no cache, a requisição
+	leva If-None-Match/If-Modified-Since e uma resposta 304 reaproveita os
+	links guardados, sem baixar nem interpretar o HTML de novo.
+	"""
+	guardada = cache.obter(url)
+	cabecalhos = {}
+	if guardada:
+		if guardada.get('etag'):
+			cabecalhos['If-None-Match'] = guardada['etag']
+		if guardada.get('last_modified'):
+			cabecalhos['If-Modified-Since'] = guardada['last_modified']
+	
+	resposta = obter_cliente().get(url, headers=cabecalhos)
+	if resposta.status_code == 304 and guardada:
+		return guardada['links']
+	resposta.raise_for_status()
+	
+	links = ler_links(resposta.text)
+	cache.guardar(url, {
+		'etag': resposta.headers.get('ETag'),
+		'last_modified': resposta.headers.get('Last-Modified'),
+		'links': links
+	})
+	return links
+
+def listar_demonstracoes(url_base, anos, conexoes=CONEXOES_POR_HOST, arquivo_cache=ARQUIVO_CACHE_LISTAGENS):
+	"""
+	Percorre a árvore de diretórios a partir de `url_base` e retorna os ZIPs
+	de demonstrações dos `anos` pedidos como EntradaDemonstracao, ordenados
+	por ano, trimestre e URL.
+	
+	Os diretórios de cada nível são listados em paralelo (até `conexoes` ao
+	mesmo tempo). Subdiretórios com um ano no nome só são visitados se o ano
+	estiver em `anos`; o ano de cada arquivo vem do nome (ex.: 1T2023.zip) ou,
+	na falta dele, do diretório onde o arquivo está.
+	"""
+	cache = CacheListagens(arquivo_cache)
+	anos = {int(ano) for ano in anos}
+	url_base = url_base if url_base.endswith('/') else url_base + '/'
+	entradas = {}
+	nivel = [(url_base, None)]
+	
+	with ThreadPoolExecutor(max_workers=max(1, conexoes)) as pool:
+		for profundidade in range(PROFUNDIDADE_MAXIMA + 1):
+			if not nivel:
+				break
+			listagens = [(url, ano_diretorio, pool.submit(listar_diretorio, url, cache)) for url, ano_diretorio in nivel]
+			nivel = []
+			for url_diretorio, ano_diretorio, tarefa in listagens:
+				try:
+					links = tarefa.result()
+				except Exception as e:
+					print(f"Erro ao listar o diretório {url_diretorio}: {str(e)}")
+					continue
+				
+				for href, texto in links:
+					url = urljoin(url_diretorio, href)
+					# Só o que fica abaixo do diretório atual (ignora '../' e links de ordenação)
+					if not url.startswith(url_diretorio) or url == url_diretorio or '?' in href:
+						continue
+					nome = unquote(url[len(url_diretorio):].rstrip('/'))
+					ano_nome = re.search(r'(?<!\d)(20\d{2})(?!\d)', nome)
+					
+					if url.endswith('/'):
+						ano = int(ano_nome.group(1)) if ano_nome else ano_diretorio
+						if ano is None or ano in anos:
+							nivel.append((url, ano))
+						continue
+					
+					if not nome.lower().endswith('.zip'):
+						continue
+					periodo = re.search(r'([1-4])T(\d{4})', nome, re.IGNORECASE)
+					if periodo:
+						ano, trimestre = int(periodo.group(2)), int(periodo.group(1))
+					else:
+						ano, trimestre = (int(ano_nome.group(1)) if ano_nome else ano_diretorio), None
+					if ano not in anos:
+						continue
+					data, tamanho = interpretar_detalhes(texto)
+					entradas[url] = EntradaDemonstracao(ano, trimestre, url, tamanho, data)
+	
+	cache.gravar()
+	return sorted(entradas.values(), key=lambda entrada: (entrada.ano, entrada.trimestre or 0, entrada.url))
 
 def encontrar_arquivos_demonstracoes_dois_anos(url_base):
 	"""Encontra os arquivos de demonstrações contábeis dos últimos 2 anos."""
 	try:
 		print(f"Acessando o diretório FTP: {url_base}")
-		resposta = requests.get(url_base)
-		resposta.raise_for_status()
-		
-		# Extrair links da página
-		soup = BeautifulSoup(resposta.text, 'html.parser')
-		links = []
 		
 		# Ano atual e ano anterior
 		ano_atual = datetime.now().year
-		anos_alvo = [str(ano_atual), str(ano_atual - 1), str(ano_atual - 2)]  # Incluímos ano atual - 2 para garantir 2 anos completos
+		anos_alvo = [ano_atual, ano_atual - 1, ano_atual - 2]  # Incluímos ano atual - 2 para garantir 2 anos completos
 		
-		# Buscar links que contenham os anos alvo
-		for link in soup.find_all('a'):
-			href = link.get('href')
-			if href and any(ano in href for ano in anos_alvo) and href.endswith(('.zip', '.ZIP')):
-				links.append(url_base + '/' + href if not url_base.endswith('/') else url_base + href)
+		# Percorrer o diretório e os subdiretórios dos anos alvo
+		entradas = listar_demonstracoes(url_base, anos_alvo)
+		links = [entrada.url for entrada in entradas]
 		
 		print(f"Encontrados {len(links)} arquivos de demonstrações contábeis dos últimos 2 anos.")
 		return links
@@ -70,22 +331,82 @@ def encontrar_arquivos_demonstracoes_dois_anos(url_base):
 		print(f"Erro ao buscar arquivos de demonstrações: {str(e)}")
 		return []
 
-def baixar_dados_operadoras(url, destino):
+def baixar_dados_operadoras(url, destino, manifesto=None):
 	"""Baixa os dados cadastrais das operadoras ativas."""
 	print(f"Baixando dados cadastrais das operadoras de {url}")
-	return baixar_arquivo(url, destino, "Dados das Operadoras")
+	return baixar_arquivo(url, destino, "Dados das Operadoras", manifesto=manifesto)
 
-def extrair_zip(arquivo_zip, diretorio_destino):
+def extrair_zip(arquivo_zip, diretorio_destino, progresso=None):
 	"""Extrai um arquivo ZIP para o diretório de destino."""
 	try:
 		with zipfile.ZipFile(arquivo_zip, 'r') as zip_ref:
 			zip_ref.extractall(diretorio_destino)
-		print(f"Arquivo {arquivo_zip} extraído com sucesso para {diretorio_destino}")
+		informar(f"Arquivo {arquivo_zip} extraído com sucesso para {diretorio_destino}", progresso)
 		return True
 	except Exception as e:
-		print(f"Erro ao extrair o arquivo {arquivo_zip}: {str(e)}")
+		informar(f"Erro ao extrair o arquivo {arquivo_zip}: {str(e)}", progresso)
 		return False
 
+def baixar_demonstracoes(links, diretorio_demonstracoes, manifesto=None, downloads_simultaneos=DOWNLOADS_SIMULTANEOS,
+						 conexoes_por_host=CONEXOES_POR_HOST, extracoes_simultaneas=EXTRACOES_SIMULTANEAS,
+						 extrair_arquivos=MODO_EXTRACAO != 'streaming'):
+	"""
+	Baixa e extrai os arquivos de demonstrações em paralelo.
+	
+	Os downloads rodam em um pool de threads, limitado também por servidor
+	(`conexoes_por_host`). Cada ZIP é extraído em um pool separado assim que
+	termina de baixar, enquanto os outros downloads continuam. Como no laço
+	sequencial, um download que falha é pulado (sem extração) e não
+	interrompe os demais. Arquivos sem alterações no servidor só são
+	extraídos se a pasta de extração não existir. Com `extrair_arquivos`
+	falso (modo streaming), os ZIPs não são extraídos. Retorna {url:
+	resultado de baixar_arquivo}.
+	"""
+	if manifesto is None:
+		manifesto = ManifestoDownloads(os.path.join(diretorio_demonstracoes, NOME_MANIFESTO))
+	limites_host = {}
+	trava_limites = threading.Lock()
+	
+	def limite_host(url):
+		host = urlparse(url).netloc
+		with trava_limites:
+			if host not in limites_host:
+				limites_host[host] = threading.BoundedSemaphore(conexoes_por_host)
+			return limites_host[host]
+	
+	progresso = ProgressoAgregado("Demonstrações contábeis", len(links))
+	
+	def extrair(caminho_arquivo, diretorio_extracao):
+		os.makedirs(diretorio_extracao, exist_ok=True)
+		return extrair_zip(caminho_arquivo, diretorio_extracao, progresso)
+	
+	extracoes = []
+	
+	def baixar(url):
+		nome_arquivo = os.path.basename(url)
+		caminho_arquivo = os.path.join(diretorio_demonstracoes, nome_arquivo)
+		with limite_host(url):
+			resultado = baixar_arquivo(url, caminho_arquivo, progresso=progresso, manifesto=manifesto)
+		progresso.concluir_arquivo()
+		# Extrair se for ZIP, sem ocupar a vaga de download
+		diretorio_extracao = os.path.join(diretorio_demonstracoes, nome_arquivo.rsplit('.', 1)[0])
+		if (extrair_arquivos and resultado and nome_arquivo.lower().endswith('.zip')
+				and (resultado == BAIXADO or not os.path.isdir(diretorio_extracao))):
+			extracoes.append(pool_extracao.submit(extrair, caminho_arquivo, diretorio_extracao))
+		return resultado
+	
+	try:
+		with ThreadPoolExecutor(max_workers=max(1, extracoes_simultaneas)) as pool_extracao:
+			with ThreadPoolExecutor(max_workers=max(1, downloads_simultaneos)) as pool_download:
+				downloads = {url: pool_download.submit(baixar, url) for url in links}
+			resultados = {url: tarefa.result() for url, tarefa in downloads.items()}
+			for tarefa in extracoes:
+				tarefa.result()
+	finally:
+		progresso.close()
+	
+	return resultados
+
 def main():
 	# Diretórios para dados
 	diretorio_base = "dados_ans"
@@ -103,9 +424,12 @@ def main():
 	# URL para dados cadastrais das operadoras
 	url_operadoras = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/"
 	
+	# Manifesto com ETag, Last-Modified, tamanho e SHA-256 de cada download
+	manifesto = ManifestoDownloads(os.path.join(diretorio_base, NOME_MANIFESTO))
+	
 	# Baixar dados cadastrais das operadoras
 	arquivo_operadoras = os.path.join(diretorio_operadoras, "operadoras_ativas.csv")
-	baixar_dados_operadoras(url_operadoras, arquivo_operadoras)
+	baixar_dados_operadoras(url_operadoras, arquivo_operadoras, manifesto)
 	
 	# Encontrar e baixar arquivos de demonstrações contábeis dos últimos 2 anos
 	links_demonstracoes = encontrar_arquivos_demonstracoes_dois_anos(url_demonstracoes)
@@ -114,22 +438,21 @@ def main():
 		print("Não foram encontrados arquivos de demonstrações contábeis.")
 		return
 	
-	# Baixar e extrair cada arquivo de demonstrações
-	for i, url in enumerate(links_demonstracoes, 1):
-		nome_arquivo = os.path.basename(url)
-		caminho_arquivo = os.path.join(diretorio_demonstracoes, nome_arquivo)
-		
-		print(f"\nBaixando arquivo {i}/{len(links_demonstracoes)}: {nome_arquivo}")
-		if baixar_arquivo(url, caminho_arquivo):
-			# Extrair se for ZIP
-			if nome_arquivo.lower().endswith('.zip'):
-				diretorio_extracao = os.path.join(diretorio_demonstracoes, nome_arquivo.rsplit('.', 1)[0])
-				criar_diretorio(diretorio_extracao)
-				extrair_zip(caminho_arquivo, diretorio_extracao)
+	# Baixar e extrair os arquivos de demonstrações em paralelo
+	print(f"\nBaixando {len(links_demonstracoes)} arquivos ({DOWNLOADS_SIMULTANEOS} downloads simultâneos, "
+		  f"até {CONEXOES_POR_HOST} por servidor)")
+	resultados = baixar_demonstracoes(links_demonstracoes, diretorio_demonstracoes, manifesto)
+	falhas = [url for url, resultado in resultados.items() if not resultado]
+	if falhas:
+		print(f"{len(falhas)} arquivo(s) não foram baixados: {', '.join(os.path.basename(url) for url in falhas)}")
 	
 	print("\nDownload e extração de dados concluídos com sucesso!")
 	print(f"Dados das operadoras salvos em: {arquivo_operadoras}")
 	print(f"Demonstrações contábeis salvas em: {diretorio_demonstracoes}")
+	if MODO_EXTRACAO == 'streaming':
+		print("Modo streaming: os ZIPs não foram extraídos. Use leitura_demonstracoes.py para "
+			  "gravá-los em Parquet ou importá-los no MySQL direto dos ZIPs.")
+	print(f"\nConexões HTTP:\n{obter_cliente().resumo()}")
 
 if __name__ == "__main__":
 	main()
\ No newline at end of file
@@ -1,16 +1,881 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from werkzeug.serving import BaseWSGIServer
 import pandas as pd
+import numpy as np
 import re
+import unicodedata
 import os
 import json
+import bisect
+import base64
+import gzip
+import argparse
+import gc
+import signal
+import sys
+import socket
+import shutil
+import tempfile
+import hashlib
+import threading
+import itertools
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import wraps
+
+from leitura_demonstracoes import arquivos_demonstracoes, ler_lotes_arquivo
+
+# Feather (pyarrow) é opcional: permite ler o snapshot binário mapeado em memória
+try:
+	import pyarrow.feather as feather
+except ImportError:
+	feather = None
+
+# orjson é opcional: codifica os registros em JSON bem mais rápido que o módulo json
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+# Brotli é opcional: sem ele, as respostas são comprimidas apenas com gzip
+try:
+	import brotli
+except ImportError:
+	brotli = None
 
 app = Flask(__name__)
 CORS(app)  # Habilitar CORS para todas as rotas
 
-# Variável global para armazenar os dados das operadoras
-df_operadoras = None
+# Configuração do cache de respostas da busca
+CACHE_BUSCA_TAMANHO = int(os.environ.get('API_CACHE_TAMANHO', 256))
+CACHE_BUSCA_TTL = float(os.environ.get('API_CACHE_TTL', 300))
+
+# Cache dos corpos finais (já comprimidos) das respostas com ETag
+CACHE_RESPOSTAS_TAMANHO = int(os.environ.get('API_CACHE_RESPOSTAS_TAMANHO', 512))
+CACHE_RESPOSTAS_TTL = float(os.environ.get('API_CACHE_RESPOSTAS_TTL', 300))
+
+# Respostas menores que isso (em bytes) não compensam a compressão
+COMPRESSAO_TAMANHO_MINIMO = 1024
+
+# Codificações de compressão suportadas, em ordem de preferência
+CODIFICACOES_SUPORTADAS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+# Quantidade máxima de chaves por lote em POST /api/operadoras/detalhes
+LOTE_DETALHES_MAXIMO = int(os.environ.get('API_LOTE_MAXIMO', 50000))
+
+# Lotes acima desse tamanho têm a resposta enviada em streaming
+LOTE_DETALHES_STREAMING = 1000
+
+# Codificador JSON dos registros pré-serializados: 'orjson' (se instalado) ou 'json'
+CODIFICADOR_JSON = os.environ.get('API_CODIFICADOR_JSON', 'orjson' if orjson is not None else 'json')
+
+# Campos considerados na busca textual
+CAMPOS_BUSCA = ['razao_social', 'nome_fantasia', 'registro_ans', 'cnpj']
+
+# Campos de identificação, comparados apenas pelos dígitos
+CAMPOS_NUMERICOS = ['registro_ans', 'cnpj']
+
+# Motor de pontuação da busca: 'indice' (índice invertido) ou 'vetorizado'
+MOTOR_BUSCA = os.environ.get('API_MOTOR_BUSCA', 'indice')
+
+def somente_digitos(valor):
+	"""Retorna apenas os dígitos de um valor (vazio para nulos)"""
+	if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+		return ''
+	# Valores lidos como float (coluna com nulos) viram '335100.0'
+	if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+		valor = int(valor)
+	return re.sub(r'\D', '', str(valor))
+
+def normalizar_registro_ans(valor):
+	"""Normaliza um registro ANS para uso como chave (apenas dígitos, sem zeros à esquerda)"""
+	return somente_digitos(valor).lstrip('0')
+
+def normalizar_cnpj(valor):
+	"""Normaliza um CNPJ para uso como chave (14 dígitos, sem pontuação)"""
+	digitos = somente_digitos(valor)
+	# CNPJs lidos como número perdem os zeros à esquerda
+	return digitos.zfill(14) if digitos else ''
+
+def normalizar_texto_busca(valor):
+	"""
+	Normaliza um texto para comparação na busca: remove acentos, converte para
+	minúsculas e troca qualquer sequência de pontuação ou espaços por um espaço
+	"""
+	if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+		return ''
+	texto = unicodedata.normalize('NFKD', str(valor))
+	texto = ''.join(c for c in texto if not unicodedata.combining(c))
+	return re.sub(r'[\W_]+', ' ', texto.casefold()).strip()
+
+def construir_colunas_busca(df):
+	"""Monta as colunas de busca normalizadas (texto sem acentos e identificadores só com dígitos)"""
+	colunas = {}
+	for campo in CAMPOS_BUSCA:
+		if campo not in df.columns:
+			colunas[campo] = [None] * len(df)
+			continue
+		
+		if campo == 'cnpj':
+			normalizar = normalizar_cnpj
+		elif campo in CAMPOS_NUMERICOS:
+			normalizar = somente_digitos
+		else:
+			normalizar = normalizar_texto_busca
+		# Valores vazios ficam como None para serem ignorados na pontuação
+		colunas[campo] = [normalizar(valor) or None for valor in df[campo].tolist()]
+	
+	return pd.DataFrame(colunas, columns=CAMPOS_BUSCA, dtype=object)
+
+def termos_busca(termo_busca):
+	"""
+	Normaliza o termo de busca para cada campo: os campos de texto usam o termo
+	sem acentos e pontuação, e os identificadores usam só os dígitos quando o
+	termo parece um número (ex.: '29.309.127/0001-79')
+	"""
+	termo_texto = normalizar_texto_busca(termo_busca)
+	termo_numerico = termo_texto
+	if re.search(r'\d', termo_busca) and re.fullmatch(r'[\d\s./-]+', termo_busca):
+		termo_numerico = somente_digitos(termo_busca)
+	
+	return {
+		campo: termo_numerico if campo in CAMPOS_NUMERICOS else termo_texto
+		for campo in CAMPOS_BUSCA
+	}
+
+class IndiceBusca:
+	"""
+	Índice invertido sobre as colunas de busca normalizadas.
+	
+	Os valores normalizados são quebrados em tokens por espaço. Como qualquer
+	trecho sem espaços de um valor está contido em um único token, basta
+	localizar no vocabulário os tokens que contêm cada parte do termo (via
+	índice de trigramas) para obter as linhas candidatas. Só essas linhas são
+	pontuadas.
+	"""
+	
+	def __init__(self, df_busca):
+		self.total_linhas = len(df_busca)
+		
+		# Valores normalizados dos campos de busca, por posição de linha (None quando vazio)
+		self.valores = {campo: df_busca[campo].tolist() for campo in CAMPOS_BUSCA}
+		
+		# token -> conjunto de linhas que possuem o token em algum campo
+		self.postagens = {}
+		for valores_campo in self.valores.values():
+			for linha, valor in enumerate(valores_campo):
+				if valor is None:
+					continue
+				for token in valor.split():
+					self.postagens.setdefault(token, set()).add(linha)
+		
+		# trigrama -> conjunto de tokens do vocabulário que contêm o trigrama
+		self.trigramas = {}
+		for token in self.postagens:
+			for i in range(len(token) - 2):
+				self.trigramas.setdefault(token[i:i + 3], set()).add(token)
+	
+	def tokens_contendo(self, parte):
+		"""Retorna os tokens do vocabulário que contêm a parte informada"""
+		if len(parte) < 3:
+			# Partes curtas não têm trigramas: percorre apenas o vocabulário
+			return [token for token in self.postagens if parte in token]
+		
+		tokens = None
+		for i in range(len(parte) - 2):
+			contendo = self.trigramas.get(parte[i:i + 3])
+			if not contendo:
+				return []
+			tokens = set(contendo) if tokens is None else tokens & contendo
+		
+		return [token for token in tokens if parte in token]
+	
+	def candidatos(self, termo):
+		"""Retorna as linhas que podem conter o termo em algum dos campos de busca"""
+		linhas = None
+		# Começar pelas partes mais longas, que costumam ser as mais seletivas
+		for parte in sorted(set(termo.split()), key=len, reverse=True):
+			linhas_parte = set()
+			for token in self.tokens_contendo(parte):
+				linhas_parte |= self.postagens[token]
+			linhas = linhas_parte if linhas is None else linhas & linhas_parte
+			if not linhas:
+				break
+		
+		return linhas or set()
+	
+	def pontuar(self, termos):
+		"""
+		Pontua as linhas candidatas com os mesmos critérios de relevância da busca:
+		correspondência exata (10), início (8), palavra completa (5) e trecho (3).
+		Recebe o termo normalizado de cada campo (ver termos_busca) e retorna os
+		arrays (linhas, pontos) apenas com pontuação maior que zero.
+		"""
+		padroes = {
+			termo: re.compile(r'\b' + re.escape(termo) + r'\b')
+			for termo in set(termos.values()) if termo
+		}
+		
+		candidatos = set()
+		for termo in padroes:
+			candidatos |= self.candidatos(termo)
+		
+		pontuacoes = []
+		for linha in sorted(candidatos):
+			pontos = 0
+			for campo in CAMPOS_BUSCA:
+				termo = termos[campo]
+				valor = self.valores[campo][linha]
+				if not termo or valor is None:
+					continue
+				
+				# Correspondência exata (maior pontuação)
+				if valor == termo:
+					pontos += 10
+				# Início da string (alta pontuação)
+				elif valor.startswith(termo):
+					pontos += 8
+				# Contém como palavra completa
+				elif padroes[termo].search(valor):
+					pontos += 5
+				# Contém em qualquer lugar
+				elif termo in valor:
+					pontos += 3
+			
+			if pontos > 0:
+				pontuacoes.append((linha, pontos))
+		
+		linhas = np.array([linha for linha, _ in pontuacoes], dtype=np.int64)
+		pontos = np.array([pontos for _, pontos in pontuacoes], dtype=np.int16)
+		return linhas, pontos
+
+class PontuadorVetorizado:
+	"""
+	Pontuação de relevância por colunas inteiras, sem percorrer linha a linha.
+	
+	Usa as colunas de busca normalizadas, guardadas como arrays do pandas. Cada
+	requisição aloca apenas o array de pontos (e as máscaras temporárias), sem
+	alterar os dados compartilhados.
+	"""
+	
+	def __init__(self, df_busca):
+		self.colunas = {campo: df_busca[campo] for campo in CAMPOS_BUSCA}
+		self.total_linhas = len(df_busca)
+	
+	def pontuar(self, termos):
+		"""
+		Pontua todas as linhas de uma vez com os critérios de relevância da busca:
+		correspondência exata (10), início (8), palavra completa (5) e trecho (3).
+		Recebe o termo normalizado de cada campo (ver termos_busca) e retorna os
+		arrays (linhas, pontos) apenas com pontuação maior que zero.
+		"""
+		pontos = np.zeros(self.total_linhas, dtype=np.int16)
+		for campo, coluna in self.colunas.items():
+			termo = termos[campo]
+			if not termo:
+				continue
+			
+			padrao_palavra = r'\b' + re.escape(termo) + r'\b'
+			texto = coluna.str
+			pontos += np.select(
+				[
+					(coluna == termo).to_numpy(dtype=bool),
+					texto.startswith(termo, na=False).to_numpy(dtype=bool),
+					texto.contains(padrao_palavra, regex=True, na=False).to_numpy(dtype=bool),
+					texto.contains(termo, regex=False, na=False).to_numpy(dtype=bool),
+				],
+				[10, 8, 5, 3],
+				default=0
+			).astype(np.int16)
+		
+		linhas = np.flatnonzero(pontos)
+		return linhas, pontos[linhas]
+
+def distancia_edicao(a, b, limite):
+	"""
+	Distância de edição (inserção, remoção, troca e transposição de letras
+	vizinhas) entre duas palavras. Para assim que a distância passa do limite
+	e, nesse caso, retorna limite + 1.
+	"""
+	if abs(len(a) - len(b)) > limite:
+		return limite + 1
+	
+	anterior_2 = None
+	anterior = list(range(len(b) + 1))
+	for i in range(1, len(a) + 1):
+		atual = [i] + [0] * len(b)
+		for j in range(1, len(b) + 1):
+			custo = 0 if a[i - 1] == b[j - 1] else 1
+			atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + custo)
+			if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+				atual[j] = min(atual[j], anterior_2[j - 2] + 1)
+		if min(atual) > limite:
+			return limite + 1
+		anterior_2, anterior = anterior, atual
+	return anterior[-1]
+
+class BuscaAproximada:
+	"""
+	Busca tolerante a erros de digitação nos nomes (razão social e nome fantasia).
+	
+	Na carga, cada palavra distinta dos nomes normalizados entra em um índice de
+	trigramas (com bordas marcadas por '$'). Para cada palavra do termo, os
+	trigramas em comum selecionam no máximo CANDIDATOS_POR_PALAVRA palavras do
+	vocabulário, e só essas passam pelo cálculo da distância de edição. O custo
+	de uma consulta depende do tamanho do vocabulário e desses limites, nunca
+	de percorrer todas as linhas.
+	"""
+	
+	CAMPOS = ['razao_social', 'nome_fantasia']
+	
+	# Limites de custo por consulta
+	CANDIDATOS_POR_PALAVRA = 64
+	PALAVRAS_MAXIMO = 5
+	
+	# Palavras com menos letras que isso não são corrigidas
+	TAMANHO_MINIMO = 3
+	
+	def __init__(self, df_busca):
+		# palavra -> linhas em que ela aparece em algum dos nomes
+		linhas_por_palavra = {}
+		for campo in self.CAMPOS:
+			for linha, valor in enumerate(df_busca[campo].tolist()):
+				if valor is None:
+					continue
+				for palavra in valor.split():
+					if len(palavra) >= self.TAMANHO_MINIMO and not palavra.isdigit():
+						linhas_por_palavra.setdefault(palavra, set()).add(linha)
+		
+		self.palavras = list(linhas_por_palavra)
+		self.tamanhos = np.array([len(palavra) for palavra in self.palavras], dtype=np.int32)
+		self.linhas = [np.fromiter(sorted(linhas_por_palavra[palavra]), dtype=np.int64) for palavra in self.palavras]
+		
+		# trigrama -> posições (no vocabulário) das palavras que contêm o trigrama
+		trigramas = {}
+		for posicao, palavra in enumerate(self.palavras):
+			for trigrama in self.trigramas_palavra(palavra):
+				trigramas.setdefault(trigrama, []).append(posicao)
+		self.trigramas = {trigrama: np.array(posicoes, dtype=np.int32) for trigrama, posicoes in trigramas.items()}
+	
+	@staticmethod
+	def trigramas_palavra(palavra):
+		"""Trigramas distintos da palavra, com as bordas marcadas ('$ab', 'abc', 'bc$')"""
+		marcada = f'${palavra}$'
+		return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+	
+	@staticmethod
+	def distancia_maxima(palavra):
+		"""Erros tolerados: 1 em palavras de até 5 letras e 2 nas maiores"""
+		return 1 if len(palavra) <= 5 else 2
+	
+	def corrigir(self, palavra):
+		"""Retorna [(posição no vocabulário, distância)] das palavras próximas da informada"""
+		limite = self.distancia_maxima(palavra)
+		trigramas = self.trigramas_palavra(palavra)
+		listas = [self.trigramas[trigrama] for trigrama in trigramas if trigrama in self.trigramas]
+		if not listas:
+			return []
+		
+		# Cada erro altera no máximo 3 trigramas: palavras com poucos trigramas em comum são descartadas
+		em_comum = np.bincount(np.concatenate(listas), minlength=len(self.palavras))
+		candidatos = np.flatnonzero(em_comum >= max(1, len(trigramas) - 3 * limite))
+		candidatos = candidatos[np.abs(self.tamanhos[candidatos] - len(palavra)) <= limite]
+		
+		# Manter só as palavras com mais trigramas em comum
+		if len(candidatos) > self.CANDIDATOS_POR_PALAVRA:
+			melhores = np.argpartition(-em_comum[candidatos], self.CANDIDATOS_POR_PALAVRA - 1)[:self.CANDIDATOS_POR_PALAVRA]
+			candidatos = candidatos[melhores]
+		
+		correcoes = []
+		for posicao in candidatos.tolist():
+			distancia = distancia_edicao(palavra, self.palavras[posicao], limite)
+			if distancia <= limite:
+				correcoes.append((posicao, distancia))
+		return correcoes
+	
+	def pontuar(self, termo):
+		"""
+		Retorna os arrays (linhas, pontos) das linhas cujos nomes têm, para cada
+		palavra do termo, uma palavra igual ou próxima. Linhas em que todas as
+		palavras diferem em no máximo 1 letra recebem 2 pontos; as demais, 1.
+		"""
+		palavras = [palavra for palavra in termo.split() if len(palavra) >= self.TAMANHO_MINIMO]
+		palavras = list(dict.fromkeys(palavras))[:self.PALAVRAS_MAXIMO]
+		if not palavras:
+			return np.array([], dtype=np.int64), np.array([], dtype=np.int16)
+		
+		linhas = None
+		distancias = None
+		for palavra in palavras:
+			correcoes = self.corrigir(palavra)
+			if not correcoes:
+				return np.array([], dtype=np.int64), np.array([], dtype=np.int16)
+			
+			# Menor distância por linha entre as palavras corrigidas
+			linhas_palavra = np.concatenate([self.linhas[posicao] for posicao, _ in correcoes])
+			distancias_palavra = np.concatenate([
+				np.full(len(self.linhas[posicao]), distancia, dtype=np.int16) for posicao, distancia in correcoes
+			])
+			ordem = np.lexsort((distancias_palavra, linhas_palavra))
+			linhas_palavra, distancias_palavra = linhas_palavra[ordem], distancias_palavra[ordem]
+			primeiras = np.concatenate(([True], linhas_palavra[1:] != linhas_palavra[:-1]))
+			linhas_palavra, distancias_palavra = linhas_palavra[primeiras], distancias_palavra[primeiras]
+			
+			# Todas as palavras do termo precisam aparecer: interseção, guardando a maior distância
+			if linhas is None:
+				linhas, distancias = linhas_palavra, distancias_palavra
+			else:
+				linhas, em_linhas, em_palavra = np.intersect1d(linhas, linhas_palavra, assume_unique=True, return_indices=True)
+				distancias = np.maximum(distancias[em_linhas], distancias_palavra[em_palavra])
+			if not len(linhas):
+				break
+		
+		pontos = np.where(distancias <= 1, 2, 1).astype(np.int16)
+		return linhas, pontos
+
+class IndiceSugestoes:
+	"""
+	Estrutura de prefixos para autocompletar, com arrays ordenados e busca binária.
+	
+	Guarda as chaves normalizadas da razão social, do nome fantasia e do
+	registro ANS em ordem alfabética, junto com a linha de cada uma. Um
+	prefixo localiza o início do intervalo com bisect, e o custo da consulta
+	depende só da quantidade de sugestões devolvidas. Há dois arrays: o dos
+	valores completos, que ordena primeiro os nomes que começam com o prefixo,
+	e o das palavras internas ('joinville' em 'unimed joinville').
+	"""
+	
+	CAMPOS = ['razao_social', 'nome_fantasia', 'registro_ans']
+	
+	def __init__(self, df, df_busca):
+		entradas_inicio = []
+		entradas_palavras = []
+		for campo in self.CAMPOS:
+			for linha, valor in enumerate(df_busca[campo].tolist()):
+				if valor is None:
+					continue
+				entradas_inicio.append((valor, linha))
+				# Sufixos que começam em cada palavra interna do valor
+				posicao = valor.find(' ')
+				while posicao != -1:
+					entradas_palavras.append((valor[posicao + 1:], linha))
+					posicao = valor.find(' ', posicao + 1)
+		
+		entradas_inicio.sort()
+		entradas_palavras.sort()
+		self.chaves_inicio = [chave for chave, _ in entradas_inicio]
+		self.linhas_inicio = [linha for _, linha in entradas_inicio]
+		self.chaves_palavras = [chave for chave, _ in entradas_palavras]
+		self.linhas_palavras = [linha for _, linha in entradas_palavras]
+		
+		# Dados exibidos em cada sugestão, já prontos para o JSON
+		self.exibicao = [
+			registro_para_json(registro)
+			for registro in df[self.CAMPOS].to_dict(orient='records')
+		]
+	
+	def sugerir(self, prefixo, limite):
+		"""Retorna até `limite` linhas cujos nomes ou registro começam com o prefixo normalizado"""
+		linhas = []
+		vistas = set()
+		for chaves, linhas_chave in ((self.chaves_inicio, self.linhas_inicio),
+									 (self.chaves_palavras, self.linhas_palavras)):
+			posicao = bisect.bisect_left(chaves, prefixo)
+			while (posicao < len(chaves) and len(linhas) < limite
+				   and chaves[posicao].startswith(prefixo)):
+				linha = linhas_chave[posicao]
+				if linha not in vistas:
+					vistas.add(linha)
+					linhas.append(linha)
+				posicao += 1
+			if len(linhas) >= limite:
+				break
+		
+		return [self.exibicao[linha] for linha in linhas]
+
+class FacetasOperadoras:
+	"""
+	Contagens por faceta (modalidade, UF, cidade e modalidade × UF) e listas
+	ordenadas de linhas por valor, calculadas uma vez por snapshot. Os filtros
+	da busca cruzam essas listas em vez de percorrer o DataFrame.
+	"""
+	
+	CAMPOS = ['modalidade', 'uf', 'cidade']
+	
+	def __init__(self, df):
+		self.contagens = {}
+		# campo -> {valor normalizado: array ordenado com as linhas que têm o valor}
+		self.linhas = {}
+		
+		for campo in self.CAMPOS:
+			# Agrupar as linhas por valor com uma única ordenação dos códigos
+			codigos, valores = pd.factorize(df[campo])
+			quantidades = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+			ordem = np.argsort(codigos, kind='stable')[np.count_nonzero(codigos < 0):]
+			grupos = np.split(ordem, np.cumsum(quantidades)[:-1]) if len(valores) else []
+			
+			contagem = []
+			linhas_campo = {}
+			for valor, quantidade, linhas in zip(valores, quantidades, grupos):
+				chave = normalizar_texto_busca(valor)
+				if not chave:
+					continue
+				contagem.append({'nome': valor, 'quantidade': int(quantidade)})
+				# Valores que só diferem em acentos ou caixa caem na mesma chave
+				if chave in linhas_campo:
+					linhas = np.union1d(linhas_campo[chave], linhas)
+				linhas_campo[chave] = linhas.astype(np.int64)
+			
+			contagem.sort(key=lambda item: (-item['quantidade'], str(item['nome'])))
+			self.contagens[campo] = contagem
+			self.linhas[campo] = linhas_campo
+		
+		# Combinação modalidade × UF
+		combinacoes = df.groupby(['modalidade', 'uf'], sort=False, observed=True).size()
+		self.contagens['modalidade_uf'] = sorted(
+			(
+				{'modalidade': modalidade, 'uf': uf, 'quantidade': int(quantidade)}
+				for (modalidade, uf), quantidade in combinacoes.items()
+				if normalizar_texto_busca(modalidade) and normalizar_texto_busca(uf)
+			),
+			key=lambda item: (-item['quantidade'], str(item['modalidade']), str(item['uf']))
+		)
+	
+	def filtrar(self, filtros):
+		"""
+		Retorna o array ordenado das linhas que atendem a todos os filtros
+		({campo: valor}) ou None se nenhum filtro foi informado
+		"""
+		resultado = None
+		for campo, valor in filtros.items():
+			linhas = self.linhas[campo].get(normalizar_texto_busca(valor), np.empty(0, dtype=np.int64))
+			resultado = linhas if resultado is None else np.intersect1d(resultado, linhas, assume_unique=True)
+		return resultado
+
+class CacheRespostas:
+	"""
+	Cache LRU com tempo de expiração (TTL) para respostas da API.
+	
+	As chaves devem incluir a versão do snapshot dos dados e o cache é
+	esvaziado a cada recarga, para nunca devolver linhas de uma carga anterior.
+	Seguro para uso com o servidor em múltiplas threads.
+	"""
+	
+	def __init__(self, tamanho_maximo, ttl):
+		self.tamanho_maximo = tamanho_maximo
+		self.ttl = ttl
+		self.entradas = OrderedDict()
+		self.trava = threading.Lock()
+		self.acertos = 0
+		self.faltas = 0
+	
+	def obter(self, chave):
+		"""Retorna o valor em cache para a chave ou None se ausente ou expirado"""
+		with self.trava:
+			entrada = self.entradas.get(chave)
+			if entrada is not None:
+				expira_em, valor = entrada
+				if expira_em > time.monotonic():
+					self.entradas.move_to_end(chave)
+					self.acertos += 1
+					return valor
+				del self.entradas[chave]
+			self.faltas += 1
+			return None
+	
+	def guardar(self, chave, valor):
+		"""Guarda um valor no cache, descartando as entradas usadas há mais tempo"""
+		if self.tamanho_maximo <= 0:
+			return
+		with self.trava:
+			self.entradas[chave] = (time.monotonic() + self.ttl, valor)
+			self.entradas.move_to_end(chave)
+			while len(self.entradas) > self.tamanho_maximo:
+				self.entradas.popitem(last=False)
+	
+	def limpar(self):
+		"""Remove todas as entradas (usado quando os dados são recarregados)"""
+		with self.trava:
+			self.entradas.clear()
+	
+	def estatisticas(self):
+		"""Retorna os contadores de uso do cache"""
+		with self.trava:
+			return {
+				'entradas': len(self.entradas),
+				'tamanho_maximo': self.tamanho_maximo,
+				'ttl_segundos': self.ttl,
+				'acertos': self.acertos,
+				'faltas': self.faltas
+			}
+
+# Cache das páginas da busca (JSON dos resultados já montado), chaveado por (versão do snapshot, termos normalizados, limite)
+cache_busca = CacheRespostas(CACHE_BUSCA_TAMANHO, CACHE_BUSCA_TTL)
+
+# Cache dos corpos das respostas, chaveado por (versão do snapshot, ETag, codificação)
+cache_respostas = CacheRespostas(CACHE_RESPOSTAS_TAMANHO, CACHE_RESPOSTAS_TTL)
+
+# Limites (segundos) dos buckets dos histogramas de duração
+BUCKETS_DURACAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class RegistroMetricas:
+	"""
+	Registro de métricas em memória (contadores, medidores e histogramas com
+	rótulos), exportado no formato de texto do Prometheus. No modo de produção
+	cada worker tem o seu registro, e a exportação soma os de todos os workers
+	(ver agregar_metricas_workers).
+	"""
+	
+	def __init__(self):
+		self.trava = threading.Lock()
+		# nome -> (tipo, descrição)
+		self.definicoes = OrderedDict()
+		# nome -> {rótulos: valor} (histogramas: {rótulos: [contagens por bucket, soma, total]})
+		self.valores = {}
+	
+	def definir(self, nome, tipo, descricao):
+		"""Registra uma métrica com seu tipo ('counter', 'gauge' ou 'histogram') e descrição"""
+		self.definicoes[nome] = (tipo, descricao)
+		self.valores[nome] = {}
+	
+	def incrementar(self, nome, valor=1, **rotulos):
+		"""Soma um valor a um contador ou medidor"""
+		chave = tuple(sorted(rotulos.items()))
+		with self.trava:
+			serie = self.valores[nome]
+			serie[chave] = serie.get(chave, 0) + valor
+	
+	def observar(self, nome, valor, **rotulos):
+		"""Registra uma observação em um histograma"""
+		chave = tuple(sorted(rotulos.items()))
+		posicao = bisect.bisect_left(BUCKETS_DURACAO, valor)
+		with self.trava:
+			serie = self.valores[nome].get(chave)
+			if serie is None:
+				serie = self.valores[nome][chave] = [[0] * len(BUCKETS_DURACAO), 0.0, 0]
+			if posicao < len(BUCKETS_DURACAO):
+				serie[0][posicao] += 1
+			serie[1] += valor
+			serie[2] += 1
+	
+	def copiar_valores(self):
+		"""Cópia dos valores atuais de todas as séries"""
+		with self.trava:
+			return {
+				nome: {chave: [list(valor[0]), valor[1], valor[2]] if isinstance(valor, list) else valor
+					   for chave, valor in serie.items()}
+				for nome, serie in self.valores.items()
+			}
+	
+	def limpar(self):
+		"""Zera todas as séries (usado pelos workers logo após o fork)"""
+		with self.trava:
+			for serie in self.valores.values():
+				serie.clear()
+	
+	def exportar(self, extras=(), valores=None):
+		"""
+		Gera o texto no formato de exposição do Prometheus (versão 0.0.4), com os
+		valores do registro ou com `valores` já agregados de vários processos
+		"""
+		linhas = []
+		with self.trava:
+			valores = self.valores if valores is None else valores
+			for nome, (tipo, descricao) in self.definicoes.items():
+				linhas.append(f"# HELP {nome} {descricao}")
+				linhas.append(f"# TYPE {nome} {tipo}")
+				for chave, valor in sorted(valores.get(nome, {}).items()):
+					if tipo == 'histogram':
+						contagens, soma, total = valor
+						acumulado = 0
+						for limite, contagem in zip(BUCKETS_DURACAO, contagens):
+							acumulado += contagem
+							linhas.append(f"{nome}_bucket{formatar_rotulos(chave + (('le', repr(float(limite))),))} {acumulado}")
+						linhas.append(f"{nome}_bucket{formatar_rotulos(chave + (('le', '+Inf'),))} {total}")
+						linhas.append(f"{nome}_sum{formatar_rotulos(chave)} {soma!r}")
+						linhas.append(f"{nome}_count{formatar_rotulos(chave)} {total}")
+					else:
+						linhas.append(f"{nome}{formatar_rotulos(chave)} {valor}")
+		
+		# Métricas calculadas no momento da exportação: (nome, tipo, descrição, valor)
+		for nome, tipo, descricao, valor in extras:
+			linhas.append(f"# HELP {nome} {descricao}")
+			linhas.append(f"# TYPE {nome} {tipo}")
+			linhas.append(f"{nome} {valor}")
+		
+		return '\n'.join(linhas) + '\n'
+
+def formatar_rotulos(chave):
+	"""Formata os rótulos de uma série no padrão {nome="valor",...}"""
+	if not chave:
+		return ''
+	def escapar(valor):
+		return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+	return '{' + ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in chave) + '}'
+
+metricas = RegistroMetricas()
+metricas.definir('api_requisicao_duracao_segundos', 'histogram', 'Duração das requisições por rota')
+metricas.definir('api_requisicoes_total', 'counter', 'Requisições atendidas por rota, método e status')
+metricas.definir('api_requisicoes_em_andamento', 'gauge', 'Requisições em andamento por rota')
+metricas.definir('api_resposta_bytes_total', 'counter', 'Bytes enviados no corpo das respostas por rota')
+metricas.definir('api_fase_duracao_segundos', 'histogram', 'Duração das fases internas da busca e da carga de dados')
+
+# Intervalo (segundos) entre as gravações das métricas de cada worker no modo de produção
+INTERVALO_METRICAS_WORKERS = float(os.environ.get('API_INTERVALO_METRICAS', 5))
+
+# Diretório em que cada processo do modo de produção grava suas métricas (None fora desse modo)
+diretorio_metricas_workers = None
+
+_trava_metricas_workers = threading.Lock()
+
+def gravar_metricas_processo():
+	"""
+	Grava as métricas e os contadores do cache de buscas deste processo em
+	<diretório>/<pid>.json (arquivo temporário + os.replace). A cópia é feita
+	sob a trava, então o arquivo nunca volta para valores mais antigos.
+	"""
+	if not diretorio_metricas_workers:
+		return
+	caminho = os.path.join(diretorio_metricas_workers, f"{os.getpid()}.json")
+	with _trava_metricas_workers:
+		conteudo = {
+			'valores': {
+				nome: [[[list(rotulo) for rotulo in chave], valor] for chave, valor in serie.items()]
+				for nome, serie in metricas.copiar_valores().items()
+			},
+			'cache_busca': cache_busca.estatisticas()
+		}
+		with open(f"{caminho}.tmp", 'w', encoding='utf-8') as arquivo:
+			json.dump(conteudo, arquivo)
+		os.replace(f"{caminho}.tmp", caminho)
+
+def processo_vivo(pid):
+	"""Indica se o processo ainda existe"""
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass
+	return True
+
+def agregar_metricas_workers():
+	"""
+	Soma as métricas gravadas por todos os processos do modo de produção.
+	Retorna (valores no formato do RegistroMetricas, estatísticas do cache de buscas).
+	
+	Contadores e histogramas de workers já encerrados (ex.: substituídos numa
+	recarga) continuam na soma, para que os totais nunca voltem para trás;
+	medidores só contam processos vivos. O processo que exporta grava as
+	próprias métricas antes de ler, então cada série exportada é sempre maior
+	ou igual à da exportação anterior, seja qual for o worker que a atenda.
+	"""
+	gravar_metricas_processo()
+	valores = {nome: {} for nome in metricas.definicoes}
+	estatisticas_cache = {'entradas': 0, 'acertos': 0, 'faltas': 0}
+	for nome_arquivo in os.listdir(diretorio_metricas_workers):
+		if not nome_arquivo.endswith('.json'):
+			continue
+		try:
+			with open(os.path.join(diretorio_metricas_workers, nome_arquivo), 'r', encoding='utf-8') as arquivo:
+				conteudo = json.load(arquivo)
+		except (OSError, ValueError):
+			continue
+		vivo = processo_vivo(int(nome_arquivo[:-len('.json')]))
+		
+		for nome, serie in conteudo['valores'].items():
+			if nome not in metricas.definicoes:
+				continue
+			tipo = metricas.definicoes[nome][0]
+			if tipo == 'gauge' and not vivo:
+				continue
+			for chave, valor in serie:
+				chave = tuple(tuple(rotulo) for rotulo in chave)
+				if tipo == 'histogram':
+					atual = valores[nome].setdefault(chave, [[0] * len(BUCKETS_DURACAO), 0.0, 0])
+					atual[0] = [soma + contagem for soma, contagem in zip(atual[0], valor[0])]
+					atual[1] += valor[1]
+					atual[2] += valor[2]
+				else:
+					valores[nome][chave] = valores[nome].get(chave, 0) + valor
+		
+		estatisticas_cache['acertos'] += conteudo['cache_busca']['acertos']
+		estatisticas_cache['faltas'] += conteudo['cache_busca']['faltas']
+		if vivo:
+			estatisticas_cache['entradas'] += conteudo['cache_busca']['entradas']
+	return valores, estatisticas_cache
+
+@contextmanager
+def medir_fase(operacao, fase):
+	"""Mede a duração de um trecho e registra no histograma de fases"""
+	inicio = time.perf_counter()
+	try:
+		yield
+	finally:
+		metricas.observar('api_fase_duracao_segundos', time.perf_counter() - inicio, operacao=operacao, fase=fase)
+
+def registro_para_json(registro):
+	"""Converte um registro (dict) em valores serializáveis, trocando nulos por None"""
+	convertido = {}
+	for chave, valor in registro.items():
+		if isinstance(valor, np.generic):
+			valor = valor.item()
+		if valor is pd.NA or valor is pd.NaT or (isinstance(valor, float) and pd.isna(valor)):
+			valor = None
+		convertido[chave] = valor
+	return convertido
+
+def codificar_json(valor):
+	"""Codifica um valor em JSON (bytes UTF-8) com o codificador configurado"""
+	if CODIFICADOR_JSON == 'orjson' and orjson is not None:
+		return orjson.dumps(valor)
+	return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def lista_json(fragmentos):
+	"""Junta fragmentos JSON já codificados em uma lista JSON"""
+	return b'[' + b','.join(fragmentos) + b']'
+
+def objeto_json(campos):
+	"""
+	Monta um objeto JSON a partir de um dict. Valores do tipo bytes são
+	fragmentos já codificados e entram como estão; os demais são codificados.
+	"""
+	return b'{' + b','.join(
+		codificar_json(nome) + b':' + (valor if isinstance(valor, bytes) else codificar_json(valor))
+		for nome, valor in campos.items()
+	) + b'}'
+
+def resposta_json(corpo, status=200):
+	"""Resposta HTTP com um corpo JSON já codificado"""
+	return Response(corpo, status=status, mimetype='application/json')
+
+def construir_tabelas_detalhes(df):
+	"""
+	Codifica cada operadora em JSON uma única vez (nulos já convertidos) e monta
+	as tabelas de consulta por registro ANS e por CNPJ apontando para esses
+	fragmentos. Retorna (fragmentos por linha, tabela por registro, tabela por CNPJ).
+	"""
+	json_linhas = []
+	por_registro = {}
+	por_cnpj = {}
+	for registro in df.to_dict(orient='records'):
+		detalhes = codificar_json(registro_para_json(registro))
+		json_linhas.append(detalhes)
+		
+		chave_registro = normalizar_registro_ans(registro.get('registro_ans'))
+		if chave_registro:
+			# Em caso de registro duplicado, mantém a primeira ocorrência
+			por_registro.setdefault(chave_registro, detalhes)
+		
+		chave_cnpj = normalizar_cnpj(registro.get('cnpj'))
+		if chave_cnpj:
+			por_cnpj.setdefault(chave_cnpj, []).append(detalhes)
+	
+	return json_linhas, por_registro, por_cnpj
 
 def criar_dados_exemplo():
 	"""Cria dados de exemplo para teste quando não há arquivo CSV disponível"""
@@ -190,188 +1055,1164 @@ def criar_dados_exemplo():
 	
 	return pd.DataFrame(operadoras)
 
+# Caminho para o arquivo CSV das operadoras ativas
+ARQUIVO_OPERADORAS = 'dados_ans/operadoras_ativas/operadoras_ativas.csv'
+
+# Diretório do snapshot binário do CSV das operadoras (vazio desativa)
+DIRETORIO_CACHE_DADOS = os.environ.get('API_DIRETORIO_CACHE', 'dados_ans/cache_api')
+
+# Versão do formato do snapshot binário (incrementar ao mudar padronizar_colunas)
+VERSAO_FORMATO_CACHE = 2
+
+# Intervalo (segundos) entre verificações do arquivo para recarga automática (0 desativa)
+INTERVALO_RECARGA = float(os.environ.get('API_INTERVALO_RECARGA', 30))
+
+class SnapshotOperadoras:
+	"""
+	Conjunto imutável com os dados das operadoras e tudo que é derivado deles.
+	
+	Todas as estruturas são construídas antes de o snapshot ser publicado em
+	snapshot_atual. As rotas leem snapshot_atual uma única vez por requisição
+	e usam só esse objeto, então uma recarga nunca expõe um estado incompleto.
+	"""
+	
+	def __init__(self, df, origem, assinatura=None):
+		with medir_fase('carga', 'indices'):
+			self.construir(df, origem, assinatura)
+	
+	def construir(self, df, origem, assinatura):
+		"""Monta todas as estruturas derivadas do DataFrame"""
+		self.df = df
+		self.origem = origem
+		self.assinatura = assinatura
+		self.versao = next(_contador_versoes)
+		self.carregado_em = datetime.now()
+		
+		# Colunas de busca normalizadas, índice invertido e pontuador vetorizado
+		self.df_busca = construir_colunas_busca(df)
+		self.indice_busca = IndiceBusca(self.df_busca)
+		self.pontuador_vetorizado = PontuadorVetorizado(self.df_busca)
+		
+		# JSON pré-serializado de cada linha e tabelas de consulta direta por registro ANS e CNPJ
+		self.json_linhas, self.detalhes_por_registro, self.detalhes_por_cnpj = construir_tabelas_detalhes(df)
+		
+		# Índice de trigramas das palavras dos nomes, para a busca aproximada
+		self.busca_aproximada = BuscaAproximada(self.df_busca)
+		
+		# Estrutura de prefixos para o autocompletar
+		self.sugestoes = IndiceSugestoes(df, self.df_busca)
+		
+		# Contagens por faceta e linhas por valor (modalidade, UF, cidade)
+		self.facetas = FacetasOperadoras(df)
+		
+		# Memória ocupada por coluna, exposta em /api/status
+		self.memoria_colunas = {
+			coluna: {'tipo': str(df[coluna].dtype), 'bytes': memoria_coluna(df[coluna])}
+			for coluna in df.columns
+		}
+
+# Versões dos snapshots, usadas nas chaves de cache
+_contador_versoes = itertools.count(1)
+
+# Snapshot publicado, trocado por atribuição única a cada (re)carga
+snapshot_atual = None
+
+# Trava para que apenas uma thread faça a carga inicial
+_trava_carga = threading.Lock()
+
+def assinatura_arquivo(caminho):
+	"""Retorna (tamanho, data de modificação) do arquivo ou None se ele não existir"""
+	try:
+		info = os.stat(caminho)
+	except OSError:
+		return None
+	return (info.st_size, info.st_mtime_ns)
+
+def ler_csv_operadoras(arquivo_csv):
+	"""Lê o CSV das operadoras tentando diferentes encodings (None se nenhum funcionar)"""
+	for encoding in ['utf-8', 'latin1', 'ISO-8859-1']:
+		try:
+			print(f"Tentando carregar o CSV com encoding {encoding}...")
+			return pd.read_csv(arquivo_csv, sep=';', encoding=encoding)
+		except UnicodeDecodeError:
+			continue
+		except Exception as e:
+			print(f"Erro ao carregar com encoding {encoding}: {str(e)}")
+			continue
+	return None
+
+# Colunas do CSV de operadoras ativas (Cadop) e os nomes usados na API,
+# baseado na estrutura real do CSV
+COLUNAS_CADOP = {
+	'Registro ANS': 'registro_ans',
+	'CNPJ': 'cnpj',
+	'Razão Social': 'razao_social',
+	'Nome Fantasia': 'nome_fantasia',
+	'Modalidade': 'modalidade',
+	'Logradouro': 'logradouro',
+	'Número': 'numero',
+	'Complemento': 'complemento',
+	'Bairro': 'bairro',
+	'Cidade': 'cidade',
+	'UF': 'uf',
+	'CEP': 'cep',
+	'DDD': 'ddd',
+	'Telefone': 'telefone',
+	'Fax': 'fax',
+	'Endereço eletrônico': 'email',
+	'Representante': 'representante',
+	'Cargo Representante': 'cargo_representante',
+	'Data Registro ANS': 'data_registro'
+}
+
+def padronizar_colunas(df):
+	"""Renomeia as colunas do CSV para os nomes usados na API e cria as que faltarem"""
+	# Verificar quais colunas existem e renomeá-las
+	with medir_fase('carga', 'renomear'):
+		colunas_existentes = {col: novo_nome for col, novo_nome in COLUNAS_CADOP.items() 
+							  if col in df.columns}
+		if colunas_existentes:
+			df = df.rename(columns=colunas_existentes)
+	
+	# Garantir que todas as colunas necessárias existam
+	with medir_fase('carga', 'completar'):
+		for col in ['registro_ans', 'cnpj', 'razao_social', 'nome_fantasia', 'modalidade', 
+				   'logradouro', 'numero', 'complemento', 'bairro', 'cidade', 'uf', 
+				   'cep', 'ddd', 'telefone', 'email']:
+			if col not in df.columns:
+				df[col] = ""
+	
+	# Tipos compactos por coluna, já gravados assim no snapshot binário
+	with medir_fase('carga', 'compactar'):
+		df = pd.DataFrame({coluna: compactar_coluna(df[coluna]) for coluna in df.columns})
+	
+	return df
+
+# Colunas de texto com até essa fração de valores distintos viram categóricas
+FRACAO_MAXIMA_CATEGORIAS = 0.5
+
+def compactar_coluna(serie):
+	"""
+	Representação compacta de uma coluna das operadoras: inteiros no menor
+	tipo que comporta os valores, textos repetitivos como categóricos
+	(códigos + dicionário) e os demais textos em armazenamento Arrow (com
+	pyarrow) ou com strings internadas. Os valores lidos não mudam.
+	"""
+	if pd.api.types.is_integer_dtype(serie.dtype):
+		return pd.to_numeric(serie, downcast='integer')
+	if not (pd.api.types.is_object_dtype(serie.dtype) or pd.api.types.is_string_dtype(serie.dtype)):
+		return serie
+	
+	if serie.nunique(dropna=True) <= FRACAO_MAXIMA_CATEGORIAS * len(serie):
+		return serie.astype('category')
+	if pd.api.types.infer_dtype(serie, skipna=True) != 'string':
+		return serie
+	if feather is not None:
+		if getattr(serie.dtype, 'storage', None) == 'pyarrow':
+			return serie
+		return serie.astype(pd.StringDtype('pyarrow'))
+	# Sem pyarrow, valores iguais passam a apontar para o mesmo objeto
+	return pd.Series(
+		[sys.intern(valor) if isinstance(valor, str) else valor for valor in serie.tolist()],
+		index=serie.index, dtype=serie.dtype, name=serie.name
+	)
+
+def memoria_coluna(serie):
+	"""Bytes ocupados por uma coluna, contando uma única vez cada objeto compartilhado"""
+	if not (pd.api.types.is_object_dtype(serie.dtype) or getattr(serie.dtype, 'storage', None) == 'python'):
+		return int(serie.memory_usage(deep=True, index=False))
+	valores = serie.to_numpy(dtype=object)
+	objetos = {id(valor): valor for valor in valores.tolist()}
+	return int(valores.nbytes + sum(sys.getsizeof(valor) for valor in objetos.values()))
+
+def hash_arquivo(caminho):
+	"""Calcula o SHA-256 do conteúdo de um arquivo"""
+	sha256 = hashlib.sha256()
+	with open(caminho, 'rb') as arquivo:
+		for pedaco in iter(lambda: arquivo.read(1024 * 1024), b''):
+			sha256.update(pedaco)
+	return sha256.hexdigest()
+
+def caminhos_cache_dados():
+	"""Retorna o formato e os caminhos do snapshot binário e de seus metadados"""
+	formato = 'feather' if feather is not None else 'pickle'
+	base = os.path.join(DIRETORIO_CACHE_DADOS, 'operadoras_ativas')
+	return formato, f"{base}.{formato}", f"{base}.json"
+
+def ler_snapshot_binario(assinatura):
+	"""
+	Lê o snapshot binário das operadoras se ele corresponder ao CSV atual.
+	O tamanho precisa ser igual; se a data de modificação mudou, o SHA-256 do
+	CSV decide se o conteúdo ainda é o mesmo. Retorna None quando não há
+	snapshot válido.
+	"""
+	if not DIRETORIO_CACHE_DADOS or assinatura is None:
+		return None
+	
+	formato, arquivo_dados, arquivo_meta = caminhos_cache_dados()
+	try:
+		with open(arquivo_meta, 'r', encoding='utf-8') as arquivo:
+			meta = json.load(arquivo)
+	except (OSError, ValueError):
+		return None
+	
+	tamanho, mtime_ns = assinatura
+	if (meta.get('versao_formato') != VERSAO_FORMATO_CACHE or meta.get('formato') != formato
+			or meta.get('versao_pandas') != pd.__version__ or meta.get('tamanho') != tamanho):
+		return None
+	
+	if meta.get('mtime_ns') != mtime_ns:
+		# Arquivo tocado ou copiado: confirmar pelo conteúdo
+		if hash_arquivo(ARQUIVO_OPERADORAS) != meta.get('sha256'):
+			return None
+		meta['mtime_ns'] = mtime_ns
+		gravar_json_atomico(arquivo_meta, meta)
+	
+	try:
+		if formato == 'feather':
+			df = feather.read_table(arquivo_dados, memory_map=True).to_pandas()
+		else:
+			df = pd.read_pickle(arquivo_dados)
+	except Exception as e:
+		print(f"Erro ao ler o snapshot binário {arquivo_dados}: {str(e)}")
+		return None
+	
+	print(f"Dados carregados do snapshot binário {arquivo_dados}.")
+	return df
+
+def gravar_snapshot_binario(df, assinatura):
+	"""Grava o DataFrame padronizado como snapshot binário, junto com a assinatura do CSV"""
+	if not DIRETORIO_CACHE_DADOS or assinatura is None:
+		return
+	
+	formato, arquivo_dados, arquivo_meta = caminhos_cache_dados()
+	try:
+		os.makedirs(DIRETORIO_CACHE_DADOS, exist_ok=True)
+		temporario = f"{arquivo_dados}.tmp"
+		if formato == 'feather':
+			feather.write_feather(df.reset_index(drop=True), temporario)
+		else:
+			df.to_pickle(temporario)
+		os.replace(temporario, arquivo_dados)
+		
+		# Os metadados são gravados por último: sem eles o snapshot é ignorado
+		tamanho, mtime_ns = assinatura
+		gravar_json_atomico(arquivo_meta, {
+			'versao_formato': VERSAO_FORMATO_CACHE,
+			'formato': formato,
+			'versao_pandas': pd.__version__,
+			'tamanho': tamanho,
+			'mtime_ns': mtime_ns,
+			'sha256': hash_arquivo(ARQUIVO_OPERADORAS)
+		})
+		print(f"Snapshot binário gravado em {arquivo_dados}.")
+	except Exception as e:
+		print(f"Erro ao gravar o snapshot binário {arquivo_dados}: {str(e)}")
+
+def gravar_json_atomico(caminho, dados):
+	"""Grava um JSON em um arquivo temporário e o move para o destino"""
+	temporario = f"{caminho}.tmp"
+	with open(temporario, 'w', encoding='utf-8') as arquivo:
+		json.dump(dados, arquivo)
+	os.replace(temporario, caminho)
+
+def ler_operadoras(assinatura):
+	"""
+	Lê as operadoras já padronizadas, usando o snapshot binário quando ele
+	corresponde ao CSV e gravando um novo snapshot após ler o CSV
+	"""
+	with medir_fase('carga', 'ler_snapshot_binario'):
+		df = ler_snapshot_binario(assinatura)
+	if df is not None:
+		return df
+	
+	with medir_fase('carga', 'ler_csv'):
+		df = ler_csv_operadoras(ARQUIVO_OPERADORAS)
+	if df is None:
+		return None
+	
+	df = padronizar_colunas(df)
+	gravar_snapshot_binario(df, assinatura)
+	return df
+
+def publicar_snapshot(snapshot):
+	"""Publica um novo snapshot com uma única atribuição e invalida o cache da busca"""
+	global snapshot_atual
+	snapshot_atual = snapshot
+	# Respostas em cache de versões anteriores deixam de valer
+	cache_busca.limpar()
+	cache_respostas.limpar()
+
 def carregar_dados():
 	"""Carrega os dados das operadoras do CSV ou cria dados de exemplo se não houver arquivo"""
-	global df_operadoras
 	try:
-		# Caminho para o arquivo CSV das operadoras ativas
-		arquivo_csv = 'dados_ans/operadoras_ativas/operadoras_ativas.csv'
+		assinatura = assinatura_arquivo(ARQUIVO_OPERADORAS)
+		df_operadoras = None
 		
 		# Verificar se o arquivo existe
-		if os.path.exists(arquivo_csv):
-			# Tentar diferentes encodings
-			for encoding in ['utf-8', 'latin1', 'ISO-8859-1']:
-				try:
-					print(f"Tentando carregar o CSV com encoding {encoding}...")
-					df_operadoras = pd.read_csv(arquivo_csv, sep=';', encoding=encoding)
-					break
-				except UnicodeDecodeError:
-					continue
-				except Exception as e:
-					print(f"Erro ao carregar com encoding {encoding}: {str(e)}")
-					continue
+		if assinatura is not None:
+			df_operadoras = ler_operadoras(assinatura)
 			
 			if df_operadoras is None:
 				print("Não foi possível carregar o CSV com nenhum encoding. Criando dados de exemplo.")
-				df_operadoras = criar_dados_exemplo()
+				df_operadoras = padronizar_colunas(criar_dados_exemplo())
+				assinatura = None
 		else:
-			print(f"Arquivo {arquivo_csv} não encontrado. Criando dados de exemplo.")
-			df_operadoras = criar_dados_exemplo()
-		
-		# Renomear colunas para padronizar, baseado na estrutura real do CSV
-		# Só renomeia se as colunas existirem no DataFrame
-		colunas_renomeadas = {
-			'Registro ANS': 'registro_ans',
-			'CNPJ': 'cnpj',
-			'Razão Social': 'razao_social',
-			'Nome Fantasia': 'nome_fantasia',
-			'Modalidade': 'modalidade',
-			'Logradouro': 'logradouro',
-			'Número': 'numero',
-			'Complemento': 'complemento',
-			'Bairro': 'bairro',
-			'Cidade': 'cidade',
-			'UF': 'uf',
-			'CEP': 'cep',
-			'DDD': 'ddd',
-			'Telefone': 'telefone',
-			'Fax': 'fax',
-			'Endereço eletrônico': 'email',
-			'Representante': 'representante',
-			'Cargo Representante': 'cargo_representante',
-			'Data Registro ANS': 'data_registro'
-		}
-		
-		# Verificar quais colunas existem e renomeá-las
-		colunas_existentes = {col: novo_nome for col, novo_nome in colunas_renomeadas.items() 
-							  if col in df_operadoras.columns}
-		if colunas_existentes:
-			df_operadoras = df_operadoras.rename(columns=colunas_existentes)
+			print(f"Arquivo {ARQUIVO_OPERADORAS} não encontrado. Criando dados de exemplo.")
+			df_operadoras = padronizar_colunas(criar_dados_exemplo())
 		
 		print(f"Dados carregados com sucesso. {len(df_operadoras)} operadoras encontradas.")
 		
-		# Garantir que todas as colunas necessárias existam
-		for col in ['registro_ans', 'cnpj', 'razao_social', 'nome_fantasia', 'modalidade', 
-				   'logradouro', 'numero', 'complemento', 'bairro', 'cidade', 'uf', 
-				   'cep', 'ddd', 'telefone', 'email']:
-			if col not in df_operadoras.columns:
-				df_operadoras[col] = ""
+		# Construir índices e tabelas derivadas antes de publicar os dados
+		origem = 'csv' if assinatura is not None else 'exemplo'
+		publicar_snapshot(SnapshotOperadoras(df_operadoras, origem, assinatura))
 		
 		return True
 	except Exception as e:
 		print(f"Erro ao carregar dados: {str(e)}")
 		# Em caso de erro, usar dados de exemplo
 		print("Usando dados de exemplo como fallback.")
-		df_operadoras = criar_dados_exemplo()
+		publicar_snapshot(SnapshotOperadoras(criar_dados_exemplo(), 'exemplo'))
 		return True
 
-@app.route('/api/operadoras/busca', methods=['GET'])
-def buscar_operadoras():
+def obter_snapshot():
+	"""Retorna o snapshot atual, carregando os dados na primeira chamada"""
+	snapshot = snapshot_atual
+	if snapshot is None:
+		with _trava_carga:
+			if snapshot_atual is None:
+				carregar_dados()
+				iniciar_observador_dados()
+			snapshot = snapshot_atual
+	return snapshot
+
+def recarregar_se_alterado(assinatura):
 	"""
-	Rota para buscar operadoras por termo textual
-	Parâmetros:
-		termo: Termo de busca (obrigatório)
-		limite: Limite de resultados (opcional, padrão 10)
+	Recarrega as operadoras se o arquivo tiver uma assinatura diferente da do
+	snapshot atual. O novo snapshot é montado inteiro fora do caminho das
+	requisições; se a leitura falhar, os dados atuais continuam valendo.
 	"""
-	# Verificar se os dados foram carregados
-	global df_operadoras
+	snapshot = snapshot_atual
+	if assinatura is None or (snapshot is not None and snapshot.assinatura == assinatura):
+		return False
+	
+	print(f"Arquivo {ARQUIVO_OPERADORAS} alterado. Recarregando dados...")
+	df_operadoras = ler_operadoras(assinatura)
 	if df_operadoras is None:
-		sucesso = carregar_dados()
-		if not sucesso:
-			return jsonify({
-				'erro': 'Não foi possível carregar os dados das operadoras'
-			}), 500
+		print("Não foi possível recarregar o CSV. Mantendo os dados atuais.")
+		return False
 	
-	# Obter parâmetros da requisição
-	termo_busca = request.args.get('termo', '')
-	limite = request.args.get('limite', 10, type=int)
+	novo_snapshot = SnapshotOperadoras(df_operadoras, 'csv', assinatura)
+	publicar_snapshot(novo_snapshot)
+	print(f"Dados recarregados (versão {novo_snapshot.versao}). {len(novo_snapshot.df)} operadoras encontradas.")
+	return True
+
+def observar_arquivo_operadoras(intervalo):
+	"""Laço do observador: verifica o arquivo periodicamente e recarrega quando ele muda"""
+	assinatura_anterior = assinatura_arquivo(ARQUIVO_OPERADORAS)
+	while True:
+		time.sleep(intervalo)
+		try:
+			assinatura = assinatura_arquivo(ARQUIVO_OPERADORAS)
+			# Só recarrega quando o arquivo ficou estável entre duas verificações
+			# (evita ler um CSV que ainda está sendo baixado)
+			if assinatura == assinatura_anterior:
+				recarregar_se_alterado(assinatura)
+			assinatura_anterior = assinatura
+		except Exception as e:
+			print(f"Erro ao recarregar dados: {str(e)}")
+
+_observador_dados = None
+
+def iniciar_observador_dados():
+	"""Inicia (uma única vez) a thread que recarrega os dados quando o CSV muda"""
+	global _observador_dados
+	if INTERVALO_RECARGA <= 0 or _observador_dados is not None:
+		return
+	_observador_dados = threading.Thread(
+		target=observar_arquivo_operadoras,
+		args=(INTERVALO_RECARGA,),
+		name='observador-operadoras',
+		daemon=True
+	)
+	_observador_dados.start()
+
+# Diretório com as demonstrações contábeis baixadas por 3-download-ans-data.py (ZIPs ou CSVs extraídos)
+DIRETORIO_DEMONSTRACOES = os.environ.get('API_DIRETORIO_DEMONSTRACOES', 'dados_ans/demonstracoes_contabeis')
+
+# Contas de "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO
+# HOSPITALAR", com o mesmo critério de 6-analytical-queries.sql (descrições normalizadas)
+PREFIXO_CONTA_EVENTOS = '4111'
+PADROES_CONTA_EVENTOS = [
+	re.compile(r'eventos.*sinistros.*assistencia.*saude medico hospitalar'),
+	re.compile(r'eventos sinistros conhecidos ou avisados'),
+]
+
+class DemonstracoesContabeis:
+	"""
+	Demonstrações contábeis em memória, em formato colunar compacto.
 	
-	# Validar parâmetros
-	if not termo_busca:
+	Cada lançamento ocupa uma posição nos arrays: operadora e conta como
+	códigos inteiros (índices em `operadoras` e `contas_codigo`), trimestre
+	como índice em `trimestres` (ordenados do mais antigo para o mais recente)
+	e valor em float64. Na carga, os totais de eventos/sinistros por trimestre
+	e operadora são somados uma única vez e os rankings por trimestre e por
+	ano móvel (4 trimestres) ficam prontos para consulta.
+	"""
+	
+	def __init__(self, operadoras, contas_codigo, contas_descricao, trimestres,
+				 codigo_operadora, codigo_conta, indice_trimestre, valor, assinatura=None):
+		self.operadoras = operadoras
+		self.contas_codigo = contas_codigo
+		self.contas_descricao = contas_descricao
+		self.trimestres = [tuple(int(parte) for parte in trimestre) for trimestre in trimestres]
+		self.codigo_operadora = codigo_operadora
+		self.codigo_conta = codigo_conta
+		self.indice_trimestre = indice_trimestre
+		self.valor = valor
+		self.assinatura = assinatura
+		self.carregado_em = datetime.now()
+		
+		# Contas da categoria decididas uma vez por conta, não por lançamento
+		self.contas_eventos = np.array([
+			codigo.startswith(PREFIXO_CONTA_EVENTOS)
+			or any(padrao.search(normalizar_texto_busca(descricao)) for padrao in PADROES_CONTA_EVENTOS)
+			for codigo, descricao in zip(self.contas_codigo.tolist(), self.contas_descricao.tolist())
+		], dtype=bool)
+		
+		# Totais (valor absoluto) e presença por trimestre x operadora
+		selecao = self.contas_eventos[self.codigo_conta]
+		total_operadoras = len(self.operadoras)
+		celula = self.indice_trimestre[selecao].astype(np.int64) * total_operadoras + self.codigo_operadora[selecao]
+		tamanho = len(self.trimestres) * total_operadoras
+		self.totais = np.bincount(celula, weights=np.abs(self.valor[selecao]), minlength=tamanho).reshape(len(self.trimestres), total_operadoras)
+		self.presenca = np.bincount(celula, minlength=tamanho).reshape(len(self.trimestres), total_operadoras) > 0
+		
+		# Rankings: operadoras ordenadas pelo valor (desc), por trimestre e por ano móvel
+		self.ranking_trimestre = [self.ordenar(self.totais[q], self.presenca[q]) for q in range(len(self.trimestres))]
+		self.ranking_ano = {}
+		for q in range(3, len(self.trimestres)):
+			# Como em 6-analytical-queries.sql: só operadoras com dados nos 4 trimestres
+			self.ranking_ano[q] = self.ordenar(self.totais[q - 3:q + 1].sum(axis=0), self.presenca[q - 3:q + 1].all(axis=0))
+	
+	@staticmethod
+	def ordenar(valores, validas):
+		"""Retorna (códigos das operadoras, valores) ordenados do maior para o menor valor"""
+		codigos = np.flatnonzero(validas)
+		ordem = np.lexsort((codigos, -valores[codigos]))
+		return codigos[ordem], valores[codigos[ordem]]
+	
+	def localizar_trimestre(self, ano=None, trimestre=None):
+		"""
+		Índice do trimestre pedido (o mais recente se nenhum for informado; o
+		4º trimestre, ou o último disponível, se só o ano for informado).
+		Retorna None se o trimestre não existir nos dados.
+		"""
+		if not self.trimestres:
+			return None
+		if ano is None:
+			return len(self.trimestres) - 1
+		if trimestre is None:
+			do_ano = [q for q, (ano_q, _) in enumerate(self.trimestres) if ano_q == ano]
+			return do_ano[-1] if do_ano else None
+		try:
+			return self.trimestres.index((ano, trimestre))
+		except ValueError:
+			return None
+	
+	@staticmethod
+	def rotulo(trimestre):
+		"""Rótulo de um trimestre no formato '2024-T3'"""
+		return f"{trimestre[0]}-T{trimestre[1]}"
+	
+	def estatisticas(self):
+		"""Resumo dos dados carregados"""
+		return {
+			'lancamentos': int(len(self.valor)),
+			'operadoras': int(len(self.operadoras)),
+			'contas': int(len(self.contas_codigo)),
+			'trimestres': [self.rotulo(trimestre) for trimestre in self.trimestres],
+			'memoria_mb': round(sum(array.nbytes for array in (
+				self.codigo_operadora, self.codigo_conta, self.indice_trimestre, self.valor
+			)) / 2**20, 1),
+			'carregado_em': self.carregado_em.strftime('%Y-%m-%d %H:%M:%S')
+		}
+
+# Demonstrações carregadas (None até a primeira consulta ou enquanto não houver dados)
+demonstracoes_atuais = None
+
+# Assinatura dos arquivos na última tentativa de carga (com ou sem sucesso)
+_assinatura_demonstracoes = None
+
+# Momento (time.monotonic) da próxima verificação dos arquivos; None antes da primeira carga
+_proxima_verificacao_demonstracoes = None
+
+# Trava para que apenas uma thread faça a carga das demonstrações
+_trava_demonstracoes = threading.Lock()
+
+def ler_arquivo_demonstracoes(caminho):
+	"""
+	Lê um arquivo de demonstrações (CSV ou ZIP, sem extraí-lo) só com as
+	colunas usadas nos rankings (None se não for possível)
+	"""
+	try:
+		lotes = [
+			lote[['registro_ans', 'codigo_conta', 'descricao_conta', 'valor_conta']]
+			for lote in ler_lotes_arquivo(caminho)
+		]
+	except Exception as e:
+		print(f"Erro ao ler {caminho}: {str(e)}")
+		return None
+	if not lotes:
+		return None
+	
+	df = pd.concat(lotes, ignore_index=True)
+	df['registro_ans'] = df['registro_ans'].str.lstrip('0')
+	return df
+
+def caminhos_cache_demonstracoes():
+	"""Caminhos do arquivo colunar das demonstrações e de seus metadados"""
+	return (os.path.join(DIRETORIO_CACHE_DADOS, 'demonstracoes.npz'),
+			os.path.join(DIRETORIO_CACHE_DADOS, 'demonstracoes.json'))
+
+def ler_cache_demonstracoes(assinatura):
+	"""Lê o arquivo colunar das demonstrações se ele corresponder aos arquivos atuais"""
+	if not DIRETORIO_CACHE_DADOS:
+		return None
+	arquivo_dados, arquivo_meta = caminhos_cache_demonstracoes()
+	try:
+		with open(arquivo_meta, 'r', encoding='utf-8') as arquivo:
+			meta = json.load(arquivo)
+		if meta.get('versao_formato') != VERSAO_FORMATO_CACHE or meta.get('assinatura') != assinatura:
+			return None
+		with np.load(arquivo_dados, allow_pickle=False) as arrays:
+			dados = {nome: arrays[nome] for nome in arrays.files}
+	except (OSError, ValueError, KeyError):
+		return None
+	print(f"Demonstrações carregadas do arquivo colunar {arquivo_dados}.")
+	return DemonstracoesContabeis(assinatura=assinatura, **dados)
+
+def gravar_cache_demonstracoes(demonstracoes):
+	"""Grava os arrays das demonstrações em um arquivo colunar (.npz), junto com a assinatura dos arquivos de origem"""
+	if not DIRETORIO_CACHE_DADOS:
+		return
+	arquivo_dados, arquivo_meta = caminhos_cache_demonstracoes()
+	try:
+		os.makedirs(DIRETORIO_CACHE_DADOS, exist_ok=True)
+		temporario = f"{arquivo_dados}.tmp"
+		with open(temporario, 'wb') as arquivo:
+			np.savez(
+				arquivo,
+				operadoras=demonstracoes.operadoras,
+				contas_codigo=demonstracoes.contas_codigo,
+				contas_descricao=demonstracoes.contas_descricao,
+				trimestres=np.array(demonstracoes.trimestres, dtype=np.int32).reshape(-1, 2),
+				codigo_operadora=demonstracoes.codigo_operadora,
+				codigo_conta=demonstracoes.codigo_conta,
+				indice_trimestre=demonstracoes.indice_trimestre,
+				valor=demonstracoes.valor
+			)
+		os.replace(temporario, arquivo_dados)
+		gravar_json_atomico(arquivo_meta, {
+			'versao_formato': VERSAO_FORMATO_CACHE,
+			'assinatura': demonstracoes.assinatura
+		})
+		print(f"Arquivo colunar das demonstrações gravado em {arquivo_dados}.")
+	except Exception as e:
+		print(f"Erro ao gravar o arquivo colunar {arquivo_dados}: {str(e)}")
+
+def assinatura_demonstracoes(arquivos):
+	"""Caminho, tamanho e data de modificação de cada arquivo de demonstrações"""
+	return [[caminho, *(assinatura_arquivo(caminho) or (None, None))] for _, _, caminho in arquivos]
+
+def carregar_demonstracoes(arquivos=None):
+	"""
+	Carrega as demonstrações contábeis: do arquivo colunar, se os arquivos não
+	mudaram, ou lendo o ZIP (ou CSV extraído) de cada trimestre. Retorna None
+	se não houver dados.
+	"""
+	if arquivos is None:
+		arquivos = arquivos_demonstracoes(DIRETORIO_DEMONSTRACOES)
+	if not arquivos:
+		print(f"Nenhum arquivo de demonstrações encontrado em {DIRETORIO_DEMONSTRACOES}.")
+		return None
+	
+	assinatura = assinatura_demonstracoes(arquivos)
+	demonstracoes = ler_cache_demonstracoes(assinatura)
+	if demonstracoes is not None:
+		return demonstracoes
+	
+	partes = []
+	trimestres = []
+	for ano, trimestre, caminho in arquivos:
+		with medir_fase('demonstracoes', 'ler_csv'):
+			df = ler_arquivo_demonstracoes(caminho)
+		if df is None or df.empty:
+			continue
+		df['indice_trimestre'] = np.int16(len(trimestres))
+		trimestres.append((ano, trimestre))
+		partes.append(df)
+		print(f"Demonstrações {trimestre}T{ano}: {len(df)} lançamentos.")
+	
+	if not partes:
+		return None
+	
+	with medir_fase('demonstracoes', 'codificar'):
+		df = pd.concat(partes, ignore_index=True)
+		codigo_operadora, operadoras = pd.factorize(df['registro_ans'])
+		codigo_conta, contas = pd.factorize(pd.MultiIndex.from_arrays([df['codigo_conta'], df['descricao_conta']]))
+		demonstracoes = DemonstracoesContabeis(
+			operadoras=np.array(operadoras, dtype=str),
+			contas_codigo=np.array(contas.get_level_values(0), dtype=str),
+			contas_descricao=np.array(contas.get_level_values(1), dtype=str),
+			trimestres=trimestres,
+			codigo_operadora=codigo_operadora.astype(np.int32),
+			codigo_conta=codigo_conta.astype(np.int32),
+			indice_trimestre=df['indice_trimestre'].to_numpy(dtype=np.int16),
+			valor=df['valor_conta'].to_numpy(dtype=np.float64),
+			assinatura=assinatura
+		)
+	
+	gravar_cache_demonstracoes(demonstracoes)
+	return demonstracoes
+
+def verificacao_demonstracoes_pendente():
+	"""Indica se é hora de conferir os arquivos das demonstrações (ou de fazer a primeira carga)"""
+	proxima = _proxima_verificacao_demonstracoes
+	return proxima is None or (INTERVALO_RECARGA > 0 and time.monotonic() >= proxima)
+
+def obter_demonstracoes():
+	"""
+	Retorna as demonstrações carregadas (None se não houver dados).
+	
+	A carga é feita na primeira chamada. Depois, a cada INTERVALO_RECARGA
+	segundos no máximo, uma chamada confere a assinatura dos arquivos e só
+	recarrega se ela mudou (ex.: um trimestre novo baixado). Uma carga que
+	falhou ou não encontrou arquivos também fica registrada pela assinatura e
+	só é tentada de novo quando os arquivos mudarem. Só a primeira carga faz
+	as demais chamadas esperarem; durante uma verificação elas recebem os
+	dados atuais.
+	"""
+	global demonstracoes_atuais, _assinatura_demonstracoes, _proxima_verificacao_demonstracoes
+	if not verificacao_demonstracoes_pendente():
+		return demonstracoes_atuais
+	if not _trava_demonstracoes.acquire(blocking=_proxima_verificacao_demonstracoes is None):
+		return demonstracoes_atuais
+	try:
+		# Outra thread pode ter feito a verificação enquanto esta esperava a trava
+		if not verificacao_demonstracoes_pendente():
+			return demonstracoes_atuais
+		_proxima_verificacao_demonstracoes = time.monotonic() + INTERVALO_RECARGA
+		
+		arquivos = arquivos_demonstracoes(DIRETORIO_DEMONSTRACOES)
+		assinatura = assinatura_demonstracoes(arquivos)
+		if assinatura == _assinatura_demonstracoes:
+			return demonstracoes_atuais
+		if _assinatura_demonstracoes is not None:
+			print("Arquivos de demonstrações alterados. Recarregando...")
+		_assinatura_demonstracoes = assinatura
+		
+		try:
+			demonstracoes = carregar_demonstracoes(arquivos)
+		except Exception as e:
+			print(f"Erro ao carregar demonstrações: {str(e)}")
+			demonstracoes = None
+		# Se a nova carga falhar, as demonstrações anteriores continuam valendo
+		if demonstracoes is not None:
+			demonstracoes_atuais = demonstracoes
+		return demonstracoes_atuais
+	finally:
+		_trava_demonstracoes.release()
+
+def identidade_demonstracoes():
+	"""
+	Assinatura dos arquivos das demonstrações carregadas (caminho, tamanho e
+	data de modificação de cada um), para o ETag das rotas de ranking
+	"""
+	demonstracoes = obter_demonstracoes()
+	return demonstracoes.assinatura if demonstracoes is not None else None
+
+def ranking_demonstracoes(demonstracoes, snapshot, ranking, limite):
+	"""
+	Monta as linhas de um ranking pré-calculado, com os dados cadastrais da
+	operadora. Como no JOIN de 6-analytical-queries.sql, operadoras que não
+	estão no cadastro atual são puladas.
+	"""
+	codigos, valores = ranking
+	resultados = []
+	for codigo, valor in zip(codigos.tolist(), valores.tolist()):
+		if len(resultados) >= limite:
+			break
+		registro_ans = str(demonstracoes.operadoras[codigo])
+		fragmento = snapshot.detalhes_por_registro.get(registro_ans)
+		if fragmento is None:
+			continue
+		operadora = json.loads(fragmento)
+		resultados.append({
+			'posicao': len(resultados) + 1,
+			'registro_ans': operadora.get('registro_ans'),
+			'razao_social': operadora.get('razao_social'),
+			'modalidade': operadora.get('modalidade'),
+			'valor_despesa': round(valor, 2)
+		})
+	return resultados
+
+def ordenar_top_k(linhas, pontos, limite):
+	"""
+	Retorna as posições das `limite` linhas mais relevantes, em ordem de
+	relevância (empates pela ordem original). Usa seleção parcial
+	(argpartition) para não ordenar todas as correspondências.
+	"""
+	if limite <= 0 or len(linhas) == 0:
+		return np.empty(0, dtype=np.int64)
+	
+	# Chave única por linha: maior pontuação primeiro, depois menor posição
+	chave = -pontos.astype(np.int64) * (len(linhas) + 1) + np.arange(len(linhas))
+	if len(chave) > limite:
+		selecionadas = np.argpartition(chave, limite - 1)[:limite]
+		return selecionadas[np.argsort(chave[selecionadas], kind='stable')]
+	return np.argsort(chave, kind='stable')
+
+def executar_busca(snapshot, termos, limite, apos=None, filtros=None, aproximada=False):
+	"""
+	Pontua e seleciona uma página de resultados da busca.
+	`apos` é a posição (pontos, linha) do último resultado da página anterior
+	e `filtros` restringe o resultado por faceta ({'uf': 'SP', ...}).
+	Com `aproximada`, os nomes com erros de digitação também entram, abaixo
+	de todas as correspondências diretas.
+	Retorna (linhas da página, total de correspondências, posição do último
+	resultado ou None se não houver próxima página).
+	"""
+	# Pontuar com o motor configurado, sem alterar o DataFrame compartilhado
+	with medir_fase('busca', 'pontuar'):
+		if MOTOR_BUSCA == 'vetorizado':
+			linhas, pontos = snapshot.pontuador_vetorizado.pontuar(termos)
+		else:
+			# Pontuar apenas as linhas que contêm o termo, usando o índice invertido
+			linhas, pontos = snapshot.indice_busca.pontuar(termos)
+	
+	# Acrescentar as linhas encontradas só pela busca aproximada (1 ou 2 pontos)
+	if aproximada:
+		with medir_fase('busca', 'aproximar'):
+			linhas_aproximadas, pontos_aproximados = snapshot.busca_aproximada.pontuar(termos['razao_social'])
+			novas = ~np.isin(linhas_aproximadas, linhas, assume_unique=True)
+			linhas = np.concatenate([linhas, linhas_aproximadas[novas]])
+			pontos = np.concatenate([pontos, pontos_aproximados[novas]])
+	
+	# Aplicar os filtros por faceta com as listas de linhas pré-calculadas
+	with medir_fase('busca', 'filtrar'):
+		linhas_filtro = snapshot.facetas.filtrar(filtros or {})
+		if linhas_filtro is not None:
+			dentro = np.isin(linhas, linhas_filtro, assume_unique=True)
+			linhas, pontos = linhas[dentro], pontos[dentro]
+		total_encontrado = len(linhas)
+		
+		# Manter apenas o que vem depois do cursor na ordem (pontos desc, linha asc)
+		if apos is not None:
+			pontos_cursor, linha_cursor = apos
+			depois = (pontos < pontos_cursor) | ((pontos == pontos_cursor) & (linhas > linha_cursor))
+			linhas, pontos = linhas[depois], pontos[depois]
+	
+	with medir_fase('busca', 'ordenar'):
+		ordem = ordenar_top_k(linhas, pontos, limite)
+		pagina = linhas[ordem]
+	
+	proximo = None
+	if len(pagina) and len(linhas) > len(pagina):
+		ultimo = ordem[-1]
+		proximo = (int(pontos[ultimo]), int(linhas[ultimo]))
+	
+	return pagina, total_encontrado, proximo
+
+def assinatura_termos(termos, filtros=None, aproximada=False):
+	"""Resumo curto dos termos normalizados, filtros e modo da busca, para amarrar o cursor à busca que o gerou"""
+	partes = [termos[campo] for campo in CAMPOS_BUSCA]
+	partes += [f"{campo}={normalizar_texto_busca(valor)}" for campo, valor in sorted((filtros or {}).items())]
+	if aproximada:
+		partes.append('aproximada')
+	return hashlib.sha1('\x1f'.join(partes).encode('utf-8')).hexdigest()[:12]
+
+def assinatura_dados_cursor(snapshot):
+	"""
+	Resumo curto da assinatura do CSV do snapshot. A versão sozinha recomeça
+	em 1 a cada início do servidor, então não distingue os dados de antes e
+	de depois de um reinício com o CSV alterado.
+	"""
+	return hashlib.sha1(repr(snapshot.assinatura).encode('utf-8')).hexdigest()[:12]
+
+def codificar_cursor(snapshot, termos, posicao, filtros=None, aproximada=False):
+	"""Gera o cursor opaco da próxima página"""
+	if posicao is None:
+		return None
+	dados = {
+		'v': snapshot.versao, 'd': assinatura_dados_cursor(snapshot),
+		't': assinatura_termos(termos, filtros, aproximada), 'p': posicao[0], 'l': posicao[1]
+	}
+	return base64.urlsafe_b64encode(json.dumps(dados, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor, snapshot, termos, filtros=None, aproximada=False):
+	"""
+	Decodifica um cursor de paginação e retorna a posição (pontos, linha).
+	Lança ValueError se o cursor for inválido ou de outra busca, e
+	CursorExpirado se os dados foram recarregados depois que ele foi gerado.
+	"""
+	try:
+		preenchimento = '=' * (-len(cursor) % 4)
+		dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+		versao, assinatura, posicao = dados['v'], dados['t'], (int(dados['p']), int(dados['l']))
+		assinatura_dados = dados.get('d')
+	except Exception:
+		raise ValueError('Cursor inválido')
+	
+	if assinatura != assinatura_termos(termos, filtros, aproximada):
+		raise ValueError('Cursor não corresponde ao termo de busca')
+	if versao != snapshot.versao or assinatura_dados != assinatura_dados_cursor(snapshot):
+		raise CursorExpirado('Os dados foram atualizados. Refaça a busca sem o cursor.')
+	return posicao
+
+def obter_pagina_busca(snapshot, termos, limite, apos=None, filtros=None, aproximada=False):
+	"""
+	Retorna a página da busca como (total, JSON dos resultados, total encontrado,
+	próximo cursor), consultando o cache de resultados antes de pontuar.
+	"""
+	chave_cache = (
+		snapshot.versao,
+		tuple(termos[campo] for campo in CAMPOS_BUSCA),
+		assinatura_termos(termos, filtros, aproximada),
+		limite,
+		apos
+	)
+	pagina = cache_busca.obter(chave_cache)
+	
+	if pagina is None:
+		linhas, total_encontrado, proximo = executar_busca(snapshot, termos, limite, apos, filtros, aproximada)
+		
+		# Juntar o JSON pré-serializado das linhas encontradas
+		with medir_fase('busca', 'serializar'):
+			resultados = lista_json([snapshot.json_linhas[linha] for linha in linhas])
+		pagina = (len(linhas), resultados, total_encontrado, codificar_cursor(snapshot, termos, proximo, filtros, aproximada))
+		cache_busca.guardar(chave_cache, pagina)
+	
+	return pagina
+
+def json_pagina_busca(pagina, termo_busca):
+	"""Monta o corpo JSON da resposta da busca a partir de uma página"""
+	total, resultados, total_encontrado, proximo_cursor = pagina
+	return objeto_json({
+		'total': total,
+		'total_encontrado': total_encontrado,
+		'termo_busca': termo_busca,
+		'resultados': resultados,
+		'proximo_cursor': proximo_cursor
+	})
+
+def parametro_verdadeiro(valor):
+	"""Interpreta um parâmetro booleano da URL ("true", "1", "sim")"""
+	return (valor or '').strip().lower() in ('true', '1', 'sim')
+
+class CursorExpirado(Exception):
+	"""Cursor gerado para uma versão anterior dos dados"""
+
+def aceita_ndjson():
+	"""Verifica se o cliente pediu a resposta em NDJSON (um registro JSON por linha)"""
+	return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+def gerar_ndjson(json_linhas, linhas, tamanho_bloco=500):
+	"""Gera os registros em NDJSON aos poucos, juntando os fragmentos de um bloco de linhas por vez"""
+	for inicio in range(0, len(linhas), tamanho_bloco):
+		yield b''.join(json_linhas[linha] + b'\n' for linha in linhas[inicio:inicio + tamanho_bloco])
+
+def ler_chaves_lote(corpo, campo):
+	"""Lê uma lista de chaves do corpo JSON do lote, sem repetições e na ordem enviada"""
+	valores = corpo.get(campo) or []
+	if not isinstance(valores, list) or not all(isinstance(valor, (str, int)) and not isinstance(valor, bool) for valor in valores):
+		raise ValueError(f'O campo "{campo}" deve ser uma lista de textos ou números')
+	return list(dict.fromkeys(str(valor) for valor in valores))
+
+def resolver_lote_detalhes(snapshot, registros_ans, cnpjs):
+	"""
+	Gera (tipo, chave, operadoras) para cada chave do lote, consultando as
+	tabelas indexadas do snapshot. Chaves sem correspondência vêm com a lista vazia.
+	"""
+	for registro_ans in registros_ans:
+		operadora = snapshot.detalhes_por_registro.get(normalizar_registro_ans(registro_ans))
+		yield 'registro_ans', registro_ans, [operadora] if operadora is not None else []
+	for cnpj in cnpjs:
+		yield 'cnpj', cnpj, snapshot.detalhes_por_cnpj.get(normalizar_cnpj(cnpj), [])
+
+def gerar_json_lote(itens):
+	"""
+	Gera o JSON da resposta do lote aos poucos, no mesmo formato da resposta
+	completa, para que lotes grandes não precisem ser montados em memória.
+	"""
+	nao_encontrados = {'registros_ans': [], 'cnpjs': []}
+	total = 0
+	yield b'{"resultados":['
+	for tipo, chave, operadoras in itens:
+		if not operadoras:
+			nao_encontrados['registros_ans' if tipo == 'registro_ans' else 'cnpjs'].append(chave)
+			continue
+		separador = b',' if total else b''
+		total += 1
+		yield separador + objeto_json({'tipo': tipo, 'chave': chave, 'operadoras': lista_json(operadoras)})
+	yield b'],"nao_encontrados":' + codificar_json(nao_encontrados)
+	yield b',"total":' + codificar_json(total) + b'}'
+
+def calcular_etag(snapshot, ndjson=False, extra=None):
+	"""
+	ETag forte da resposta: versão e assinatura do snapshot mais a rota, os
+	parâmetros da URL, o formato pedido e a identidade de outros dados usados
+	pela rota (`extra`). Muda sempre que os dados mudam.
+	"""
+	parametros = sorted(request.args.items(multi=True))
+	identidade = repr((snapshot.versao, snapshot.assinatura, request.path, parametros, ndjson, extra))
+	return hashlib.sha256(identidade.encode('utf-8')).hexdigest()[:32]
+
+def escolher_codificacao():
+	"""Escolhe a compressão aceita pelo cliente: brotli (se disponível), gzip ou nenhuma"""
+	opcoes = [codificacao for codificacao in CODIFICACOES_SUPORTADAS if request.accept_encodings[codificacao]]
+	if not opcoes:
+		return None
+	return max(opcoes, key=lambda codificacao: request.accept_encodings[codificacao])
+
+def comprimir(corpo, codificacao):
+	"""Comprime o corpo da resposta com a codificação escolhida"""
+	if codificacao == 'br':
+		return brotli.compress(corpo, quality=5)
+	return gzip.compress(corpo, compresslevel=6)
+
+def resposta_condicional(funcao=None, identidade=None):
+	"""
+	Decorador para rotas GET cujas respostas só mudam com os dados.
+	
+	Responde 304 quando o If-None-Match do cliente corresponde ao ETag atual,
+	sem executar a rota. As respostas 200 recebem o ETag, são comprimidas
+	conforme o Accept-Encoding e o corpo final fica em cache por versão dos
+	dados, de modo que a mesma requisição não é serializada nem comprimida
+	de novo. Respostas em streaming (NDJSON) recebem só o ETag.
+	
+	Rotas que dependem de outros dados além das operadoras informam
+	`identidade`, chamada a cada requisição, cujo valor entra no ETag (ex.:
+	@resposta_condicional(identidade=identidade_demonstracoes)).
+	"""
+	if funcao is None:
+		return lambda funcao: resposta_condicional(funcao, identidade)
+	
+	@wraps(funcao)
+	def envolver(*args, **kwargs):
+		snapshot = obter_snapshot()
+		if snapshot is None:
+			return funcao(*args, **kwargs)
+		
+		ndjson = aceita_ndjson()
+		etag = calcular_etag(snapshot, ndjson, identidade() if identidade is not None else None)
+		
+		# O ETag enviado pode ser o da versão comprimida (sufixo com a codificação)
+		variantes = [etag] + [f"{etag}-{codificacao}" for codificacao in CODIFICACOES_SUPORTADAS]
+		if any(request.if_none_match.contains(variante) for variante in variantes):
+			resposta = Response(status=304)
+			resposta.set_etag(etag)
+			resposta.headers['Cache-Control'] = 'no-cache'
+			resposta.vary.update(['Accept', 'Accept-Encoding'])
+			return resposta
+		
+		codificacao = escolher_codificacao()
+		chave_cache = (snapshot.versao, etag, codificacao)
+		em_cache = None if ndjson else cache_respostas.obter(chave_cache)
+		if em_cache is not None:
+			corpo, mimetype, codificacao_usada = em_cache
+			resposta = Response(corpo, mimetype=mimetype)
+		else:
+			resposta = app.make_response(funcao(*args, **kwargs))
+			if resposta.status_code != 200:
+				return resposta
+			
+			codificacao_usada = None
+			if not resposta.is_streamed:
+				corpo = resposta.get_data()
+				if codificacao and len(corpo) >= COMPRESSAO_TAMANHO_MINIMO:
+					corpo = comprimir(corpo, codificacao)
+					resposta.set_data(corpo)
+					codificacao_usada = codificacao
+				cache_respostas.guardar(chave_cache, (corpo, resposta.mimetype, codificacao_usada))
+		
+		if codificacao_usada:
+			resposta.headers['Content-Encoding'] = codificacao_usada
+			resposta.set_etag(f"{etag}-{codificacao_usada}")
+		else:
+			resposta.set_etag(etag)
+		resposta.headers['Cache-Control'] = 'no-cache'
+		resposta.vary.update(['Accept', 'Accept-Encoding'])
+		return resposta
+	
+	return envolver
+
+def rota_metricas():
+	"""Nome da rota usado nos rótulos das métricas (o padrão da rota, não a URL)"""
+	return request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+
+@app.before_request
+def iniciar_medicao():
+	"""Registra o início da requisição e conta a requisição em andamento"""
+	g.inicio_requisicao = time.perf_counter()
+	g.rota_metricas = rota_metricas()
+	metricas.incrementar('api_requisicoes_em_andamento', 1, rota=g.rota_metricas)
+
+@app.after_request
+def registrar_resposta(resposta):
+	"""Conta a requisição por status e o tamanho do corpo da resposta"""
+	rota = getattr(g, 'rota_metricas', rota_metricas())
+	metricas.incrementar('api_requisicoes_total', 1, rota=rota, metodo=request.method, status=str(resposta.status_code))
+	if not resposta.is_streamed and resposta.content_length is not None:
+		metricas.incrementar('api_resposta_bytes_total', resposta.content_length, rota=rota)
+	return resposta
+
+@app.teardown_request
+def finalizar_medicao(erro=None):
+	"""Registra a duração da requisição e encerra a contagem em andamento"""
+	inicio = g.pop('inicio_requisicao', None)
+	if inicio is None:
+		return
+	rota = g.pop('rota_metricas')
+	metricas.observar('api_requisicao_duracao_segundos', time.perf_counter() - inicio, rota=rota, metodo=request.method)
+	metricas.incrementar('api_requisicoes_em_andamento', -1, rota=rota)
+
+@app.route('/api/operadoras/busca', methods=['GET'])
+@resposta_condicional
+def buscar_operadoras():
+	"""
+	Rota para buscar operadoras por termo textual
+	Parâmetros:
+		termo: Termo de busca (obrigatório)
+		limite: Limite de resultados (opcional, padrão 10)
+		cursor: Cursor da próxima página, retornado em "proximo_cursor" (opcional)
+		modalidade, uf, cidade: Filtros por faceta (opcionais)
+		fuzzy: "true" para incluir nomes com erros de digitação (opcional)
+	Com o cabeçalho "Accept: application/x-ndjson", os registros são enviados
+	em streaming, um JSON por linha, e o cursor da próxima página vai no
+	cabeçalho "X-Proximo-Cursor".
+	"""
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
+	
+	# Obter parâmetros da requisição
+	termo_busca = request.args.get('termo', '')
+	limite = max(request.args.get('limite', 10, type=int), 0)
+	cursor = request.args.get('cursor')
+	filtros = {
+		campo: request.args[campo]
+		for campo in FacetasOperadoras.CAMPOS if request.args.get(campo)
+	}
+	aproximada = parametro_verdadeiro(request.args.get('fuzzy'))
+	
+	# Validar parâmetros
+	if not termo_busca:
 		return jsonify({
 			'erro': 'O parâmetro "termo" é obrigatório'
 		}), 400
 	
 	# Realizar a busca
 	try:
-		# Converter o termo de busca para lowercase para comparação case-insensitive
-		termo_lower = termo_busca.lower()
-		
-		# Função para pontuar a relevância de uma correspondência
-		def pontuacao_relevancia(row):
-			pontos = 0
-			
-			# Verificar correspondências em diferentes campos
-			campos_busca = ['razao_social', 'nome_fantasia', 'registro_ans', 'cnpj']
-			for campo in campos_busca:
-				if campo in row and pd.notna(row[campo]):
-					valor = str(row[campo]).lower()
-					
-					# Correspondência exata (maior pontuação)
-					if valor == termo_lower:
-						pontos += 10
-					# Início da string (alta pontuação)
-					elif valor.startswith(termo_lower):
-						pontos += 8
-					# Contém como palavra completa
-					elif re.search(r'\b' + re.escape(termo_lower) + r'\b', valor):
-						pontos += 5
-					# Contém em qualquer lugar
-					elif termo_lower in valor:
-						pontos += 3
-			
-			return pontos
-		
-		# Aplicar a função de pontuação a cada linha
-		df_operadoras['relevancia'] = df_operadoras.apply(pontuacao_relevancia, axis=1)
+		# Normalizar o termo da mesma forma que as colunas de busca (sem acentos e pontuação)
+		termos = termos_busca(termo_busca)
 		
-		# Filtrar linhas com pontuação > 0 e ordenar por relevância
-		resultados_df = df_operadoras[df_operadoras['relevancia'] > 0].sort_values(
-			by='relevancia', ascending=False
-		).head(limite)
+		# Posição a partir da qual continuar, quando há cursor
+		apos = None
+		if cursor:
+			try:
+				apos = decodificar_cursor(cursor, snapshot, termos, filtros, aproximada)
+			except CursorExpirado as e:
+				return jsonify({'erro': str(e)}), 410
+			except ValueError as e:
+				return jsonify({'erro': str(e)}), 400
 		
-		# Converter para lista de dicionários para o JSON
-		resultados = resultados_df.to_dict(orient='records')
+		# Exportação em streaming: só as posições das linhas ficam em memória
+		if aceita_ndjson():
+			linhas, total_encontrado, proximo = executar_busca(snapshot, termos, limite, apos, filtros, aproximada)
+			resposta = Response(gerar_ndjson(snapshot.json_linhas, linhas), mimetype='application/x-ndjson')
+			resposta.headers['X-Total-Encontrado'] = str(total_encontrado)
+			proximo_cursor = codificar_cursor(snapshot, termos, proximo, filtros, aproximada)
+			if proximo_cursor:
+				resposta.headers['X-Proximo-Cursor'] = proximo_cursor
+			return resposta
 		
-		# Limpar a coluna de relevância do DataFrame original
-		if 'relevancia' in df_operadoras.columns:
-			df_operadoras = df_operadoras.drop('relevancia', axis=1)
+		pagina = obter_pagina_busca(snapshot, termos, limite, apos, filtros, aproximada)
+		with medir_fase('busca', 'serializar'):
+			return resposta_json(json_pagina_busca(pagina, termo_busca))
+	
+	except Exception as e:
+		print(f"Erro na busca: {str(e)}")
+		return jsonify({
+			'erro': f'Erro ao processar a busca: {str(e)}'
+		}), 500
+
+@app.route('/api/operadoras/sugestoes', methods=['GET'])
+@resposta_condicional
+def sugerir_operadoras():
+	"""
+	Rota de sugestões para autocompletar a busca
+	Parâmetros:
+		prefixo: Início do nome, nome fantasia ou registro ANS (obrigatório)
+		limite: Quantidade máxima de sugestões (opcional, padrão 10, máximo 50)
+	"""
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
+	
+	prefixo = request.args.get('prefixo', '')
+	limite = min(max(request.args.get('limite', 10, type=int), 0), 50)
+	
+	# Normalizar o prefixo como as chaves (sem acentos e pontuação); registros só com dígitos
+	prefixo_normalizado = normalizar_texto_busca(prefixo)
+	if not prefixo_normalizado:
+		return jsonify({
+			'erro': 'O parâmetro "prefixo" é obrigatório'
+		}), 400
+	
+	try:
+		sugestoes = snapshot.sugestoes.sugerir(prefixo_normalizado, limite)
 		
 		return jsonify({
-			'total': len(resultados),
-			'termo_busca': termo_busca,
-			'resultados': resultados
+			'total': len(sugestoes),
+			'prefixo': prefixo,
+			'sugestoes': sugestoes
 		})
 	
 	except Exception as e:
-		print(f"Erro na busca: {str(e)}")
+		print(f"Erro ao buscar sugestões: {str(e)}")
 		return jsonify({
-			'erro': f'Erro ao processar a busca: {str(e)}'
+			'erro': f'Erro ao buscar sugestões: {str(e)}'
 		}), 500
 
 @app.route('/api/operadoras/detalhes/<registro_ans>', methods=['GET'])
+@resposta_condicional
 def detalhes_operadora(registro_ans):
 	"""Rota para obter detalhes de uma operadora específica pelo registro ANS"""
-	# Verificar se os dados foram carregados
-	global df_operadoras
-	if df_operadoras is None:
-		sucesso = carregar_dados()
-		if not sucesso:
-			return jsonify({
-				'erro': 'Não foi possível carregar os dados das operadoras'
-			}), 500
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
 	
 	try:
-		# Filtrar pelo registro ANS
-		operadora = df_operadoras[df_operadoras['registro_ans'] == registro_ans]
+		# Consultar a tabela indexada pelo registro ANS normalizado
+		operadora = snapshot.detalhes_por_registro.get(normalizar_registro_ans(registro_ans))
 		
-		if operadora.empty:
+		if operadora is None:
 			return jsonify({
 				'erro': f'Operadora com registro {registro_ans} não encontrada'
 			}), 404
 		
-		# Retornar os detalhes da operadora
-		return jsonify(operadora.iloc[0].to_dict())
+		# Retornar os detalhes da operadora (JSON já pronto no snapshot)
+		return resposta_json(operadora)
 	
 	except Exception as e:
 		print(f"Erro ao buscar detalhes: {str(e)}")
@@ -379,27 +2220,109 @@ def detalhes_operadora(registro_ans):
 			'erro': f'Erro ao buscar detalhes da operadora: {str(e)}'
 		}), 500
 
+@app.route('/api/operadoras/detalhes', methods=['POST'])
+def detalhes_operadoras_lote():
+	"""
+	Rota para obter os detalhes de várias operadoras em uma única requisição
+	Corpo (JSON):
+		registros_ans: Lista de registros ANS (opcional)
+		cnpjs: Lista de CNPJs, com ou sem pontuação (opcional)
+	Retorna as operadoras encontradas para cada chave em "resultados" e as
+	chaves sem correspondência em "nao_encontrados". Lotes com mais de
+	LOTE_DETALHES_STREAMING chaves são enviados em streaming.
+	"""
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
+	
+	# Validar o corpo da requisição
+	corpo = request.get_json(silent=True)
+	if not isinstance(corpo, dict):
+		return jsonify({
+			'erro': 'O corpo da requisição deve ser um objeto JSON com "registros_ans" e/ou "cnpjs"'
+		}), 400
+	
+	try:
+		registros_ans = ler_chaves_lote(corpo, 'registros_ans')
+		cnpjs = ler_chaves_lote(corpo, 'cnpjs')
+	except ValueError as e:
+		return jsonify({'erro': str(e)}), 400
+	
+	total_chaves = len(registros_ans) + len(cnpjs)
+	if not total_chaves:
+		return jsonify({
+			'erro': 'Informe ao menos um valor em "registros_ans" ou "cnpjs"'
+		}), 400
+	if total_chaves > LOTE_DETALHES_MAXIMO:
+		return jsonify({
+			'erro': f'O lote pode ter no máximo {LOTE_DETALHES_MAXIMO} chaves'
+		}), 413
+	
+	try:
+		itens = resolver_lote_detalhes(snapshot, registros_ans, cnpjs)
+		
+		# Lotes grandes: o JSON é enviado à medida que as chaves são resolvidas
+		if total_chaves > LOTE_DETALHES_STREAMING:
+			return Response(gerar_json_lote(itens), mimetype='application/json')
+		
+		# Lotes pequenos: o mesmo JSON, montado de uma vez
+		return resposta_json(b''.join(gerar_json_lote(itens)))
+	
+	except Exception as e:
+		print(f"Erro ao buscar detalhes em lote: {str(e)}")
+		return jsonify({
+			'erro': f'Erro ao buscar detalhes das operadoras: {str(e)}'
+		}), 500
+
+@app.route('/api/operadoras/cnpj/<path:cnpj>', methods=['GET'])
+@resposta_condicional
+def operadoras_por_cnpj(cnpj):
+	"""Rota para obter as operadoras cadastradas com um CNPJ (com ou sem pontuação)"""
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
+	
+	try:
+		# Consultar a tabela indexada pelo CNPJ normalizado
+		operadoras = snapshot.detalhes_por_cnpj.get(normalizar_cnpj(cnpj), [])
+		
+		if not operadoras:
+			return jsonify({
+				'erro': f'Operadora com CNPJ {cnpj} não encontrada'
+			}), 404
+		
+		return resposta_json(objeto_json({
+			'total': len(operadoras),
+			'cnpj': cnpj,
+			'resultados': lista_json(operadoras)
+		}))
+	
+	except Exception as e:
+		print(f"Erro ao buscar operadora por CNPJ: {str(e)}")
+		return jsonify({
+			'erro': f'Erro ao buscar operadora por CNPJ: {str(e)}'
+		}), 500
+
 @app.route('/api/operadoras/modalidades', methods=['GET'])
+@resposta_condicional
 def listar_modalidades():
 	"""Rota para listar as modalidades disponíveis e quantidade de operadoras por modalidade"""
-	# Verificar se os dados foram carregados
-	global df_operadoras
-	if df_operadoras is None:
-		sucesso = carregar_dados()
-		if not sucesso:
-			return jsonify({
-				'erro': 'Não foi possível carregar os dados das operadoras'
-			}), 500
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
 	
 	try:
-		# Contar operadoras por modalidade
-		contagem = df_operadoras['modalidade'].value_counts().to_dict()
-		
-		# Formatar resultado
-		modalidades = [
-			{'nome': modalidade, 'quantidade': quantidade}
-			for modalidade, quantidade in contagem.items()
-		]
+		# Contagem por modalidade já calculada na carga dos dados
+		modalidades = snapshot.facetas.contagens['modalidade']
 		
 		return jsonify({
 			'total': len(modalidades),
@@ -412,28 +2335,384 @@ def listar_modalidades():
 			'erro': f'Erro ao listar modalidades: {str(e)}'
 		}), 500
 
+@app.route('/api/operadoras/facetas', methods=['GET'])
+@resposta_condicional
+def listar_facetas():
+	"""
+	Rota para listar a quantidade de operadoras por modalidade, UF, cidade e modalidade × UF
+	Parâmetros:
+		campos: Facetas desejadas, separadas por vírgula (opcional, padrão todas)
+	"""
+	# Obter o snapshot atual dos dados (carregados na primeira requisição)
+	snapshot = obter_snapshot()
+	if snapshot is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar os dados das operadoras'
+		}), 500
+	
+	contagens = snapshot.facetas.contagens
+	campos = [campo.strip() for campo in request.args.get('campos', '').split(',') if campo.strip()]
+	desconhecidos = [campo for campo in campos if campo not in contagens]
+	if desconhecidos:
+		return jsonify({
+			'erro': f'Facetas desconhecidas: {", ".join(desconhecidos)}. Disponíveis: {", ".join(contagens)}'
+		}), 400
+	
+	try:
+		# Contagens já calculadas na carga dos dados
+		return jsonify({
+			'total_operadoras': len(snapshot.df),
+			'facetas': {campo: contagens[campo] for campo in (campos or contagens)}
+		})
+	
+	except Exception as e:
+		print(f"Erro ao listar facetas: {str(e)}")
+		return jsonify({
+			'erro': f'Erro ao listar facetas: {str(e)}'
+		}), 500
+
+def parametros_periodo():
+	"""Lê ano, trimestre e limite das rotas de ranking (ValueError se inválidos)"""
+	ano = request.args.get('ano', type=int)
+	trimestre = request.args.get('trimestre', type=int)
+	if trimestre is not None and (ano is None or trimestre not in (1, 2, 3, 4)):
+		raise ValueError('Informe "trimestre" entre 1 e 4, junto com "ano"')
+	limite = min(max(request.args.get('limite', 10, type=int), 1), 100)
+	return ano, trimestre, limite
+
+@app.route('/api/demonstracoes/ranking/trimestre', methods=['GET'])
+@resposta_condicional(identidade=identidade_demonstracoes)
+def ranking_trimestre():
+	"""
+	Rota com as operadoras de maiores despesas com eventos/sinistros médico-hospitalares em um trimestre
+	Parâmetros:
+		ano, trimestre: Trimestre desejado (opcionais, padrão o último disponível)
+		limite: Quantidade de operadoras (opcional, padrão 10, máximo 100)
+	"""
+	snapshot = obter_snapshot()
+	demonstracoes = obter_demonstracoes()
+	if snapshot is None or demonstracoes is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar as demonstrações contábeis'
+		}), 503
+	
+	try:
+		ano, trimestre, limite = parametros_periodo()
+	except ValueError as e:
+		return jsonify({'erro': str(e)}), 400
+	
+	indice = demonstracoes.localizar_trimestre(ano, trimestre)
+	if indice is None:
+		return jsonify({
+			'erro': 'Trimestre não encontrado nas demonstrações carregadas'
+		}), 404
+	
+	return jsonify({
+		'periodo': DemonstracoesContabeis.rotulo(demonstracoes.trimestres[indice]),
+		'trimestres': [DemonstracoesContabeis.rotulo(demonstracoes.trimestres[indice])],
+		'resultados': ranking_demonstracoes(demonstracoes, snapshot, demonstracoes.ranking_trimestre[indice], limite)
+	})
+
+@app.route('/api/demonstracoes/ranking/ano', methods=['GET'])
+@resposta_condicional(identidade=identidade_demonstracoes)
+def ranking_ano():
+	"""
+	Rota com as operadoras de maiores despesas com eventos/sinistros médico-hospitalares em 4 trimestres
+	Parâmetros:
+		ano, trimestre: Último trimestre do período (opcionais, padrão o último disponível;
+			só com "ano", o período é o ano civil)
+		limite: Quantidade de operadoras (opcional, padrão 10, máximo 100)
+	"""
+	snapshot = obter_snapshot()
+	demonstracoes = obter_demonstracoes()
+	if snapshot is None or demonstracoes is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar as demonstrações contábeis'
+		}), 503
+	
+	try:
+		ano, trimestre, limite = parametros_periodo()
+	except ValueError as e:
+		return jsonify({'erro': str(e)}), 400
+	
+	indice = demonstracoes.localizar_trimestre(ano, 4 if ano is not None and trimestre is None else trimestre)
+	if indice not in demonstracoes.ranking_ano:
+		return jsonify({
+			'erro': 'Não há 4 trimestres de demonstrações até o período informado'
+		}), 404
+	
+	trimestres = [DemonstracoesContabeis.rotulo(periodo) for periodo in demonstracoes.trimestres[indice - 3:indice + 1]]
+	return jsonify({
+		'periodo': f"{trimestres[0]} a {trimestres[-1]}",
+		'trimestres': trimestres,
+		'resultados': ranking_demonstracoes(demonstracoes, snapshot, demonstracoes.ranking_ano[indice], limite)
+	})
+
+@app.route('/api/demonstracoes/trimestres', methods=['GET'])
+def listar_trimestres_demonstracoes():
+	"""Rota com os trimestres e o volume das demonstrações contábeis carregadas"""
+	demonstracoes = obter_demonstracoes()
+	if demonstracoes is None:
+		return jsonify({
+			'erro': 'Não foi possível carregar as demonstrações contábeis'
+		}), 503
+	
+	return jsonify(demonstracoes.estatisticas())
+
 @app.route('/api/status', methods=['GET'])
 def status():
 	"""Rota para verificar o status da API"""
-	global df_operadoras
-	
 	# Se os dados ainda não foram carregados, tenta carregar
-	if df_operadoras is None:
-		carregar_dados()
+	snapshot = obter_snapshot()
 	
-	return jsonify({
+	return jsonify(dados_status(snapshot))
+
+def dados_status(snapshot):
+	"""Informações de status da API e dos dados carregados"""
+	return {
 		'status': 'online',
 		'versao': '1.0.0',
 		'data_hora': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-		'dados_carregados': df_operadoras is not None,
-		'total_operadoras': len(df_operadoras) if df_operadoras is not None else 0
-	})
+		'dados_carregados': snapshot is not None,
+		'total_operadoras': len(snapshot.df) if snapshot is not None else 0,
+		'versao_dados': snapshot.versao if snapshot is not None else 0,
+		'origem_dados': snapshot.origem if snapshot is not None else None,
+		'dados_carregados_em': snapshot.carregado_em.strftime('%Y-%m-%d %H:%M:%S') if snapshot is not None else None,
+		'memoria_dados': dados_memoria(snapshot) if snapshot is not None else None,
+		'cache_busca': cache_busca.estatisticas(),
+		'cache_respostas': cache_respostas.estatisticas()
+	}
 
-if __name__ == '__main__':
-	# Carregar dados ao iniciar a aplicação
+def dados_memoria(snapshot):
+	"""Memória ocupada pelas colunas do snapshot, da maior para a menor"""
+	colunas = sorted(snapshot.memoria_colunas.items(), key=lambda item: -item[1]['bytes'])
+	return {
+		'total_mb': round(sum(coluna['bytes'] for _, coluna in colunas) / 2**20, 2),
+		'colunas': {
+			nome: {'tipo': coluna['tipo'], 'mb': round(coluna['bytes'] / 2**20, 3)}
+			for nome, coluna in colunas
+		}
+	}
+
+@app.route('/api/metrics', methods=['GET'])
+def exportar_metricas():
+	"""Rota com as métricas da API no formato de texto do Prometheus"""
+	snapshot = snapshot_atual
+	if diretorio_metricas_workers:
+		# Modo de produção: somar as métricas de todos os workers, não só as deste
+		valores, estatisticas_cache = agregar_metricas_workers()
+	else:
+		valores, estatisticas_cache = None, cache_busca.estatisticas()
+	extras = [
+		('api_operadoras_total', 'gauge', 'Operadoras no snapshot atual', len(snapshot.df) if snapshot is not None else 0),
+		('api_versao_dados', 'gauge', 'Versão do snapshot de dados atual', snapshot.versao if snapshot is not None else 0),
+		('api_cache_busca_entradas', 'gauge', 'Entradas no cache da busca', estatisticas_cache['entradas']),
+		('api_cache_busca_acertos_total', 'counter', 'Acertos do cache da busca', estatisticas_cache['acertos']),
+		('api_cache_busca_faltas_total', 'counter', 'Faltas do cache da busca', estatisticas_cache['faltas']),
+	]
+	return Response(metricas.exportar(extras, valores), mimetype='text/plain; version=0.0.4')
+
+# Segundos que um worker tem para terminar as requisições em andamento antes de ser morto com SIGKILL
+TEMPO_ENCERRAMENTO_WORKER = float(os.environ.get('API_TEMPO_ENCERRAMENTO', 30))
+
+class ServidorWSGIPool(BaseWSGIServer):
+	"""Servidor WSGI do werkzeug que atende as conexões com um pool fixo de threads"""
+	
+	multithread = True
+	
+	def __init__(self, host, porta, aplicacao, threads, fd=None):
+		super().__init__(host, porta, aplicacao, fd=fd)
+		self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api-worker')
+	
+	def process_request(self, request, client_address):
+		self.pool.submit(self.atender_requisicao, request, client_address)
+	
+	def atender_requisicao(self, request, client_address):
+		try:
+			self.finish_request(request, client_address)
+		except Exception:
+			self.handle_error(request, client_address)
+		finally:
+			self.shutdown_request(request)
+	
+	def encerrar(self):
+		"""Para de aceitar conexões e espera as requisições em andamento terminarem"""
+		self.shutdown()
+		self.pool.shutdown(wait=True)
+
+def executar_worker(socket_servidor, host, porta, threads):
+	"""Laço de um processo worker: atende requisições no socket herdado do processo pai"""
+	servidor = ServidorWSGIPool(host, porta, app, threads, fd=socket_servidor.fileno())
+	
+	# As métricas herdadas do pai (ex.: fases da carga) já estão no arquivo dele
+	metricas.limpar()
+	parar_metricas = threading.Event()
+	def publicar_metricas():
+		while not parar_metricas.wait(INTERVALO_METRICAS_WORKERS):
+			gravar_metricas_processo()
+	threading.Thread(target=publicar_metricas, daemon=True).start()
+	
+	# SIGTERM encerra o worker de forma graciosa (sem cortar requisições em andamento)
+	def ao_encerrar(signum, frame):
+		threading.Thread(target=servidor.encerrar, daemon=True).start()
+	signal.signal(signal.SIGTERM, ao_encerrar)
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	
+	try:
+		servidor.serve_forever()
+	finally:
+		servidor.pool.shutdown(wait=True)
+		servidor.server_close()
+		# Últimos valores deste worker, que continuam na soma depois que ele termina
+		parar_metricas.set()
+		gravar_metricas_processo()
+
+def criar_worker(socket_servidor, host, porta, threads):
+	"""Cria um processo worker com fork, herdando o snapshot já carregado (copy-on-write)"""
+	pid = os.fork()
+	if pid == 0:
+		codigo_saida = 0
+		try:
+			executar_worker(socket_servidor, host, porta, threads)
+		except BaseException:
+			codigo_saida = 1
+		finally:
+			os._exit(codigo_saida)
+	return pid
+
+def aguardar_worker(pid, tempo_limite=TEMPO_ENCERRAMENTO_WORKER):
+	"""
+	Espera um worker que recebeu SIGTERM terminar, sem bloquear além do tempo
+	limite. Se ele não terminar a tempo, é morto com SIGKILL.
+	"""
+	limite = time.monotonic() + tempo_limite
+	while time.monotonic() < limite:
+		try:
+			pid_terminado, _ = os.waitpid(pid, os.WNOHANG)
+		except ChildProcessError:
+			return
+		if pid_terminado == pid:
+			return
+		time.sleep(0.1)
+	print(f"Worker {pid} não terminou em {tempo_limite:g}s. Enviando SIGKILL.")
+	try:
+		os.kill(pid, signal.SIGKILL)
+		os.waitpid(pid, 0)
+	except (ProcessLookupError, ChildProcessError):
+		pass
+
+def servir_producao(host, porta, workers, threads):
+	"""
+	Modo de produção: carrega os dados e índices uma única vez no processo pai
+	e cria N workers com fork. Os workers compartilham as páginas de memória
+	do snapshot (copy-on-write) e atendem o mesmo socket, cada um com um pool
+	de threads. Quando o CSV muda, o pai recarrega o snapshot e substitui os
+	workers um a um, sem deixar de atender requisições.
+	"""
 	carregar_dados()
+	# As demonstrações também são carregadas antes do fork, para serem compartilhadas
+	if os.path.isdir(DIRETORIO_DEMONSTRACOES):
+		obter_demonstracoes()
+	# Congelar os objetos já criados para que o coletor de lixo não os toque
+	# nos workers, o que quebraria o compartilhamento das páginas
+	gc.freeze()
+	
+	if not hasattr(os, 'fork'):
+		print("Sistema sem suporte a fork. Iniciando um único processo com pool de threads.")
+		iniciar_observador_dados()
+		ServidorWSGIPool(host, porta, app, threads).serve_forever()
+		return
+	
+	# Cada processo grava suas métricas neste diretório; /api/metrics soma todas
+	global diretorio_metricas_workers
+	diretorio_metricas_workers = tempfile.mkdtemp(prefix='api-metricas-')
+	gravar_metricas_processo()
+	
+	socket_servidor = socket.create_server((host, porta), backlog=2048, reuse_port=False)
+	socket_servidor.set_inheritable(True)
+	# Todos os workers acordam com cada conexão nova, mas só um consegue o accept;
+	# com o socket bloqueante os demais ficariam presos no accept e não
+	# atenderiam o shutdown. Não bloqueante, o accept sem conexão falha com
+	# BlockingIOError, que o socketserver trata como "nenhuma conexão"
+	socket_servidor.setblocking(False)
+	
+	pids = set()
+	for _ in range(workers):
+		pids.add(criar_worker(socket_servidor, host, porta, threads))
+	print(f"Servidor de produção na porta {porta}: {workers} workers x {threads} threads (pai PID {os.getpid()}).")
+	
+	encerrando = False
+	def ao_encerrar(signum, frame):
+		nonlocal encerrando
+		encerrando = True
+	signal.signal(signal.SIGTERM, ao_encerrar)
+	signal.signal(signal.SIGINT, ao_encerrar)
+	
+	assinatura_anterior = assinatura_arquivo(ARQUIVO_OPERADORAS)
+	proxima_verificacao = time.monotonic() + INTERVALO_RECARGA
+	while not encerrando:
+		# Recriar workers que terminaram inesperadamente
+		while pids:
+			pid, _ = os.waitpid(-1, os.WNOHANG)
+			if pid == 0:
+				break
+			if pid in pids:
+				pids.discard(pid)
+				print(f"Worker {pid} terminou. Criando um novo worker.")
+				pids.add(criar_worker(socket_servidor, host, porta, threads))
+		
+		# Recarregar no pai quando o CSV mudar e substituir os workers um a um
+		if INTERVALO_RECARGA > 0 and time.monotonic() >= proxima_verificacao:
+			proxima_verificacao = time.monotonic() + INTERVALO_RECARGA
+			try:
+				assinatura = assinatura_arquivo(ARQUIVO_OPERADORAS)
+				if assinatura == assinatura_anterior and recarregar_se_alterado(assinatura):
+					gravar_metricas_processo()
+					gc.freeze()
+					for pid_antigo in list(pids):
+						pids.add(criar_worker(socket_servidor, host, porta, threads))
+						pids.discard(pid_antigo)
+						os.kill(pid_antigo, signal.SIGTERM)
+						aguardar_worker(pid_antigo)
+				assinatura_anterior = assinatura
+			except Exception as e:
+				print(f"Erro ao recarregar dados: {str(e)}")
+		
+		time.sleep(0.5)
+	
+	print("Encerrando workers...")
+	for pid in pids:
+		os.kill(pid, signal.SIGTERM)
+	for pid in pids:
+		aguardar_worker(pid)
+	socket_servidor.close()
+	shutil.rmtree(diretorio_metricas_workers, ignore_errors=True)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Servidor API de consulta de operadoras ANS')
+	parser.add_argument('--producao', action='store_true',
+						help='Modo de produção: dados carregados uma vez e workers criados com fork. '
+							 '/api/metrics soma as métricas de todos os workers, gravadas por cada um a cada '
+							 'API_INTERVALO_METRICAS segundos (a do worker que atende é sempre atual)')
+	parser.add_argument('--sem-depuracao', action='store_true',
+						help='Servidor de desenvolvimento sem o depurador e sem o recarregador automático '
+							 '(um único processo; usado pelo benchmark)')
+	parser.add_argument('--workers', type=int, default=int(os.environ.get('API_WORKERS', os.cpu_count() or 1)),
+						help='Quantidade de processos worker no modo de produção')
+	parser.add_argument('--threads', type=int, default=int(os.environ.get('API_THREADS', 8)),
+						help='Threads por worker no modo de produção')
+	argumentos = parser.parse_args()
 	
-	# Iniciar servidor Flask
 	porta = int(os.environ.get("PORT", 5000))
-	print(f"Iniciando servidor API na porta {porta}...")
-	app.run(host='0.0.0.0', port=porta, debug=True)
\ No newline at end of file
+	
+	if argumentos.producao:
+		servir_producao('0.0.0.0', porta, max(argumentos.workers, 1), max(argumentos.threads, 1))
+	else:
+		# Carregar dados ao iniciar a aplicação e observar o CSV para recarga automática
+		carregar_dados()
+		iniciar_observador_dados()
+		
+		# Iniciar servidor Flask de desenvolvimento
+		print(f"Iniciando servidor API na porta {porta}...")
+		depuracao = not argumentos.sem_depuracao
+		app.run(host='0.0.0.0', port=porta, debug=depuracao, use_reloader=depuracao)
\ No newline at end of file
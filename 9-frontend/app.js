@@ -18,6 +18,10 @@ new Vue({
 		// Configurações
 		limite: 10,
 		
+		// Sugestões de autocompletar
+		sugestoes: [],
+		temporizadorSugestoes: null,
+		
 		// Modal de detalhes
 		operadoraSelecionada: null,
 		modalDetalhes: null,
@@ -35,8 +39,41 @@ new Vue({
 		this.verificarStatusAPI();
 	},
 	
+	// Observar o campo de busca para sugerir operadoras enquanto o usuário digita
+	watch: {
+		termoBusca(novoTermo) {
+			// Aguardar uma pausa na digitação antes de consultar a API
+			clearTimeout(this.temporizadorSugestoes);
+			this.temporizadorSugestoes = setTimeout(() => {
+				this.buscarSugestoes(novoTermo);
+			}, 150);
+		}
+	},
+	
 	// Métodos da aplicação
 	methods: {
+		// Buscar sugestões de operadoras para o autocompletar
+		buscarSugestoes(prefixo) {
+			if (prefixo.trim().length < 2) {
+				this.sugestoes = [];
+				return;
+			}
+			
+			const url = `${API_BASE_URL}/operadoras/sugestoes?prefixo=${encodeURIComponent(prefixo)}&limite=8`;
+			
+			axios.get(url)
+				.then(response => {
+					// Ignorar respostas de prefixos que já foram alterados
+					if (prefixo === this.termoBusca) {
+						this.sugestoes = response.data.sugestoes || [];
+					}
+				})
+				.catch(error => {
+					console.error('Erro ao buscar sugestões:', error);
+					this.sugestoes = [];
+				});
+		},
+		
 		// Buscar operadoras baseado no termo de busca
 		buscarOperadoras() {
 			// Verificar se há um termo de busca
@@ -0,0 +1,151 @@
+"""
+Cliente HTTP compartilhado pelos scripts que acessam os servidores da ANS.
+
+Uma única sessão do requests, com pool de conexões e keep-alive, reaproveita
+as conexões TCP/TLS entre os downloads. Toda requisição tem tempo limite de
+conexão e de leitura e é repetida, com espera exponencial e aleatória, em
+respostas 5xx/429 e em falhas de conexão (conexão recusada ou encerrada,
+tempo esgotado). O cliente conta, por servidor, requisições, conexões
+abertas, conexões reaproveitadas, repetições e falhas.
+
+Usado por 1-webscraping_ans.py, 3-download-ans-data.py e sincronizacao.py.
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Tempos limite (segundos) para abrir a conexão e entre dois pacotes recebidos
+TEMPO_LIMITE_CONEXAO = float(os.environ.get('ANS_HTTP_TEMPO_CONEXAO', 10))
+TEMPO_LIMITE_LEITURA = float(os.environ.get('ANS_HTTP_TEMPO_LEITURA', 60))
+
+# Repetições após a primeira tentativa
+TENTATIVAS_EXTRAS = int(os.environ.get('ANS_HTTP_TENTATIVAS', 4))
+
+# Espera base e máxima (segundos) entre repetições: base * 2^n, com sorteio
+ESPERA_BASE = float(os.environ.get('ANS_HTTP_ESPERA_BASE', 0.5))
+ESPERA_MAXIMA = float(os.environ.get('ANS_HTTP_ESPERA_MAXIMA', 30))
+
+# Conexões mantidas abertas por servidor
+CONEXOES_POR_SERVIDOR = int(os.environ.get('ANS_HTTP_CONEXOES', 10))
+
+# Status HTTP que indicam falha temporária do servidor
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+class ClienteHTTP:
+	"""
+	Sessão HTTP com pool de conexões, tempos limite e repetição automática.
+	
+	Pode ser usada por várias threads ao mesmo tempo. Só o início da
+	requisição é repetido: uma falha durante a leitura do corpo de uma
+	resposta em streaming é tratada por quem a lê (ex.: retomada com Range).
+	"""
+	
+	def __init__(self, tempo_conexao=TEMPO_LIMITE_CONEXAO, tempo_leitura=TEMPO_LIMITE_LEITURA,
+				 tentativas_extras=TENTATIVAS_EXTRAS, espera_base=ESPERA_BASE,
+				 espera_maxima=ESPERA_MAXIMA, conexoes=CONEXOES_POR_SERVIDOR):
+		self.tempo_limite = (tempo_conexao, tempo_leitura)
+		self.tentativas_extras = tentativas_extras
+		self.espera_base = espera_base
+		self.espera_maxima = espera_maxima
+		
+		self.adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes, max_retries=0)
+		self.sessao = requests.Session()
+		self.sessao.mount('http://', self.adaptador)
+		self.sessao.mount('https://', self.adaptador)
+		
+		self.trava = threading.Lock()
+		self.contadores = {}
+	
+	def contar(self, host, nome, quantidade=1):
+		with self.trava:
+			contadores = self.contadores.setdefault(host, {'requisicoes': 0, 'repeticoes': 0, 'falhas': 0})
+			contadores[nome] += quantidade
+	
+	def espera(self, tentativa, resposta=None):
+		"""Tempo até a próxima tentativa: Retry-After do servidor ou espera exponencial com sorteio"""
+		if resposta is not None:
+			try:
+				return min(float(resposta.headers.get('Retry-After')), self.espera_maxima)
+			except (TypeError, ValueError):
+				pass
+		return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+	
+	def get(self, url, **kwargs):
+		"""
+		GET com tempo limite e repetição. Retorna a resposta (inclusive de erro,
+		após esgotar as tentativas) ou propaga a última exceção de conexão.
+		"""
+		kwargs.setdefault('timeout', self.tempo_limite)
+		host = urlparse(url).netloc
+		
+		for tentativa in range(self.tentativas_extras + 1):
+			ultima = tentativa == self.tentativas_extras
+			self.contar(host, 'requisicoes')
+			try:
+				resposta = self.sessao.get(url, **kwargs)
+			except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+				self.contar(host, 'falhas')
+				if ultima:
+					raise
+				time.sleep(self.espera(tentativa))
+			else:
+				if resposta.status_code not in STATUS_REPETIR or ultima:
+					return resposta
+				self.contar(host, 'falhas')
+				espera = self.espera(tentativa, resposta)
+				resposta.close()
+				time.sleep(espera)
+			self.contar(host, 'repeticoes')
+	
+	def estatisticas(self):
+		"""
+		Contadores por servidor. `conexoes_abertas` vem do pool do urllib3;
+		as demais requisições reaproveitaram conexões já abertas (keep-alive).
+		"""
+		resultado = {}
+		with self.trava:
+			contadores = {host: dict(valores) for host, valores in self.contadores.items()}
+		# Conexões abertas por pool (um pool por esquema, servidor e porta)
+		conexoes = {}
+		pools = self.adaptador.poolmanager.pools
+		for chave in pools.keys():
+			pool = pools.get(chave)
+			if pool is not None:
+				host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+				conexoes[host] = conexoes.get(host, 0) + pool.num_connections
+		for host, valores in contadores.items():
+			abertas = conexoes.get(host.lower(), 0)
+			valores['conexoes_abertas'] = abertas
+			valores['conexoes_reaproveitadas'] = max(valores['requisicoes'] - valores['falhas'] - abertas, 0)
+			resultado[host] = valores
+		return resultado
+	
+	def resumo(self):
+		"""Texto com as estatísticas de cada servidor, para o fim dos scripts"""
+		linhas = []
+		for host, valores in sorted(self.estatisticas().items()):
+			linhas.append(
+				f"{host}: {valores['requisicoes']} requisições, {valores['conexoes_abertas']} conexões abertas, "
+				f"{valores['conexoes_reaproveitadas']} reaproveitadas, {valores['repeticoes']} repetições, "
+				f"{valores['falhas']} falhas"
+			)
+		return '\n'.join(linhas)
+
+# Cliente compartilhado, criado no primeiro uso
+_cliente = None
+_trava_cliente = threading.Lock()
+
+def obter_cliente():
+	"""Retorna o cliente HTTP compartilhado pelo processo"""
+	global _cliente
+	if _cliente is None:
+		with _trava_cliente:
+			if _cliente is None:
+				_cliente = ClienteHTTP()
+	return _cliente
@@ -0,0 +1,266 @@
+"""
+Leitura em streaming das demonstrações contábeis da ANS.
+
+Os CSVs são lidos direto de dentro dos ZIPs baixados por
+3-download-ans-data.py, sem extrair nada em disco: cada membro CSV é
+descomprimido e decodificado aos poucos e entregue em lotes de linhas já
+normalizados (colunas padronizadas, registro ANS só com dígitos, datas
+convertidas e valores no formato brasileiro '1.234,56' convertidos para
+número). Os lotes podem ser consumidos por:
+
+- gravar_parquet: arquivo colunar (requer pyarrow);
+- carregar_mysql: tabela demonstracoes_contabeis de 4-create-tables-mysql.sql;
+- a API (8-api-server.py), que monta seus arrays colunares a partir deles.
+
+Uso pela linha de comando:
+	python leitura_demonstracoes.py parquet dados_ans/demonstracoes_contabeis demonstracoes.parquet
+	python leitura_demonstracoes.py mysql dados_ans/demonstracoes_contabeis --senha ...
+"""
+
+import argparse
+import io
+import os
+import re
+import zipfile
+
+import pandas as pd
+
+# Colunas dos CSVs de demonstrações (layout atual da ANS e layout usado em 5-import-data-mysql.sql)
+COLUNAS_DEMONSTRACOES = {
+	'REG_ANS': 'registro_ans',
+	'REGISTRO_ANS': 'registro_ans',
+	'CD_CONTA_CONTABIL': 'codigo_conta',
+	'CODIGO_CONTA': 'codigo_conta',
+	'DESCRICAO': 'descricao_conta',
+	'DESCRICAO_CONTA': 'descricao_conta',
+	'VL_SALDO_FINAL': 'valor_conta',
+	'VALOR_CONTA': 'valor_conta',
+	'DATA': 'data_base',
+	'DATA_BASE': 'data_base'
+}
+
+# Colunas de cada lote entregue
+COLUNAS_LOTE = ['registro_ans', 'data_base', 'codigo_conta', 'descricao_conta', 'valor_conta']
+
+# Linhas por lote
+TAMANHO_LOTE = int(os.environ.get('ANS_TAMANHO_LOTE', 100000))
+
+# Bytes lidos do início de cada CSV para identificar o encoding
+TAMANHO_AMOSTRA_ENCODING = 1024 * 1024
+
+class ArquivoInvalido(Exception):
+	"""Arquivo de demonstrações sem as colunas esperadas ou sem trimestre identificável"""
+
+def periodo_arquivo(*nomes):
+	"""(ano, trimestre) do primeiro nome que contiver o padrão '1T2023', ou None"""
+	for nome in nomes:
+		periodo = re.search(r'([1-4])T(\d{4})', nome or '', re.IGNORECASE)
+		if periodo:
+			return int(periodo.group(2)), int(periodo.group(1))
+	return None
+
+def converter_valores(serie):
+	"""Converte valores no formato brasileiro ('1.234,56') para float64"""
+	if pd.api.types.is_numeric_dtype(serie):
+		return serie.astype('float64')
+	texto = serie.astype(str).str.strip()
+	# Com vírgula decimal, os pontos são separadores de milhar
+	com_virgula = texto.str.contains(',', regex=False)
+	texto = texto.where(~com_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+	return pd.to_numeric(texto, errors='coerce').fillna(0.0).astype('float64')
+
+def converter_datas(serie):
+	"""Converte datas nos formatos '2023-01-01' e '01/01/2023'"""
+	texto = serie.astype(str).str.strip()
+	datas = pd.to_datetime(texto, format='%Y-%m-%d', errors='coerce')
+	return datas.fillna(pd.to_datetime(texto, format='%d/%m/%Y', errors='coerce'))
+
+def normalizar_lote(df, origem):
+	"""Padroniza as colunas de um lote lido do CSV"""
+	df.columns = [coluna.strip().strip('"').upper() for coluna in df.columns]
+	df = df.rename(columns={coluna: COLUNAS_DEMONSTRACOES[coluna] for coluna in df.columns if coluna in COLUNAS_DEMONSTRACOES})
+	faltando = {'registro_ans', 'codigo_conta', 'descricao_conta', 'valor_conta'} - set(df.columns)
+	if faltando:
+		raise ArquivoInvalido(f"colunas ausentes em {origem}: {', '.join(sorted(faltando))}")
+	
+	return pd.DataFrame({
+		'registro_ans': df['registro_ans'].str.replace(r'\D', '', regex=True),
+		'data_base': converter_datas(df['data_base']) if 'data_base' in df.columns else pd.NaT,
+		'codigo_conta': df['codigo_conta'].str.strip(),
+		'descricao_conta': df['descricao_conta'].str.strip(),
+		'valor_conta': converter_valores(df['valor_conta'])
+	}, columns=COLUNAS_LOTE)
+
+def detectar_encoding(abrir):
+	"""
+	Encoding de um CSV a partir do primeiro 1 MB: UTF-8 (com ou sem BOM) se
+	ele for válido, senão latin1 (encoding usado pela ANS nos arquivos antigos)
+	"""
+	with abrir() as binario:
+		amostra = binario.read(TAMANHO_AMOSTRA_ENCODING)
+	# Um caractere multibyte pode ter sido cortado no fim da amostra
+	for corte in range(4):
+		try:
+			amostra[:len(amostra) - corte].decode('utf-8')
+			return 'utf-8-sig'
+		except UnicodeDecodeError:
+			continue
+	return 'latin1'
+
+def ler_lotes_csv(abrir, origem, tamanho_lote=TAMANHO_LOTE):
+	"""
+	Lê um CSV em lotes normalizados. `abrir` devolve um novo arquivo binário
+	(um arquivo em disco ou um membro de ZIP), descomprimido sob demanda.
+	"""
+	encoding = detectar_encoding(abrir)
+	with abrir() as binario:
+		texto = io.TextIOWrapper(binario, encoding=encoding, newline='')
+		leitor = pd.read_csv(texto, sep=';', dtype=str, keep_default_na=False, chunksize=tamanho_lote)
+		for lote in leitor:
+			yield normalizar_lote(lote, origem)
+
+def membros_csv(arquivo_zip):
+	"""Nomes dos CSVs dentro de um ZIP"""
+	with zipfile.ZipFile(arquivo_zip) as zip_ref:
+		return [membro.filename for membro in zip_ref.infolist()
+				if not membro.is_dir() and membro.filename.lower().endswith('.csv')]
+
+def ler_lotes_arquivo(caminho, tamanho_lote=TAMANHO_LOTE):
+	"""
+	Lotes normalizados de um arquivo de demonstrações: um CSV ou todos os CSVs
+	de um ZIP, lidos sem extração
+	"""
+	if not caminho.lower().endswith('.zip'):
+		yield from ler_lotes_csv(lambda: open(caminho, 'rb'), caminho, tamanho_lote)
+		return
+	
+	with zipfile.ZipFile(caminho) as zip_ref:
+		for membro in membros_csv(caminho):
+			yield from ler_lotes_csv(lambda: zip_ref.open(membro), f"{caminho}:{membro}", tamanho_lote)
+
+def arquivos_demonstracoes(diretorio):
+	"""
+	Arquivos de demonstrações (ZIPs baixados ou CSVs extraídos) como
+	[(ano, trimestre, caminho)], um por trimestre. Se o mesmo trimestre
+	aparecer mais de uma vez (ex.: o ZIP e a pasta extraída), vale o primeiro.
+	"""
+	encontrados = {}
+	if not os.path.isdir(diretorio):
+		return []
+	for raiz, _, arquivos in os.walk(diretorio):
+		for nome in sorted(arquivos):
+			if not nome.lower().endswith(('.csv', '.zip')):
+				continue
+			caminho = os.path.join(raiz, nome)
+			periodo = periodo_arquivo(nome, os.path.basename(raiz))
+			if periodo is None:
+				print(f"Trimestre não identificado no nome de {caminho}. Arquivo ignorado.")
+				continue
+			# O mesmo trimestre em mais de um arquivo seria somado em dobro
+			if periodo not in encontrados:
+				encontrados[periodo] = caminho
+	return [(ano, trimestre, caminho) for (ano, trimestre), caminho in sorted(encontrados.items())]
+
+def gravar_parquet(arquivos, destino):
+	"""
+	Grava as demonstrações de [(ano, trimestre, caminho)] em um único arquivo
+	Parquet, lote a lote, com as colunas ano e trimestre. Retorna o total de linhas.
+	"""
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+	
+	escritor = None
+	linhas = 0
+	temporario = f"{destino}.tmp"
+	try:
+		for ano, trimestre, caminho in arquivos:
+			for lote in ler_lotes_arquivo(caminho):
+				lote.insert(2, 'ano', ano)
+				lote.insert(3, 'trimestre', trimestre)
+				tabela = pa.Table.from_pandas(lote, preserve_index=False)
+				if escritor is None:
+					escritor = pq.ParquetWriter(temporario, tabela.schema)
+				escritor.write_table(tabela.cast(escritor.schema))
+				linhas += len(lote)
+			print(f"Demonstrações {trimestre}T{ano} gravadas ({linhas} linhas até agora).")
+	finally:
+		if escritor is not None:
+			escritor.close()
+	if escritor is not None:
+		os.replace(temporario, destino)
+	return linhas
+
+def carregar_mysql(conexao, arquivos):
+	"""
+	Insere as demonstrações de [(ano, trimestre, caminho)] na tabela
+	demonstracoes_contabeis, lote a lote. Como o procedimento
+	importar_demonstracoes de 5-import-data-mysql.sql, só entram linhas de
+	operadoras cadastradas, e cada arquivo é registrado em arquivos_importados.
+	"""
+	cursor = conexao.cursor()
+	cursor.execute("SELECT registro_ans FROM operadoras")
+	operadoras = {str(registro) for (registro,) in cursor.fetchall()}
+	
+	comando = ("INSERT INTO demonstracoes_contabeis "
+			   "(registro_ans, data_base, trimestre, ano, codigo_conta, descricao_conta, valor_conta) "
+			   "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+	for ano, trimestre, caminho in arquivos:
+		registros_total = 0
+		try:
+			for lote in ler_lotes_arquivo(caminho):
+				registros_total += len(lote)
+				lote = lote[lote['registro_ans'].isin(operadoras)]
+				if lote.empty:
+					continue
+				# Tipos nativos do Python, aceitos pelo conector
+				datas = [data.date() if pd.notna(data) else None for data in lote['data_base'].tolist()]
+				cursor.executemany(comando, list(zip(
+					lote['registro_ans'].tolist(), datas, [trimestre] * len(lote), [ano] * len(lote),
+					lote['codigo_conta'].tolist(), lote['descricao_conta'].tolist(), lote['valor_conta'].round(2).tolist()
+				)))
+			cursor.execute(
+				"INSERT INTO arquivos_importados (nome_arquivo, tipo_arquivo, status, registros_processados, detalhes) "
+				"VALUES (%s, 'DEMONSTRACAO', 'SUCESSO', %s, %s)",
+				(caminho, registros_total, f"Importação de demonstrações contábeis (Ano: {ano}, Trimestre: {trimestre}) concluída")
+			)
+			conexao.commit()
+			print(f"Demonstrações {trimestre}T{ano} importadas. Registros processados: {registros_total}")
+		except Exception as e:
+			conexao.rollback()
+			print(f"Erro ao importar {caminho}: {str(e)}")
+	cursor.close()
+
+def main():
+	parser = argparse.ArgumentParser(description='Lê as demonstrações contábeis direto dos ZIPs, sem extraí-los')
+	subcomandos = parser.add_subparsers(dest='comando', required=True)
+	
+	comando_parquet = subcomandos.add_parser('parquet', help='Grava as demonstrações em um arquivo Parquet')
+	comando_parquet.add_argument('origem', help='Diretório com os ZIPs/CSVs de demonstrações')
+	comando_parquet.add_argument('destino', help='Arquivo Parquet de saída')
+	
+	comando_mysql = subcomandos.add_parser('mysql', help='Importa as demonstrações no MySQL')
+	comando_mysql.add_argument('origem', help='Diretório com os ZIPs/CSVs de demonstrações')
+	comando_mysql.add_argument('--host', default='localhost')
+	comando_mysql.add_argument('--usuario', default='root')
+	comando_mysql.add_argument('--senha', default='')
+	comando_mysql.add_argument('--database', default='ans_database')
+	
+	args = parser.parse_args()
+	arquivos = arquivos_demonstracoes(args.origem)
+	if not arquivos:
+		print(f"Nenhum arquivo de demonstrações encontrado em {args.origem}.")
+		return
+	
+	if args.comando == 'parquet':
+		linhas = gravar_parquet(arquivos, args.destino)
+		print(f"{linhas} linhas gravadas em {args.destino}")
+	else:
+		import mysql.connector
+		conexao = mysql.connector.connect(host=args.host, user=args.usuario, password=args.senha, database=args.database)
+		try:
+			carregar_mysql(conexao, arquivos)
+		finally:
+			conexao.close()
+
+if __name__ == "__main__":
+	main()
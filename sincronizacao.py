@@ -0,0 +1,225 @@
+"""
+Sincronização incremental de arquivos baixados da ANS.
+
+Um manifesto local (JSON) guarda, para cada URL, o arquivo de destino, o
+ETag, o Last-Modified, o tamanho e o SHA-256 do último download. Com ele:
+
+- arquivos que não mudaram no servidor são pulados com requisições
+  condicionais (If-None-Match / If-Modified-Since, resposta 304);
+- downloads interrompidos continuam de onde pararam com Range/If-Range,
+  a partir do arquivo parcial (<destino>.parcial);
+- o arquivo só substitui o destino depois de ter o tamanho conferido (e,
+  para ZIPs, a estrutura), com uma troca atômica (os.replace).
+
+Usado por 1-webscraping_ans.py e 3-download-ans-data.py.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from datetime import datetime
+
+from cliente_http import obter_cliente
+
+# Resultados de sincronizar_download
+BAIXADO = 'baixado'
+INALTERADO = 'inalterado'
+
+# Nome do manifesto dentro do diretório de downloads
+NOME_MANIFESTO = 'manifesto_downloads.json'
+
+# Sufixo do arquivo parcial, mantido entre execuções para retomar o download
+SUFIXO_PARCIAL = '.parcial'
+
+TAMANHO_PEDACO = 64 * 1024
+
+class DownloadInvalido(Exception):
+	"""O arquivo recebido não passou na verificação e não foi promovido"""
+
+class ManifestoDownloads:
+	"""
+	Manifesto dos downloads em um arquivo JSON ({url: entrada}).
+	
+	Cada alteração é gravada imediatamente (arquivo temporário + os.replace),
+	para que uma execução interrompida não perca o que já foi baixado. Seguro
+	para uso por várias threads.
+	"""
+	
+	def __init__(self, caminho):
+		self.caminho = caminho
+		self.trava = threading.Lock()
+		try:
+			with open(caminho, 'r', encoding='utf-8') as arquivo:
+				self.entradas = json.load(arquivo)
+		except (OSError, ValueError):
+			self.entradas = {}
+	
+	def obter(self, url):
+		with self.trava:
+			return dict(self.entradas.get(url, {}))
+	
+	def atualizar(self, url, **campos):
+		"""Altera os campos da entrada da URL (None remove o campo) e grava o manifesto"""
+		with self.trava:
+			entrada = self.entradas.setdefault(url, {})
+			for nome, valor in campos.items():
+				if valor is None:
+					entrada.pop(nome, None)
+				else:
+					entrada[nome] = valor
+			self.gravar()
+	
+	def gravar(self):
+		diretorio = os.path.dirname(self.caminho)
+		if diretorio:
+			os.makedirs(diretorio, exist_ok=True)
+		temporario = f"{self.caminho}.tmp"
+		with open(temporario, 'w', encoding='utf-8') as arquivo:
+			json.dump(self.entradas, arquivo, indent=2, sort_keys=True)
+		os.replace(temporario, self.caminho)
+
+def hash_arquivo(caminho, sha256=None):
+	"""Calcula (ou continua) o SHA-256 do conteúdo de um arquivo"""
+	sha256 = sha256 or hashlib.sha256()
+	with open(caminho, 'rb') as arquivo:
+		for pedaco in iter(lambda: arquivo.read(1024 * 1024), b''):
+			sha256.update(pedaco)
+	return sha256
+
+def arquivo_confere(destino, entrada):
+	"""
+	Indica se o arquivo local ainda é o registrado no manifesto. Se só a data
+	de modificação mudou, o SHA-256 decide.
+	"""
+	try:
+		info = os.stat(destino)
+	except OSError:
+		return False
+	if not entrada.get('sha256') or info.st_size != entrada.get('tamanho'):
+		return False
+	if info.st_mtime_ns == entrada.get('mtime_ns'):
+		return True
+	return hash_arquivo(destino).hexdigest() == entrada['sha256']
+
+def cabecalhos_condicionais(entrada):
+	"""If-None-Match / If-Modified-Since a partir dos validadores do manifesto"""
+	cabecalhos = {}
+	if entrada.get('etag'):
+		cabecalhos['If-None-Match'] = entrada['etag']
+	if entrada.get('last_modified'):
+		cabecalhos['If-Modified-Since'] = entrada['last_modified']
+	return cabecalhos
+
+def inicio_content_range(valor):
+	"""Posição inicial e tamanho total de um Content-Range ('bytes 100-199/1000')"""
+	try:
+		unidade, intervalo = valor.split(' ', 1)
+		faixa, total = intervalo.split('/', 1)
+		inicio = int(faixa.split('-', 1)[0])
+		return inicio, (int(total) if total != '*' else None)
+	except (AttributeError, ValueError):
+		return None, None
+
+def verificar_download(caminho, tamanho_esperado, destino):
+	"""Confere o arquivo recebido antes de promovê-lo (DownloadInvalido se não conferir)"""
+	tamanho = os.path.getsize(caminho)
+	if tamanho_esperado is not None and tamanho != tamanho_esperado:
+		raise DownloadInvalido(f"tamanho recebido {tamanho} diferente do esperado {tamanho_esperado}")
+	if destino.lower().endswith('.zip') and not zipfile.is_zipfile(caminho):
+		raise DownloadInvalido("o arquivo recebido não é um ZIP válido")
+
+def sincronizar_download(url, destino, manifesto, ao_iniciar=None, ao_receber=None, sessao=None):
+	"""
+	Baixa `url` para `destino` usando o manifesto para pular arquivos que não
+	mudaram e retomar downloads interrompidos.
+	
+	ao_iniciar(tamanho_total, ja_baixado) é chamado quando o tamanho é
+	conhecido e ao_receber(bytes) a cada pedaço gravado, para as barras de
+	progresso. A `sessao` padrão é o cliente HTTP compartilhado (pool de
+	conexões, tempos limite e repetições). Retorna BAIXADO ou INALTERADO;
+	erros de rede, HTTP e verificação são propagados como exceções.
+	"""
+	sessao = sessao or obter_cliente()
+	entrada = manifesto.obter(url)
+	parcial = destino + SUFIXO_PARCIAL
+	
+	for tentativa in range(2):
+		cabecalhos = {}
+		inicio = 0
+		
+		if entrada.get('arquivo') == destino and arquivo_confere(destino, entrada):
+			# Arquivo completo: só baixar de novo se mudou no servidor
+			cabecalhos = cabecalhos_condicionais(entrada)
+		elif os.path.exists(parcial) and entrada.get('parcial_validador'):
+			# Download interrompido: pedir só o restante, se o arquivo não mudou
+			inicio = os.path.getsize(parcial)
+			cabecalhos = {'Range': f"bytes={inicio}-", 'If-Range': entrada['parcial_validador']}
+		
+		with sessao.get(url, stream=True, headers=cabecalhos) as resposta:
+			if resposta.status_code == 304:
+				manifesto.atualizar(url, verificado_em=datetime.now().isoformat(timespec='seconds'))
+				return INALTERADO
+			
+			if resposta.status_code == 416 and inicio:
+				# Parcial já maior que o arquivo (ou inválido): recomeçar do zero
+				os.remove(parcial)
+				manifesto.atualizar(url, parcial_validador=None)
+				entrada = manifesto.obter(url)
+				continue
+			resposta.raise_for_status()
+			
+			etag = resposta.headers.get('ETag')
+			last_modified = resposta.headers.get('Last-Modified')
+			if resposta.status_code == 206:
+				posicao, tamanho_total = inicio_content_range(resposta.headers.get('Content-Range'))
+				if posicao != inicio:
+					raise DownloadInvalido(f"intervalo recebido começa em {posicao}, esperado {inicio}")
+				modo = 'ab'
+				sha256 = hash_arquivo(parcial)
+			else:
+				# Resposta completa: o parcial (se houver) é descartado
+				inicio = 0
+				tamanho = resposta.headers.get('Content-Length')
+				tamanho_total = int(tamanho) if tamanho and not resposta.headers.get('Content-Encoding') else None
+				modo = 'wb'
+				sha256 = hashlib.sha256()
+				# Validador para retomar este download se ele for interrompido
+				manifesto.atualizar(url, parcial_validador=etag if etag and not etag.startswith('W/') else last_modified)
+			
+			if ao_iniciar:
+				ao_iniciar(tamanho_total or 0, inicio)
+			
+			with open(parcial, modo) as arquivo:
+				for pedaco in resposta.iter_content(chunk_size=TAMANHO_PEDACO):
+					if pedaco:
+						arquivo.write(pedaco)
+						sha256.update(pedaco)
+						if ao_receber:
+							ao_receber(len(pedaco))
+		
+		try:
+			verificar_download(parcial, tamanho_total, destino)
+		except DownloadInvalido:
+			# Não há como retomar um arquivo que não confere
+			os.remove(parcial)
+			manifesto.atualizar(url, parcial_validador=None)
+			raise
+		
+		os.replace(parcial, destino)
+		info = os.stat(destino)
+		manifesto.atualizar(
+			url,
+			arquivo=destino,
+			etag=etag,
+			last_modified=last_modified,
+			tamanho=info.st_size,
+			mtime_ns=info.st_mtime_ns,
+			sha256=sha256.hexdigest(),
+			parcial_validador=None,
+			verificado_em=datetime.now().isoformat(timespec='seconds')
+		)
+		return BAIXADO
+	
+	raise DownloadInvalido("o servidor recusou o intervalo pedido")